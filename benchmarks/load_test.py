@@ -0,0 +1,67 @@
+"""
+Concurrent load against a running API instance, reporting latency percentiles.
+
+Start the server (python main.py), log in to get a token, then:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000/topics/ --token <jwt> -c 50 -n 2000
+
+Run it once on the commit before a change and once after to compare p99 under the same concurrency.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, url: str, headers: dict, jobs: asyncio.Queue,
+                 samples: list[float], errors: list[int]) -> None:
+    while True:
+        try:
+            jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+
+async def run(url: str, token: str | None, concurrency: int, requests: int) -> None:
+    headers = {"Authorization": token} if token else {}
+    jobs = asyncio.Queue()
+    for number in range(requests):
+        jobs.put_nowait(number)
+
+    samples, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, url, headers, jobs, samples, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    samples.sort()
+
+    def percentile(p: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    print(f"{len(samples)} requests, concurrency {concurrency}, {len(samples) / elapsed:.1f} req/s, "
+          f"{len(errors)} errors")
+    print(f"p50 {statistics.median(samples):.1f} ms   p95 {percentile(0.95):.1f} ms   "
+          f"p99 {percentile(0.99):.1f} ms   max {samples[-1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", default=None, help="value of the Authorization header")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.token, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Per-query cost of text vs prepared (binary protocol) statements, and of SELECT * vs an explicit column list.
+
+Run from the project root against a database that has some users, topics and votes:
+
+    python -m benchmarks.prepared_statements --runs 2000
+"""
+import argparse
+import time
+
+from data.connection import get_db, read_query
+from repo.topic import TOPIC_COLUMNS
+from repo.user import USER_COLUMNS
+
+
+def per_query_us(runs: int, execute) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        execute()
+    return (time.perf_counter() - start) / runs * 1_000_000
+
+
+def compare(label: str, query: str, params: tuple, runs: int) -> None:
+    with get_db() as db:
+        text_cursor = db.cursor()
+        prepared_cursor = db.cursor(prepared=True)
+
+        def text():
+            text_cursor.execute(query, params)
+            text_cursor.fetchall()
+
+        def prepared():
+            prepared_cursor.execute(query, params)
+            prepared_cursor.fetchall()
+
+        text_us = per_query_us(runs, text)
+        prepared_us = per_query_us(runs, prepared)
+        text_cursor.close()
+        prepared_cursor.close()
+
+    print(f"{label:<45} text {text_us:8.1f} us   prepared {prepared_us:8.1f} us   "
+          f"saved {text_us - prepared_us:7.1f} us/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1000)
+    args = parser.parse_args()
+
+    username = read_query("SELECT username FROM users LIMIT 1")[0][0]
+    topic_id = read_query("SELECT id FROM topics ORDER BY id DESC LIMIT 1")[0][0]
+    reply_id = read_query("SELECT id FROM replies ORDER BY id DESC LIMIT 1")[0][0]
+
+    compare("get_user_by_username", f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,), args.runs)
+    compare("get_topic_by_id", f"SELECT {TOPIC_COLUMNS} FROM topics WHERE id = ?", (topic_id,), args.runs)
+    compare("get_reply_votes", "SELECT likes FROM replies WHERE id = ?", (reply_id,), args.runs)
+    compare("get_user_category_permission",
+            "SELECT type FROM category_permissions WHERE category_id = ? AND user_id = ?", (1, 1), args.runs)
+
+    compare("topics page, SELECT *", "SELECT * FROM topics ORDER BY id DESC LIMIT 10", (), args.runs)
+    compare("topics page, id/name/date only", "SELECT id, name, date FROM topics ORDER BY id DESC LIMIT 10", (),
+            args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Time to sanitize a large post: BeautifulSoup (the previous implementation) against data.sanitizer.
+
+No database needed. From the project root:
+
+    python -m benchmarks.sanitizer --size-mb 1 --runs 5
+"""
+import argparse
+import random
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from data.sanitizer import sanitize
+
+FRAGMENTS = ["Some words in a sentence. ", "<b>bold</b> ", "<i>italic <u>and underlined</u></i> ", "<br>",
+             "&amp; &lt;escaped&gt; &nbsp;", "<p>a paragraph</p>\n", "<a href=\"https://example.com\">a link</a> ",
+             "<script>alert(1)</script>", "<!-- a comment -->", "\n\n", "<div><span>nested</span></div>"]
+
+
+def beautifulsoup(content: str) -> str:
+    soup = BeautifulSoup(content, "html.parser")
+    for br in soup.find_all("br"):
+        br.replace_with("__BR__")
+    return soup.get_text().replace("__BR__", "<br />")
+
+
+def post(size: int, plain: bool = False) -> str:
+    rng = random.Random(size)
+    parts, length = [], 0
+    while length < size:
+        part = FRAGMENTS[0] if plain else rng.choice(FRAGMENTS)
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:size]
+
+
+def timed(sanitizer, content: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        sanitizer(content)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=1)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    for label, content in (("markup", post(size)), ("plain text", post(size, plain=True))):
+        if sanitize(content) != beautifulsoup(content):
+            raise SystemExit(f"{label}: outputs differ")
+        old, new = timed(beautifulsoup, content, args.runs), timed(sanitize, content, args.runs)
+        print(f"{label:<12} {len(content) / 1024 / 1024:.1f} MB   BeautifulSoup {old:8.1f} ms   "
+              f"sanitize {new:8.1f} ms   {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Messages per second one worker can send: the previous send path against ConversationsService.send_message.
+
+The previous path resolved the receiver (user row plus category permissions), probed for the
+conversation in both directions with conversation_exists and get_conversation_by_users, then
+inserted the message. The current one is an upsert on the (user_low, user_high) key, the insert,
+the last-message update and the read-back in one transaction.
+
+Run from the project root against a scratch database (the one configured in data/connection.py)
+with two existing users; the messages it sends are deleted afterwards:
+
+    python -m benchmarks.send_message --sender 1 --receiver 2 --seconds 10
+"""
+import argparse
+import time
+
+import repo.conversation as conversation_repo
+import repo.message as message_repo
+import repo.user as user_repo
+from data.connection import read_query, update_query, transaction
+from models.message import MessageCreate
+from services.conversations import ConversationsService
+from services.utils import AuthToken
+
+LEGACY_PROBE = "SELECT id FROM conversations WHERE initiator_id = ? AND receiver_id = ? LIMIT 1"
+
+
+def legacy_send(receiver_id: int, content: str, token: str) -> int:
+    user = AuthToken.validate(token)
+    receiver = user_repo.get_user_by_id(receiver_id)
+    if not receiver:
+        raise SystemExit(f"user {receiver_id} doesn't exist")
+
+    with transaction():
+        # conversation_exists, then get_conversation_by_users: each tried both directions
+        exists = read_query(LEGACY_PROBE, (user.id, receiver_id)) or read_query(LEGACY_PROBE, (receiver_id, user.id))
+        if not exists:
+            conversation_id = conversation_repo.create_conversation(user.id, receiver_id)
+        else:
+            result = read_query(LEGACY_PROBE, (user.id, receiver_id)) or \
+                     read_query(LEGACY_PROBE, (receiver_id, user.id))
+            conversation_id = result[0][0]
+        message_id = message_repo.create_message(MessageCreate(content=content, receiver_id=receiver_id),
+                                                 conversation_id, user.id)
+        conversation_repo.set_last_message(conversation_id, message_id)
+    message_repo.get_message_by_id(message_id)
+    return message_id
+
+
+def current_send(receiver_id: int, content: str, token: str) -> int:
+    return ConversationsService.send_message(receiver_id, content, token)["message_id"]
+
+
+def rate(send, receiver_id: int, token: str, seconds: float) -> float:
+    sent, deadline = 0, time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        send(receiver_id, f"benchmark message {sent}<br>line two", token)
+        sent += 1
+    return sent / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sender", type=int, required=True, help="user id sending the messages")
+    parser.add_argument("--receiver", type=int, required=True, help="user id receiving them")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    sender = user_repo.get_user_by_id(args.sender)
+    token = AuthToken.generate(AuthToken.claims_for(sender, user_repo.get_permission_version(sender.id) or 0))
+    first_id = (read_query("SELECT COALESCE(MAX(id), 0) FROM messages")[0][0]) + 1
+
+    try:
+        for label, send in (("previous send path", legacy_send), ("send_message", current_send)):
+            print(f"{label:<20} {rate(send, args.receiver, token, args.seconds):8.1f} messages/s")
+    finally:
+        conversation_id = conversation_repo.get_conversation_by_users(sender.id, args.receiver)
+        update_query("DELETE FROM messages WHERE id >= ? AND conversation_id = ?", (first_id, conversation_id))
+        update_query("UPDATE conversations SET last_message_id = "
+                     "(SELECT MAX(id) FROM messages WHERE conversation_id = ?) WHERE id = ?",
+                     (conversation_id, conversation_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Time to load everything a thread view needs: the old request sequence against GET /topics/{id}/page.
+
+The old sequence is GET /topics/{id}, GET /topics/{id}/replies, GET /categories/{cid}/check-permission
+and one GET /replies/vote/{reply_id} per reply, sent the way the frontend sends them (the vote lookups
+concurrently). Start the server (python main.py), log in to get a token, then:
+
+    python -m benchmarks.topic_page --url http://127.0.0.1:8000 --token <jwt> --topic-id 1 --runs 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def old_sequence(client: httpx.AsyncClient, topic_id: int) -> int:
+    topic, replies = await asyncio.gather(client.get(f"/topics/{topic_id}"),
+                                          client.get(f"/topics/{topic_id}/replies"))
+    category_id = topic.json()["category_id"]
+    requests = [client.get(f"/categories/{category_id}/check-permission")]
+    requests += [client.get(f"/replies/vote/{reply['id']}") for reply in replies.json()]
+    await asyncio.gather(*requests)
+    return 2 + len(requests)
+
+
+async def page_endpoint(client: httpx.AsyncClient, topic_id: int) -> int:
+    await client.get(f"/topics/{topic_id}/page", params={"limit": 100})
+    return 1
+
+
+async def measure(client: httpx.AsyncClient, load, topic_id: int, runs: int) -> tuple[list[float], int]:
+    samples, requests = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        requests = await load(client, topic_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples), requests
+
+
+def report(label: str, samples: list[float], requests: int) -> None:
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<22} {requests:5d} requests   median {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+async def run(url: str, token: str, topic_id: int, runs: int) -> None:
+    async with httpx.AsyncClient(base_url=url, headers={"Authorization": token}, timeout=60) as client:
+        report("old request sequence", *await measure(client, old_sequence, topic_id, runs))
+        report("GET /topics/{id}/page", *await measure(client, page_endpoint, topic_id, runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True, help="value of the Authorization header")
+    parser.add_argument("--topic-id", type=int, required=True)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.token, args.topic_id, args.runs))
+
+
+if __name__ == "__main__":
+    main()
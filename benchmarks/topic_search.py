@@ -0,0 +1,78 @@
+"""
+Topic search latency: leading-wildcard LIKE against the FULLTEXT index.
+
+Run from the project root against a scratch database, selected with the DB_HOST, DB_PORT,
+DB_USER, DB_PASSWORD and DB_NAME environment variables (--seed inserts rows into it):
+
+    python -m benchmarks.topic_search --seed 1000000 --category-id 1 --user-id 1
+    python -m benchmarks.topic_search --runs 50
+"""
+import argparse
+import random
+import statistics
+import time
+
+from data.connection import read_query, get_db
+from repo.topic import fulltext_terms
+
+WORDS = ["python", "database", "forum", "index", "search", "mariadb", "latency", "cursor", "thread",
+         "topic", "reply", "vote", "category", "message", "server", "client", "cache", "query"]
+SEARCHES = ["pyth", "database index", "mariadb latency", "forum search cache", "cursor"]
+
+
+def seed(count: int, category_id: int, user_id: int, batch: int = 5000) -> None:
+    query = "INSERT INTO topics (name, content, category_id, user_id) VALUES (?, ?, ?, ?)"
+    with get_db() as db:
+        cursor = db.cursor()
+        for start in range(0, count, batch):
+            rows = [(" ".join(random.choices(WORDS, k=4))[:45],
+                     " ".join(random.choices(WORDS, k=60)),
+                     category_id,
+                     user_id) for _ in range(min(batch, count - start))]
+            cursor.executemany(query, rows)
+            db.commit()
+        cursor.close()
+
+
+def timed(query: str, params: tuple, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        read_query(query, params)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<40} median {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="insert this many random topics first")
+    parser.add_argument("--category-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed, args.category_id, args.user_id)
+
+    total = read_query("SELECT COUNT(*) FROM topics")[0][0]
+    print(f"{total} topics")
+
+    for search in SEARCHES:
+        like = timed("SELECT * FROM topics WHERE name LIKE ? ORDER BY id DESC LIMIT 11",
+                     (f"%{search}%",), args.runs)
+        terms = fulltext_terms(search)
+        fulltext = timed("SELECT * FROM topics WHERE MATCH(name, content) AGAINST (? IN BOOLEAN MODE) "
+                         "ORDER BY MATCH(name, content) AGAINST (? IN BOOLEAN MODE) DESC, id DESC LIMIT 11",
+                         (terms, terms), args.runs)
+        report(f"LIKE '%{search}%'", like)
+        report(f"FULLTEXT '{terms}'", fulltext)
+
+
+if __name__ == "__main__":
+    main()
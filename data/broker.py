@@ -0,0 +1,240 @@
+"""
+In-process publish/subscribe for pushing events to connected clients (GET /conversations/stream).
+
+Publishers call broker.publish(channel, event) from any thread; subscribers consume a
+Subscription from the event loop that created it. Two brokers are available, selected with
+the BROKER environment variable:
+
+- memory (default): delivers to the subscribers of this process only.
+- unix: also fans out to every other process on the machine using the same BROKER_PATH
+  directory, over Unix datagram sockets. It stands in for an external broker (e.g. Redis)
+  when the app runs as several uvicorn workers on one host. The directory defaults to
+  $XDG_RUNTIME_DIR/forum-broker (~/.cache/forum-broker without one) and must be private to
+  the service user, since anyone who can write to it can publish events.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import stat
+import uuid
+from threading import Lock
+from typing import Any
+
+BROKER = os.getenv("BROKER", "memory")
+
+
+def default_broker_path() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "forum-broker")
+    return os.path.join(os.path.expanduser("~"), ".cache", "forum-broker")
+
+
+BROKER_PATH = os.getenv("BROKER_PATH") or default_broker_path()
+# Events a slow subscriber may fall behind by before the oldest ones are dropped
+SUBSCRIPTION_BUFFER = 100
+# Largest event accepted from another process, in bytes
+MAX_DATAGRAM = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    The events of one channel for one consumer. Iterate it (async) on the loop it was created on,
+    close it (or use it as a context manager) when the consumer goes away.
+    """
+
+    def __init__(self, broker: "Broker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIPTION_BUFFER)
+
+    def deliver(self, event: Any) -> None:
+        """Thread-safe: queues the event on the subscriber's loop."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop is closed; it will never read again
+            self.close()
+
+    def _put(self, event: Any) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            logger.warning("subscriber of %s is lagging, dropped its oldest event", self.channel)
+        self._queue.put_nowait(event)
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        return await self.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Broker:
+    """
+    Delivers events to the subscriptions of this process. Subclasses that reach other
+    processes override publish and call dispatch for the local subscribers.
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+    def dispatch(self, channel: str, event: Any) -> int:
+        """
+        Hands an event to the local subscribers of a channel.
+        :return: number of subscriptions it was delivered to
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+        return len(subscriptions)
+
+    def publish(self, channel: str, event: Any) -> None:
+        self.dispatch(channel, event)
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBroker(Broker):
+    pass
+
+
+def make_private_directory(path: str) -> None:
+    """
+    Creates path with mode 0o700 if it is missing, then refuses to use it unless it is a real
+    directory owned by this user that nobody else can read or write.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise RuntimeError(f"Broker path {path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise RuntimeError(f"Broker path {path} is owned by uid {info.st_uid}, not {os.getuid()}")
+    if info.st_mode & 0o077:
+        raise RuntimeError(f"Broker path {path} is accessible to other users "
+                           f"(mode {stat.S_IMODE(info.st_mode):o}), expected 700")
+
+
+class UnixSocketBroker(Broker):
+    """
+    Every process binds a datagram socket in a shared directory once it has a subscriber.
+    publish() delivers locally and sends the event (JSON) to the other sockets in the directory;
+    sockets of processes that are gone refuse the datagram and are removed.
+    """
+
+    def __init__(self, path: str = BROKER_PATH):
+        super().__init__()
+        self.path = path
+        make_private_directory(path)
+        self.address = os.path.join(path, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._receiver: socket.socket | None = None
+        self._receiver_loop: asyncio.AbstractEventLoop | None = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender_lock = Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = super().subscribe(channel)
+        self._listen()
+        return subscription
+
+    def _listen(self) -> None:
+        """Binds the receiving socket and registers it with the running event loop (once)."""
+        if self._receiver is not None:
+            return
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.setblocking(False)
+        receiver.bind(self.address)
+        self._receiver_loop = asyncio.get_running_loop()
+        self._receiver_loop.add_reader(receiver.fileno(), self._receive)
+        self._receiver = receiver
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                datagram = self._receiver.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            try:
+                envelope = json.loads(datagram)
+                self.dispatch(envelope["channel"], envelope["event"])
+            except (ValueError, KeyError):
+                logger.warning("ignored malformed broker datagram of %d bytes", len(datagram))
+
+    def publish(self, channel: str, event: Any) -> None:
+        self.dispatch(channel, event)
+        datagram = json.dumps({"channel": channel, "event": event}, default=str).encode()
+        try:
+            peers = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(".sock")]
+        except FileNotFoundError:
+            return
+        with self._sender_lock:
+            for peer in peers:
+                if peer == self.address:
+                    continue
+                try:
+                    self._sender.sendto(datagram, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Nobody is listening there any more
+                    try:
+                        os.unlink(peer)
+                    except FileNotFoundError:
+                        pass
+                except OSError as e:
+                    logger.warning("could not publish to %s: %s", peer, e)
+
+    def close(self) -> None:
+        if self._receiver is not None:
+            if self._receiver_loop is not None and not self._receiver_loop.is_closed():
+                self._receiver_loop.remove_reader(self._receiver.fileno())
+            self._receiver.close()
+            self._receiver = None
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+        self._sender.close()
+
+
+BROKERS = {
+    "memory": MemoryBroker,
+    "unix": UnixSocketBroker,
+}
+
+broker: Broker = BROKERS[BROKER]()
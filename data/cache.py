@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from threading import Event, Lock
+from time import monotonic
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a per-entry time to live.
+    Once maxsize entries are stored the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Stores an entry; the caller holds the lock."""
+        self._data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else None
+
+    def pop_where(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Removes every entry whose value matches the predicate and returns how many were removed.
+        """
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class _Flight:
+    """One load in progress, shared by every caller that missed the same key meanwhile."""
+
+    def __init__(self):
+        self.done = Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+        self.stale = False
+
+
+class ReadThroughCache(TTLCache):
+    """
+    TTLCache that loads missing entries itself. Concurrent misses on one key share a single
+    load (single flight), so a hot key that expires causes one query, not one per request.
+    None results are not cached. Values are shared between callers: treat them as read-only.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0):
+        super().__init__(maxsize, ttl)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, or the result of loader() stored under it.
+        If another thread is already loading the key, waits for its result instead.
+        """
+        value = self.get(key, _MISSING)
+        with self._lock:
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # A write during the load may have made the loaded value outdated: hand it to
+                # the waiting callers, but don't keep it
+                if flight.error is None and flight.value is not None and not flight.stale:
+                    self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """
+        Drops the entries of the given keys; loads of those keys that are in progress are not stored.
+        """
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                flight = self._flights.get(key)
+                if flight is not None:
+                    flight.stale = True
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            for flight in self._flights.values():
+                flight.stale = True
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
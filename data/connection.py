@@ -1,54 +1,402 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Generator, List, Tuple
+from contextvars import ContextVar
+from threading import Lock, RLock
+from time import monotonic, perf_counter, sleep
+from typing import Any, Callable, Generator, Iterable, List, Tuple
+import anyio
 import mariadb
-from fastapi import Depends
 from mariadb import Connection, ConnectionPool
 
-pool = ConnectionPool(
-    pool_name="forum_pool",
-    pool_size=5,
-    host="172.245.56.116",
-    port=3600,
-    user="root",
-    password="root",
-    database="forum"
+DB_CONFIG = dict(
+    host=os.getenv("DB_HOST", "172.245.56.116"),
+    port=int(os.getenv("DB_PORT", "3600")),
+    user=os.getenv("DB_USER", "root"),
+    password=os.getenv("DB_PASSWORD", "root"),
+    database=os.getenv("DB_NAME", "forum")
 )
 
+# Also bounds the worker threads serving requests (see main.lifespan)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+# Seconds a checkout waits for a free connection before failing
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections idle for longer than this (ms) are pinged before being handed out
+POOL_VALIDATION_INTERVAL = int(os.getenv("DB_POOL_VALIDATION_INTERVAL", "500"))
+# Statements slower than this (ms) are written to the slow query log
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Run on every pooled connection. Autocommit is off and connections are pinned to requests, so
+# under REPEATABLE READ a request would read one snapshot from its first query on, and could load
+# rows from before a commit into the shared caches after that commit's invalidation had run.
+# READ COMMITTED gives every statement the latest committed rows.
+SESSION_INIT = "SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED"
+# Adds X-DB-Queries / X-DB-Time headers to every response
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
 
-def get_db() -> Connection:
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger(f"{__name__}.slow")
+
+
+class DatabasePool:
     """
-    Provides a database connection from the connection pool.
-    Note: Connection should be closed by the caller or managed via context.
+    A MariaDB ConnectionPool that is created on first use (or by warm_up), waits for a free
+    connection instead of failing when all are in use, and keeps usage statistics.
     """
-    conn = None
-    try:
-        conn = pool.get_connection()
+
+    def __init__(self, name: str, size: int, factory: Callable[[], ConnectionPool] | None = None):
+        self.name = name
+        self.size = size
+        self.factory = factory or (lambda: ConnectionPool(pool_name=name,
+                                                          pool_size=size,
+                                                          pool_validation_interval=POOL_VALIDATION_INTERVAL,
+                                                          # Keeps prepared statements alive between
+                                                          # checkouts, checkin rolls back instead
+                                                          pool_reset_connection=False,
+                                                          init_command=SESSION_INIT,
+                                                          **DB_CONFIG))
+        self._pool: ConnectionPool | None = None
+        self._lock = Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.failures = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def initialized(self) -> bool:
+        return self._pool is not None
+
+    def get_pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self.factory()
+        return self._pool
+
+    def warm_up(self) -> None:
+        """
+        Creates the pool, which opens all of its connections, ahead of the first request.
+        """
+        self.get_pool()
+
+    def checkout(self) -> Connection:
+        started = monotonic()
+        try:
+            db_pool = self.get_pool()
+            while True:
+                try:
+                    conn = db_pool.get_connection()
+                except mariadb.PoolError:
+                    conn = None
+                if conn is not None:
+                    break
+                if monotonic() - started >= POOL_TIMEOUT:
+                    raise mariadb.PoolError(f"No connection available in {self.name} after {POOL_TIMEOUT}s")
+                sleep(0.005)
+        except mariadb.Error as e:
+            with self._lock:
+                self.failures += 1
+            logger.error("Error connecting to MariaDB database: %s", e)
+            raise
+
+        waited = monotonic() - started
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
         return conn
-    except mariadb.Error as e:
-        print(f"Error connecting to MariaDB database: {e}")
-        raise
+
+    def checkin(self, conn: Connection) -> None:
+        with self._lock:
+            self.in_use -= 1
+        try:
+            # Ends any transaction (and read snapshot) left open before the next checkout
+            conn.rollback()
+        except mariadb.Error:
+            forget_statements(conn)
+        conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "initialized": self.initialized,
+                "size": self.size,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.failures,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool = DatabasePool("forum_pool", POOL_SIZE)
+
+# The async API has its own pool and worker threads so awaited queries never wait on the sync pool
+async_pool = DatabasePool("forum_async_pool", ASYNC_POOL_SIZE)
+async_executor: ThreadPoolExecutor | None = None
+# Returns the connections of finished requests, off the request thread limiter (see RequestConnectionMiddleware)
+release_executor: ThreadPoolExecutor | None = None
+_async_init_lock = Lock()
+
+
+class UnitOfWork:
+    """
+    Holds one pooled connection for a request, or for a transaction outside of one.
+    The connection is checked out on the first query, so work that never touches
+    the database doesn't take one from the pool.
+    """
+
+    def __init__(self, db_pool: DatabasePool):
+        self.pool = db_pool
+        self.conn: Connection | None = None
+        self.depth = 0  # open transaction() blocks
+        # Set once the request's response has started: later queries check out their own connection
+        self.detached = False
+        # Serializes use of the connection when a request fans out to several threads
+        self.lock = RLock()
+        # (statement, seconds, rows) for every query run on behalf of this unit
+        self.queries: List[Tuple[str, float, int | None]] = []
+        self._stats_lock = Lock()
+
+    def record(self, query: str, duration: float, rows: int | None) -> None:
+        with self._stats_lock:
+            self.queries.append((query, duration, rows))
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def query_time(self) -> float:
+        with self._stats_lock:
+            return sum(duration for _, duration, _ in self.queries)
+
+    def connection(self) -> Connection:
+        if self.conn is None:
+            self.conn = self.pool.checkout()
+        return self.conn
+
+    def commit(self) -> None:
+        if self.conn is not None:
+            self.conn.commit()
+
+    def rollback(self) -> None:
+        if self.conn is not None:
+            self.conn.rollback()
+
+    def release(self) -> None:
+        if self.conn is not None:
+            self.pool.checkin(self.conn)
+            self.conn = None
+
+
+current_unit: ContextVar[UnitOfWork | None] = ContextVar("current_unit", default=None)
+
+
+def in_transaction() -> bool:
+    unit = current_unit.get()
+    return unit is not None and unit.depth > 0
+
+
+@contextmanager
+def get_db() -> Generator[Connection, None, None]:
+    """
+    Provides a database connection for the duration of the block: the connection pinned
+    to the current request if there is one, otherwise one checked out from the pool.
+    """
+    unit = current_unit.get()
+    if unit is not None and not unit.detached:
+        with unit.lock:
+            yield unit.connection()
+        return
+
+    conn = pool.checkout()
+    try:
+        yield conn
+    finally:
+        pool.checkin(conn)
+
+
+@contextmanager
+def transaction() -> Generator[UnitOfWork, None, None]:
+    """
+    Runs the enclosed queries as one atomic transaction on the current request's connection.
+    Commits when the block completes and rolls back if an exception escapes it; query errors
+    inside the block are raised instead of being turned into None. Nested blocks join the
+    outermost transaction.
+    """
+    unit = current_unit.get()
+    reset = None
+    if unit is None or unit.detached:
+        unit = UnitOfWork(pool)
+        reset = current_unit.set(unit)
+
+    try:
+        with unit.lock:
+            unit.depth += 1
+            try:
+                yield unit
+                if unit.depth == 1:
+                    unit.commit()
+            except BaseException:
+                if unit.depth == 1:
+                    unit.rollback()
+                raise
+            finally:
+                unit.depth -= 1
     finally:
-        if conn:
-            conn.close()
+        if reset is not None:
+            current_unit.reset(reset)
+            unit.release()
 
 
-def read_query(query: str, params: () = ()) -> List[Tuple] | None:
+class RequestConnectionMiddleware:
+    """
+    Pins one connection to each HTTP request. All of the request's queries run on it
+    until the response starts; then the connection goes back to the pool. Queries made
+    while the body is sent (streamed responses) check out a connection each.
+
+    A connection outlives the thread of the handler that checked it out, so the request
+    threads (capped at POOL_SIZE, see main.lifespan) must never all be stuck waiting for a
+    connection that only another request's thread could give back. Hence at most POOL_SIZE
+    requests are let in at a time, the others waiting on the event loop without holding a
+    thread, and connections are released on release_executor rather than a request thread.
+    A request holds its slot until its response starts, not until its body is sent.
+    Paths starting with one of the exempt prefixes take no slot and no pinned connection.
+    """
+
+    def __init__(self, app, slots: int = POOL_SIZE, exempt: Iterable[str] = ()):
+        self.app = app
+        self.slots = slots
+        self.exempt = tuple(exempt)
+        self._limiter: anyio.CapacityLimiter | None = None
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        # Created on first use: it needs a running event loop
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.slots)
+        return self._limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path", "").startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        await self.handle(scope, receive, send)
+
+    async def handle(self, scope, receive, send):
+        unit = UnitOfWork(pool)
+        # Borrowed on behalf of the request: a streamed response starts from another task
+        slot = object()
+        await self.limiter.acquire_on_behalf_of(slot)
+        holding = True
+
+        async def detach():
+            nonlocal holding
+            unit.detached = True
+            if unit.conn is not None:
+                await asyncio.get_running_loop().run_in_executor(get_release_executor(), unit.release)
+            if holding:
+                holding = False
+                self.limiter.release_on_behalf_of(slot)
+
+        async def send_detaching(message):
+            if message["type"] == "http.response.start":
+                if DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(unit.query_count).encode()))
+                    headers.append((b"x-db-time", f"{unit.query_time * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+                await detach()
+            await send(message)
+
+        reset = current_unit.set(unit)
+        try:
+            await self.app(scope, receive, send_detaching)
+        finally:
+            current_unit.reset(reset)
+            await detach()
+            logger.debug("%s %s: %d queries in %.1f ms", scope.get("method"), scope.get("path"),
+                         unit.query_count, unit.query_time * 1000)
+
+
+# Prepared cursors per connection: id(connection) -> (connection, {query: cursor})
+_statements: dict[int, Tuple[Connection, dict[str, Any]]] = {}
+
+
+def prepared_cursor(db: Connection, query: str) -> Any:
+    """
+    Returns a binary protocol cursor for the query on this connection. The statement is
+    prepared on first use and reused by later executions on the same connection.
+    """
+    entry = _statements.get(id(db))
+    if entry is None or entry[0] is not db:
+        entry = (db, {})
+        _statements[id(db)] = entry
+    cursors = entry[1]
+    cursor = cursors.get(query)
+    if cursor is None:
+        cursor = db.cursor(prepared=True)
+        cursors[query] = cursor
+    return cursor
+
+
+def forget_statements(db: Connection, query: str | None = None) -> None:
+    entry = _statements.get(id(db))
+    if entry is None or entry[0] is not db:
+        return
+    if query is None:
+        del _statements[id(db)]
+    else:
+        entry[1].pop(query, None)
+
+
+def record_query(query: str, duration: float, rows: int | None, unit: UnitOfWork | None = None) -> None:
+    """
+    Adds a finished statement to the request's query statistics and writes it to the
+    slow query log if it took longer than SLOW_QUERY_MS.
+    """
+    unit = unit or current_unit.get()
+    if unit is not None:
+        unit.record(query, duration, rows)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        statement = " ".join(query.split())
+        slow_query_logger.warning("slow query duration_ms=%.1f rows=%s statement=%s", duration * 1000, rows,
+                                  statement, extra={"duration_ms": round(duration * 1000, 3), "rows": rows,
+                                                    "statement": statement})
+
+
+def read_query(query: str, params: () = (), prepared: bool = False) -> List[Tuple] | None:
     """
     Executes a SQL query against the provided database connection.
     Returns the fetched results as a list of tuples or None if an error occurs.
+    Hot statements can pass prepared=True to reuse a server-side prepared statement
+    (binary protocol) on each connection instead of sending the SQL text every time.
     """
     with get_db() as db:
         cursor = None
         try:
-            cursor = db.cursor()
+            cursor = prepared_cursor(db, query) if prepared else db.cursor()
+            started = perf_counter()
             cursor.execute(query, params)
             data = cursor.fetchall()
+            record_query(query, perf_counter() - started, len(data))
             return data
         except Exception as e:
-            print(f"Error executing read query: {e}")
+            if prepared:
+                forget_statements(db, query)
+            if in_transaction():
+                raise
+            logger.error("Error executing read query: %s", e)
             return None
         finally:
-            if cursor:
+            if cursor and not prepared:
                 cursor.close()
 
 
@@ -57,11 +405,16 @@ def affect_query(qtype: int, query: str, params: ()) -> int | None:
         cursor = None
         try:
             cursor = db.cursor()
+            started = perf_counter()
             cursor.execute(query, params)
-            db.commit()
+            if not in_transaction():
+                db.commit()
+            record_query(query, perf_counter() - started, cursor.rowcount)
             return cursor.lastrowid if qtype == 0 else cursor.rowcount
         except Exception as e:
-            print(f"Error executing query: {e}")
+            if in_transaction():
+                raise
+            logger.error("Error executing query: %s", e)
             return None
         finally:
             if cursor:
@@ -70,7 +423,8 @@ def affect_query(qtype: int, query: str, params: ()) -> int | None:
 
 def insert_query(query: str, params: () = ()) -> int | None:
     """
-    Executes an insert SQL query and commits the transaction to the database.
+    Executes an insert SQL query and commits the transaction to the database
+    (inside transaction() the commit is left to the enclosing block).
     Returns the ID of the inserted row.
     """
     return affect_query(0, query, params)
@@ -78,7 +432,102 @@ def insert_query(query: str, params: () = ()) -> int | None:
 
 def update_query(query: str, params: () = ()) -> int | None:
     """
-    Executes an update query on the database and commits the transaction.
+    Executes an update query on the database and commits the transaction
+    (inside transaction() the commit is left to the enclosing block).
     Returns the number of affected rows.
     """
     return affect_query(1, query, params)
+
+
+def get_async_executor() -> ThreadPoolExecutor:
+    """
+    Returns the executor used by the async API, creating it on first use.
+    """
+    global async_executor
+    with _async_init_lock:
+        if async_executor is None:
+            async_executor = ThreadPoolExecutor(max_workers=ASYNC_POOL_SIZE, thread_name_prefix="forum_async_db")
+        return async_executor
+
+
+def get_release_executor() -> ThreadPoolExecutor:
+    """
+    Returns the executor that checks request connections back in, creating it on first use.
+    """
+    global release_executor
+    with _async_init_lock:
+        if release_executor is None:
+            release_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="forum_db_release")
+        return release_executor
+
+
+def _execute_on_async_pool(qtype: int | None, query: str, params: (), unit: UnitOfWork | None) -> Any:
+    """
+    Runs one statement on a connection of the async pool.
+    qtype None fetches rows, 0 returns the inserted ID and 1 the affected row count.
+    The statement is counted towards the unit of the request that awaited it.
+    """
+    db = async_pool.checkout()
+    cursor = None
+    try:
+        cursor = db.cursor()
+        started = perf_counter()
+        cursor.execute(query, params)
+        if qtype is None:
+            data = cursor.fetchall()
+            record_query(query, perf_counter() - started, len(data), unit)
+            return data
+        db.commit()
+        record_query(query, perf_counter() - started, cursor.rowcount, unit)
+        return cursor.lastrowid if qtype == 0 else cursor.rowcount
+    except Exception as e:
+        logger.error("Error executing async query: %s", e)
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        async_pool.checkin(db)
+
+
+async def _run_async(qtype: int | None, query: str, params: ()) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_async_executor(), _execute_on_async_pool, qtype, query, params,
+                                      current_unit.get())
+
+
+async def async_read_query(query: str, params: () = ()) -> List[Tuple] | None:
+    """
+    Awaitable version of read_query. Independent queries can run concurrently with asyncio.gather,
+    up to ASYNC_POOL_SIZE at a time.
+    """
+    return await _run_async(None, query, params)
+
+
+async def async_insert_query(query: str, params: () = ()) -> int | None:
+    """
+    Awaitable version of insert_query. Returns the ID of the inserted row.
+    """
+    return await _run_async(0, query, params)
+
+
+async def async_update_query(query: str, params: () = ()) -> int | None:
+    """
+    Awaitable version of update_query. Returns the number of affected rows.
+    """
+    return await _run_async(1, query, params)
+
+
+def warm_up() -> None:
+    """
+    Opens the connection pools at application startup so the first requests don't pay for it.
+    A database that is unreachable at startup is retried on first use instead.
+    """
+    for db_pool in (pool, async_pool):
+        try:
+            db_pool.warm_up()
+        except mariadb.Error as e:
+            logger.warning("Could not warm up %s: %s", db_pool.name, e)
+
+
+def pool_stats() -> List[dict]:
+    return [pool.stats(), async_pool.stats()]
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from typing import List
 
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -11,8 +13,24 @@ from routers.conversations import router as conversation_router
 from routers.topics import router as topics_router
 from routers.category import router as category_router
 from routers.replies import router as replies_router
+from routers.health import router as health_router
+from data.broker import broker
+from data.connection import POOL_SIZE, RequestConnectionMiddleware, warm_up
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Handlers are sync and run on the thread pool, one thread per pooled connection;
+    # RequestConnectionMiddleware queues excess requests before they take a thread
+    to_thread.current_default_thread_limiter().total_tokens = POOL_SIZE
+    await to_thread.run_sync(warm_up)
+    yield
+    broker.close()
+
+
+app = FastAPI(lifespan=lifespan)
+# Documentation pages don't query the database; /health reports on the pool and must not wait for it
+app.add_middleware(RequestConnectionMiddleware, exempt=("/docs", "/redoc", "/openapi.json", "/health"))
 
 # routers go here
 app.include_router(auth_router, prefix="/auth")
@@ -21,6 +39,7 @@ app.include_router(category_router, prefix="/categories")
 app.include_router(conversation_router, prefix="/conversations")
 app.include_router(topics_router, prefix="/topics")
 app.include_router(replies_router, prefix="/replies")
+app.include_router(health_router, prefix="/health")
 
 
 # Handle Pydantic exception validation error for frontend
@@ -1,6 +1,11 @@
 from datetime import datetime
+from typing import List
+
 from pydantic import BaseModel
 
+from models.message import Message
+from models.user import UserPublic
+
 
 class Conversation(BaseModel):
     id: int | None = None
@@ -13,3 +18,15 @@ class Conversation(BaseModel):
 class ConversationCreate(BaseModel):
     initiator_id: int
     receiver_id: int
+
+
+class InboxEntry(BaseModel):
+    conversation_id: int
+    partner: UserPublic
+    last_message: Message
+    unread_count: int = 0
+
+
+class Inbox(BaseModel):
+    conversations: List[InboxEntry]
+    next_cursor: int | None = None
@@ -13,6 +13,10 @@ class Reply(BaseModel):
     likes: int = 0
 
 
+class ReplyWithVote(Reply):
+    my_vote: int = 0
+
+
 class ReplyCreate(BaseModel):
     content: str
 
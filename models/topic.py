@@ -1,6 +1,10 @@
 from datetime import date
+from typing import List
+
 from pydantic import BaseModel
 
+from models.reply import ReplyWithVote
+
 
 class Topic(BaseModel):
     id: int
@@ -15,8 +19,36 @@ class Topic(BaseModel):
     locked: int = 0
 
 
+class TopicSummary(BaseModel):
+    """
+    A topic as listed (GET /topics/, GET /categories/{id}/topics): everything but its content.
+    """
+    id: int
+    name: str
+    date: date
+    category_id: int
+    category_name: str = "Error fetching category name"
+    user_id: int
+    user_name: str | None = None
+    replies_count: int = 0
+    locked: int = 0
+
+
+class TopicHeader(BaseModel):
+    id: int
+    category_id: int
+    user_id: int
+    locked: int = 0
+
+
 class TopicCreate(BaseModel):
     name: str
     content: str
     category_id: int
 
+
+class TopicPage(BaseModel):
+    topic: Topic
+    access_type: str
+    replies: List[ReplyWithVote]
+    next_cursor: int | None = None
@@ -18,6 +18,19 @@ class User(BaseModel):
         return self.admin > 0
 
 
+class TokenUser(BaseModel):
+    """
+    The user as described by the claims of an auth token, see AuthToken.claims.
+    """
+    id: int
+    username: str
+    admin: int = 0
+    special_permissions: dict[int, int] = {}
+
+    def is_admin(self):
+        return self.admin > 0
+
+
 class UserPublic(BaseModel):
     id: int | None
     username: str
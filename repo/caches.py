@@ -0,0 +1,44 @@
+"""
+Read-through caches of the entities read on almost every request, see ReadThroughCache.
+
+Every write in repo/* that changes one of these rows invalidates its entry; the TTL bounds
+how long a change made outside the API (or by another worker process) stays invisible.
+Sizes and TTLs can be set with CACHE_<ENTITY>_SIZE and CACHE_<ENTITY>_TTL (seconds).
+"""
+import os
+
+from data.cache import ReadThroughCache
+
+
+def entity_cache(name: str, maxsize: int, ttl: float) -> ReadThroughCache:
+    return ReadThroughCache(name,
+                            maxsize=int(os.getenv(f"CACHE_{name.upper()}_SIZE", maxsize)),
+                            ttl=float(os.getenv(f"CACHE_{name.upper()}_TTL", ttl)))
+
+
+# topic id -> Topic; replies_count changes with every reply, so entries live shortly
+topic_cache = entity_cache("topics", maxsize=2048, ttl=30)
+# category id -> Category
+category_cache = entity_cache("categories", maxsize=512, ttl=120)
+# (user id, variant) -> User, UserPublic or the raw row, see repo.user.get_user_by_id
+user_cache = entity_cache("users", maxsize=4096, ttl=60)
+
+ENTITY_CACHES = (topic_cache, category_cache, user_cache)
+# get_user_by_id caches the User, the UserPublic and the row separately
+USER_VARIANTS = ("user", "public", "row")
+
+
+def forget_topic(topic_id: int) -> None:
+    topic_cache.invalidate(topic_id)
+
+
+def forget_category(category_id: int) -> None:
+    category_cache.invalidate(category_id)
+
+
+def forget_user(user_id: int) -> None:
+    user_cache.invalidate(*[(user_id, variant) for variant in USER_VARIANTS])
+
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in ENTITY_CACHES]
@@ -1,12 +1,15 @@
 from typing import List, Tuple
 from models.category import Category, CategoryCreate
 from models.category_permission import PermissionTypeEnum
-from data.connection import read_query, insert_query, update_query
+from data.connection import read_query, insert_query, update_query, transaction
 from models.topic import Topic
 from models.user import User
 from services.errors import not_found, category_not_found, bad_request, internal_error, database_error
-from repo import topic as topics_repo
 from repo import user as user_repo
+from repo.caches import category_cache, forget_category
+from repo.permissions import permission_matrix
+
+CATEGORY_COLUMNS = "id, name, description, hidden, locked, topics_count"
 
 
 def gen_category(result: tuple) -> Category:
@@ -16,12 +19,12 @@ def gen_category(result: tuple) -> Category:
         description=result[2],
         hidden=result[3],
         locked=result[4],
-        topics_count=topics_repo.get_topics_count_by_category(result[0])
+        topics_count=result[5]
     )
 
 
 def get_all_categories() -> List[Category] | None:
-    query = "SELECT * FROM categories"
+    query = f"SELECT {CATEGORY_COLUMNS} FROM categories"
     result = read_query(query)
     if result:
         return [gen_category(row) for row in result]
@@ -31,7 +34,7 @@ def get_all_categories() -> List[Category] | None:
 def get_all_viewable_categories(user: User) -> List[Category]:
     viewable_ids = get_viewable_category_ids(user)
     viewable_ids = ", ".join([str(id) for id in viewable_ids])
-    query = f"SELECT * FROM categories WHERE id IN ({viewable_ids}) ORDER BY name ASC"
+    query = f"SELECT {CATEGORY_COLUMNS} FROM categories WHERE id IN ({viewable_ids}) ORDER BY name ASC"
     result = read_query(query)
     if not result:
         return []
@@ -39,91 +42,87 @@ def get_all_viewable_categories(user: User) -> List[Category]:
 
 
 def get_category_by_id(category_id: int) -> Category | None:
-    query = "SELECT * FROM categories WHERE id = ?"
+    """
+    Returns the category, from category_cache when it's there (the result is shared: don't modify it).
+    """
+    return category_cache.get_or_load(category_id, lambda: load_category(category_id))
+
+
+def load_category(category_id: int) -> Category | None:
+    query = f"SELECT {CATEGORY_COLUMNS} FROM categories WHERE id = ?"
     result = read_query(query, (category_id,))
     if result:
         return gen_category(result[0])
     return None
 
 
+def get_category_names_by_ids(category_ids: List[int]) -> dict[int, str]:
+    category_ids = list(set(category_ids))
+    if not category_ids:
+        return {}
+    placeholder = ", ".join(["?"] * len(category_ids))
+    query = f"SELECT id, name FROM categories WHERE id IN ({placeholder})"
+    result = read_query(query, tuple(category_ids))
+    return {row[0]: row[1] for row in result} if result else {}
+
+
 def create_category(data: CategoryCreate) -> int | None:
     query = "INSERT INTO categories (name, description) VALUES (?, ?)"
-    return insert_query(query, (data.name, data.description))
+    result = insert_query(query, (data.name, data.description))
+    permission_matrix.invalidate()
+    return result
 
 
 def check_category_write_permission(category_id: int, user: User) -> bool:
-    if user.is_admin():
-        return True
-
-    category = get_category_by_id(category_id)
-
-    if not category:
-        raise category_not_found
-
-    if category.hidden == 0:
-        return True
-    else:
-        perm = get_user_category_permission(category_id, user)
-        return perm >= 3
+    return permission_matrix.can_write(category_id, user)
 
 
 def check_category_read_permission(category_id: int, user: User) -> bool:
-    if user.is_admin():
-        return True
-
-    category = get_category_by_id(category_id)
-
-    if not category:
-        raise category_not_found
-
-    if category.hidden == 0:
-        return True
-    else:
-        perm = get_user_category_permission(category_id, user)
-
-        if perm == 0:
-            return False  # no permission at all
-
-        return perm >= 2
+    return permission_matrix.can_read(category_id, user)
 
 
 def get_viewable_category_ids(user: User) -> List[int]:
-    category_ids = get_all_category_ids()
-    return [
-        category_id
-        for category_id in category_ids
-        if check_category_read_permission(category_id, user)
-    ]
+    return permission_matrix.viewable_ids(user)
 
 
 def get_all_category_ids() -> List[int]:
-    query = "SELECT id FROM categories"
-    return [row[0] for row in read_query(query)]
+    return permission_matrix.category_ids()
 
 
 def get_user_category_permission(category_id: int, user: User) -> int:
+    # Users resolved by AuthToken already carry their permissions (from the DB or the token claims)
+    permissions = getattr(user, "special_permissions", None)
+    if isinstance(permissions, dict):
+        return permissions.get(category_id, 1)
     query = "SELECT type FROM category_permissions WHERE category_id = ? AND user_id = ?"
-    result = read_query(query, (category_id, user.id))
+    result = read_query(query, (category_id, user.id), prepared=True)
     return 1 if len(result) == 0 else result[0][0]  # 1 = Default
 
 
 def update_hidden_status(category_id: int, hidden: int) -> dict:
     query = "UPDATE categories SET hidden = ? WHERE id = ?"
     result = update_query(query, (hidden, category_id))
+    forget_category(category_id)
+    permission_matrix.invalidate()
     if result:
         return {"message": "Category hidden status updated successfully."}
     raise database_error
 
 
 def update_permissions(category_id: int, user_id: int, permission: int) -> dict:
-    query = "SELECT * FROM category_permissions WHERE category_id = ? AND user_id = ?"
-    result = read_query(query, (category_id, user_id))
-    if not result:
-        query = "INSERT INTO category_permissions (category_id, user_id, type) VALUES (?, ?, ?)"
-        result = insert_query(query, (category_id, user_id, permission))
-    else:
-        query = "UPDATE category_permissions SET type = ? WHERE category_id = ? AND user_id = ?"
-        result = update_query(query, (permission, category_id, user_id))
+    with transaction():
+        query = "SELECT 1 FROM category_permissions WHERE category_id = ? AND user_id = ? LIMIT 1"
+        result = read_query(query, (category_id, user_id))
+        if not result:
+            query = "INSERT INTO category_permissions (category_id, user_id, type) VALUES (?, ?, ?)"
+            result = insert_query(query, (category_id, user_id, permission))
+        else:
+            query = "UPDATE category_permissions SET type = ? WHERE category_id = ? AND user_id = ?"
+            result = update_query(query, (permission, category_id, user_id))
+        user_repo.bump_permission_version(user_id)
+    # Again after the commit: a read between the bump and the commit cached the old permissions
+    user_repo.forget_permissions(user_id)
+    permission_matrix.invalidate()
 
     if result > 0:
         return {"message": "Category permissions updated successfully."}
@@ -133,4 +132,5 @@ def update_permissions(category_id: int, user_id: int, permission: int) -> dict:
 def update_locked_status(category_id: int) -> dict:
     query = "UPDATE categories SET locked = 1 WHERE id = ?"
     result = update_query(query, (category_id,))
+    forget_category(category_id)
     return {"message": "Category locked status updated successfully."}
@@ -1,16 +1,20 @@
-from typing import List
+from typing import List, Tuple
 
-from models.conversation import Conversation, ConversationCreate
-from data.connection import read_query, insert_query
+from models.conversation import Conversation, ConversationCreate, InboxEntry
+from models.message import Message
+from models.user import UserPublic
+from data.connection import read_query, insert_query, update_query
+
+CONVERSATION_COLUMNS = "id, date, initiator_id, receiver_id, seen"
+# Conversations are unique per unordered pair of users: (user_low, user_high) are generated columns
+PAIR_CONDITION = "user_low = LEAST(?, ?) AND user_high = GREATEST(?, ?)"
+INBOX_PAGE_SIZE = 20
+MAX_INBOX_PAGE_SIZE = 100
 
 
 def conversation_exists(user_1_id: int, user_2_id: int) -> bool:
-    query = "SELECT * FROM conversations WHERE initiator_id = ? AND receiver_id = ?"
-    result = read_query(query, (user_1_id, user_2_id))
-    if result:
-        return True
-    query = "SELECT * FROM conversations WHERE initiator_id = ? AND receiver_id = ?"
-    result = read_query(query, (user_2_id, user_1_id))
+    query = f"SELECT 1 FROM conversations WHERE {PAIR_CONDITION} LIMIT 1"
+    result = read_query(query, (user_1_id, user_2_id) * 2)
     return True if result else False
 
 
@@ -25,7 +29,7 @@ def gen_conversation(result: tuple) -> Conversation:
 
 
 def get_all_conversations() -> List[Conversation] | None:
-    query = "SELECT * FROM conversations"
+    query = f"SELECT {CONVERSATION_COLUMNS} FROM conversations"
     result = read_query(query)
     if result:
         conversations = [gen_conversation(row) for row in result]
@@ -34,7 +38,7 @@ def get_all_conversations() -> List[Conversation] | None:
 
 
 def get_conversation_by_id(conversation_id: int) -> Conversation | None:
-    query = "SELECT * FROM conversations WHERE id = ?"
+    query = f"SELECT {CONVERSATION_COLUMNS} FROM conversations WHERE id = ?"
     result = read_query(query, (conversation_id,))
     if result:
         return gen_conversation(result[0])
@@ -42,18 +46,15 @@ def get_conversation_by_id(conversation_id: int) -> Conversation | None:
 
 
 def get_conversation_by_users(user_id: int, user_2_id: int) -> int | None:
-    query = "SELECT * FROM conversations WHERE initiator_id = ? AND receiver_id = ?"
-    result = read_query(query, (user_id, user_2_id))
-    if result:
-        return result[0][0]
-    result = read_query(query, (user_2_id, user_id))
+    query = f"SELECT id FROM conversations WHERE {PAIR_CONDITION} LIMIT 1"
+    result = read_query(query, (user_id, user_2_id) * 2)
     if result:
         return result[0][0]
     return None
 
 
 def get_conversations_by_user(user_id: int) -> List[Conversation] | None:
-    query = "SELECT * FROM conversations WHERE initiator_id = ? OR receiver_id = ? ORDER BY id DESC"
+    query = f"SELECT {CONVERSATION_COLUMNS} FROM conversations WHERE initiator_id = ? OR receiver_id = ? ORDER BY id DESC"
     result = read_query(query, (user_id, user_id))
     return [gen_conversation(row) for row in result]
 
@@ -69,13 +70,8 @@ def get_conversation_between_users(user1_id: int, user2_id: int) -> Conversation
     Returns:
         Conversation object if found, None otherwise
     """
-    query = """
-            SELECT *
-            FROM conversations
-            WHERE (initiator_id = ? AND receiver_id = ?)
-               OR (initiator_id = ? AND receiver_id = ?) \
-            """
-    result = read_query(query, (user1_id, user2_id, user2_id, user1_id))
+    query = f"SELECT {CONVERSATION_COLUMNS} FROM conversations WHERE {PAIR_CONDITION}"
+    result = read_query(query, (user1_id, user2_id) * 2)
     if result:
         return gen_conversation(result[0])
     return None
@@ -85,3 +81,103 @@ def create_conversation(initiator_id: int, receiver_id: int) -> int | None:
     query = "INSERT INTO conversations (initiator_id, receiver_id) VALUES (?, ?)"
     result = insert_query(query, (initiator_id, receiver_id))
     return result
+
+
+def get_or_create_conversation(initiator_id: int, receiver_id: int) -> int | None:
+    """
+    Returns the ID of the conversation between two users, creating it if there is none, in one
+    statement against the (user_low, user_high) unique key. The receiver is read in the same
+    statement, so nothing is created for a user that doesn't exist.
+    :param initiator_id: int id of the user starting the conversation
+    :param receiver_id: int id of the other user
+    :return: the conversation ID, None if the receiver doesn't exist
+    """
+    # LAST_INSERT_ID(id) makes an existing row's ID the statement's insert ID. users is in
+    # scope of the UPDATE clause as well, so its columns are qualified
+    query = """
+        INSERT INTO conversations (initiator_id, receiver_id)
+        SELECT ?, u.id FROM users u WHERE u.id = ?
+        ON DUPLICATE KEY UPDATE conversations.id = LAST_INSERT_ID(conversations.id)
+    """
+    result = insert_query(query, (initiator_id, receiver_id))
+    return result or None
+
+
+def set_last_message(conversation_id: int, message_id: int) -> int | None:
+    """
+    Moves a conversation to the top of both inboxes. Call in the transaction that stores the message.
+    :param conversation_id: int conversation id
+    :param message_id: int id of the newest message
+    :return: number of updated rows
+    """
+    query = "UPDATE conversations SET last_message_id = GREATEST(COALESCE(last_message_id, 0), ?) WHERE id = ?"
+    return update_query(query, (message_id, conversation_id))
+
+
+def mark_read(conversation_id: int, user_id: int, message_id: int) -> int | None:
+    """
+    Moves the read marker of one participant forward to the given message (never backwards).
+    :param conversation_id: int conversation id
+    :param user_id: int id of the participant who read the messages
+    :param message_id: int id of the newest message they have seen
+    :return: number of updated rows
+    """
+    query = """
+        UPDATE conversations
+        SET initiator_last_read_id = IF(initiator_id = ?, GREATEST(initiator_last_read_id, ?), initiator_last_read_id),
+            receiver_last_read_id = IF(receiver_id = ?, GREATEST(receiver_last_read_id, ?), receiver_last_read_id)
+        WHERE id = ?
+    """
+    return update_query(query, (user_id, message_id, user_id, message_id, conversation_id))
+
+
+def gen_inbox_entry(row: tuple) -> InboxEntry:
+    return InboxEntry(
+        conversation_id=row[0],
+        partner=UserPublic(id=row[2], username=row[3], avatar=row[4], creation_date=row[5], admin=row[6]),
+        last_message=Message(id=row[1], content=row[7], date=row[8], conversation_id=row[0], sender_id=row[9]),
+        unread_count=row[10]
+    )
+
+
+def get_inbox(user_id: int, before: int | None = None,
+              limit: int = INBOX_PAGE_SIZE) -> Tuple[List[InboxEntry], int | None]:
+    """
+    Returns a user's conversations, most recent activity first, with the partner's public profile,
+    the last message and the number of messages the user hasn't read, in one query.
+    Each side of the conversation (initiator, receiver) is read through its own
+    (user, last_message_id) index and only the page's rows are joined and counted.
+    :param user_id: int id of the inbox owner
+    :param before: cursor, the last_message_id of the last conversation of the previous page
+    :param limit: page size
+    :return: the conversations and the cursor of the next page (None on the last page)
+    """
+    activity = "last_message_id < ?" if before else "last_message_id IS NOT NULL"
+    cursor = (before,) if before else ()
+    query = f"""
+        SELECT c.id, c.last_message_id, u.id, u.username, u.avatar, u.creation_date, u.admin,
+               m.content, m.date, m.sender_id,
+               (SELECT COUNT(*) FROM messages unread
+                WHERE unread.conversation_id = c.id AND unread.id > c.last_read_id
+                  AND unread.sender_id <> ?) AS unread_count
+        FROM (
+            (SELECT id, receiver_id AS partner_id, last_message_id, initiator_last_read_id AS last_read_id
+             FROM conversations WHERE initiator_id = ? AND {activity}
+             ORDER BY last_message_id DESC LIMIT ?)
+            UNION ALL
+            (SELECT id, initiator_id, last_message_id, receiver_last_read_id
+             FROM conversations WHERE receiver_id = ? AND {activity}
+             ORDER BY last_message_id DESC LIMIT ?)
+        ) c
+        JOIN users u ON u.id = c.partner_id
+        JOIN messages m ON m.id = c.last_message_id AND m.conversation_id = c.id
+        ORDER BY c.last_message_id DESC
+        LIMIT ?
+    """
+    # One extra row tells whether another page follows
+    side = (user_id, *cursor, limit + 1)
+    result = read_query(query, (user_id, *side, *side, limit + 1))
+    entries = [gen_inbox_entry(row) for row in result or []]
+    if len(entries) > limit:
+        return entries[:limit], entries[limit - 1].last_message.id
+    return entries, None
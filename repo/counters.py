@@ -0,0 +1,51 @@
+"""
+Stored counters: categories.topics_count, topics.replies_count and replies.likes.
+
+They are maintained in the same transaction as the write that changes them (create_topic,
+add_reply_to_topic, set_reply_vote). Rows changed outside the API, e.g. deleted by hand or
+through ON DELETE CASCADE, leave them off; recompute them from the project root with:
+
+    python -m repo.counters
+    python -m repo.counters --only likes
+"""
+import argparse
+
+from data.connection import update_query
+from repo.caches import topic_cache, category_cache
+from repo.topic import topics_count_cache
+
+REBUILD_QUERIES = {
+    "topics_count": "UPDATE categories c "
+                    "SET c.topics_count = (SELECT COUNT(*) FROM topics t WHERE t.category_id = c.id)",
+    "replies_count": "UPDATE topics t "
+                     "SET t.replies_count = (SELECT COUNT(*) FROM replies r WHERE r.topic_id = t.id)",
+    "likes": "UPDATE replies r "
+             "SET r.likes = (SELECT COALESCE(SUM(v.type), 0) FROM votes v WHERE v.reply_id = r.id)",
+}
+
+
+def rebuild_counters(counters: list[str] | None = None) -> dict[str, int | None]:
+    """
+    Recomputes the stored counters in bulk, one statement (and commit) per counter.
+    :param counters: names from REBUILD_QUERIES, all of them by default
+    :return: dict mapping counter name to the number of rows that were corrected
+    """
+    corrected = {counter: update_query(REBUILD_QUERIES[counter]) for counter in counters or REBUILD_QUERIES}
+    # Cached topics and categories carry replies_count / topics_count, the page counts of
+    # GET /topics/ come from topic totals
+    topic_cache.clear()
+    category_cache.clear()
+    topics_count_cache.clear()
+    return corrected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", choices=list(REBUILD_QUERIES), help="counter to rebuild")
+    args = parser.parse_args()
+    for counter, corrected in rebuild_counters(args.only).items():
+        print(f"{counter}: {'failed' if corrected is None else f'{corrected} rows corrected'}")
+
+
+if __name__ == "__main__":
+    main()
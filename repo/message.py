@@ -1,7 +1,11 @@
 from typing import List
-from bs4 import BeautifulSoup
 from models.message import Message, MessageCreate
 from data.connection import read_query, insert_query
+from data.sanitizer import sanitize
+
+MESSAGE_COLUMNS = "id, content, date, conversation_id, sender_id"
+MESSAGES_PAGE_SIZE = 50
+MAX_MESSAGES_PAGE_SIZE = 200
 
 
 def gen_message(result: tuple) -> Message:
@@ -14,17 +18,42 @@ def gen_message(result: tuple) -> Message:
     )
 
 
-def get_messages_by_conversation(conversation_id: int) -> List[Message] | None:
-    query = "SELECT * FROM messages WHERE conversation_id = ? ORDER BY date ASC"
-    result = read_query(query, (conversation_id,))
+def get_messages_by_conversation(conversation_id: int, since_id: int | None = None,
+                                 before_id: int | None = None, limit: int | None = None) -> List[Message] | None:
+    """
+    Returns the messages of a conversation in ID (sending) order, read through the
+    (conversation_id, id) index.
+    :param conversation_id: int conversation id
+    :param since_id: only messages newer than this ID, the oldest of them first
+    :param before_id: only messages older than this ID, the newest `limit` of them
+    :param limit: at most this many messages; without since_id these are the latest ones
+    :return: list of messages, None if there are none
+    """
+    conditions, params = ["conversation_id = ?"], [conversation_id]
+    if since_id is not None:
+        conditions.append("id > ?")
+        params.append(since_id)
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+
+    # Without a lower bound a limited read takes the newest messages, walking the index backwards
+    newest_first = limit is not None and since_id is None
+    query = f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE {' AND '.join(conditions)} " \
+            f"ORDER BY id {'DESC' if newest_first else 'ASC'}"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    result = read_query(query, tuple(params))
     if result:
         messages = [gen_message(row) for row in result]
-        return messages
+        return messages[::-1] if newest_first else messages
     return None
 
 
 def get_message_by_id(message_id: int) -> Message | None:
-    query = "SELECT * FROM messages WHERE id = ?"
+    query = f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE id = ?"
     result = read_query(query, (message_id,))
     if result:
         return gen_message(result[0])
@@ -32,10 +61,7 @@ def get_message_by_id(message_id: int) -> Message | None:
 
 
 def create_message(data: MessageCreate, conversation_id: int, sender_id: int) -> int | None:
-    soup = BeautifulSoup(data.content, "html.parser")
-    for br in soup.find_all("br"):
-        br.replace_with("__BR__")
-    soup = soup.get_text().replace("__BR__", "<br />")
+    content = sanitize(data.content)
     query = "INSERT INTO messages (content, conversation_id, sender_id, receiver_id) VALUES (?, ?, ?, ?)"
-    result = insert_query(query, (soup, conversation_id, sender_id, data.receiver_id))
+    result = insert_query(query, (content, conversation_id, sender_id, data.receiver_id))
     return result
@@ -0,0 +1,99 @@
+from threading import Lock
+from time import monotonic
+from typing import List, NamedTuple
+
+from data.connection import read_query
+from models.user import User
+from services.errors import category_not_found, database_error
+
+DEFAULT_PERMISSION = 1
+
+
+class MatrixSnapshot(NamedTuple):
+    hidden: dict[int, int]  # category id -> hidden flag
+    permissions: dict[tuple[int, int], int]  # (category id, user id) -> permission type
+    loaded_at: float
+
+
+class PermissionMatrix:
+    """
+    Category visibility and per-user category permissions held in memory, so read/write checks
+    answer without querying the database. Both tables are loaded on first use and again after
+    invalidate(), or once the copy is older than max_age seconds (writes made by other worker
+    processes are only seen then).
+    """
+
+    def __init__(self, max_age: float = 60.0):
+        self.max_age = max_age
+        self._snapshot: MatrixSnapshot | None = None
+        self._generation = 0
+        self._lock = Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def snapshot(self) -> MatrixSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and monotonic() - snapshot.loaded_at < self.max_age:
+            return snapshot
+
+        with self._lock:
+            generation = self._generation
+        snapshot = self._load()
+        with self._lock:
+            # An invalidate() during the load may have missed the rows just read
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _load() -> MatrixSnapshot:
+        loaded_at = monotonic()
+        categories = read_query("SELECT id, hidden FROM categories")
+        permissions = read_query("SELECT category_id, user_id, type FROM category_permissions")
+        if categories is None or permissions is None:
+            raise database_error
+        return MatrixSnapshot(hidden={row[0]: row[1] for row in categories},
+                              permissions={(row[0], row[1]): row[2] for row in permissions},
+                              loaded_at=loaded_at)
+
+    def category_ids(self) -> List[int]:
+        return list(self.snapshot().hidden)
+
+    def permission(self, category_id: int, user_id: int) -> int:
+        return self.snapshot().permissions.get((category_id, user_id), DEFAULT_PERMISSION)
+
+    def can_read(self, category_id: int, user: User) -> bool:
+        return self._can_read(self.snapshot(), category_id, user)
+
+    def can_write(self, category_id: int, user: User) -> bool:
+        if user.is_admin():
+            return True
+        snapshot = self.snapshot()
+        if category_id not in snapshot.hidden:
+            raise category_not_found
+        if snapshot.hidden[category_id] == 0:
+            return True
+        return snapshot.permissions.get((category_id, user.id), DEFAULT_PERMISSION) >= 3
+
+    def viewable_ids(self, user: User) -> List[int]:
+        snapshot = self.snapshot()
+        return [category_id for category_id in snapshot.hidden if self._can_read(snapshot, category_id, user)]
+
+    @staticmethod
+    def _can_read(snapshot: MatrixSnapshot, category_id: int, user: User) -> bool:
+        if user.is_admin():
+            return True
+        if category_id not in snapshot.hidden:
+            raise category_not_found
+        if snapshot.hidden[category_id] == 0:
+            return True
+        perm = snapshot.permissions.get((category_id, user.id), DEFAULT_PERMISSION)
+        if perm == 0:
+            return False  # no permission at all
+        return perm >= 2
+
+
+permission_matrix = PermissionMatrix()
@@ -1,8 +1,23 @@
-from data.connection import read_query, update_query, insert_query
-from bs4 import BeautifulSoup
+from typing import Iterator, List, Tuple
+
+from data.connection import read_query, update_query, insert_query, async_read_query, transaction
+from data.sanitizer import sanitize
+from repo.caches import forget_topic
 from models.reply import Reply
 from models.user import User
-from repo.user import get_user_by_id
+
+REPLIES_PAGE_SIZE = 20
+MAX_REPLIES_PAGE_SIZE = 100
+# Replies read per query when streaming a whole thread
+STREAM_BATCH_SIZE = 500
+
+# Author name is resolved by the database, so loading N replies is one round trip.
+# likes is the vote total kept up to date by set_reply_vote (see repo.counters)
+REPLY_SELECT = """
+    SELECT r.id, r.content, r.date, r.topic_id, r.user_id, r.best_reply, u.username, r.likes
+    FROM replies r
+    JOIN users u ON u.id = r.user_id
+"""
 
 
 def gen_reply(reply: tuple) -> Reply:
@@ -12,28 +27,80 @@ def gen_reply(reply: tuple) -> Reply:
                  topic_id=reply[3],
                  user_id=reply[4],
                  best_reply=reply[5],
-                 user_name=get_user_by_id(reply[4]).username,
-                 likes=get_reply_votes(reply[0]))
+                 user_name=reply[6],
+                 likes=int(reply[7]))
+
+
+def load_replies(condition: str, params: tuple = (), order: str = "r.id ASC", limit: int | None = None) -> List[Reply]:
+    """
+    Loads replies together with their author name and vote total in a single query.
+    :param condition: SQL condition on the replies table (aliased as r)
+    :param params: query parameters for the condition
+    :param order: ORDER BY clause
+    :param limit: maximum number of replies, all by default
+    :return: List of Reply objects
+    """
+    if limit is not None:
+        params = (*params, limit)
+    result = read_query(reply_query(condition, order, limit is not None), params)
+    return [gen_reply(row) for row in result] if result else []
+
+
+def reply_query(condition: str, order: str = "r.id ASC", limit: bool = False) -> str:
+    query = f"{REPLY_SELECT} WHERE {condition} ORDER BY {order}"
+    return f"{query} LIMIT ?" if limit else query
+
+
+def topic_replies_condition(topic_id: int, after: int | None = None) -> Tuple[str, tuple]:
+    """
+    Condition selecting the replies of a topic that follow the reply ID cursor (if any).
+    """
+    if after is None:
+        return "r.topic_id = ?", (topic_id,)
+    return "r.topic_id = ? AND r.id > ?", (topic_id, after)
+
+
+def get_replies_page(topic_id: int, after: int | None = None,
+                     limit: int = REPLIES_PAGE_SIZE) -> Tuple[List[Reply], int | None]:
+    """
+    Returns up to limit replies of a topic in ID order, starting after the given reply ID.
+    :param topic_id: int topic id
+    :param after: cursor, the last reply ID of the previous page
+    :param limit: page size
+    :return: the replies and the cursor of the next page (None on the last page)
+    """
+    condition, params = topic_replies_condition(topic_id, after)
+    # One extra row tells whether another page follows
+    replies = load_replies(condition, params, limit=limit + 1)
+    if len(replies) > limit:
+        return replies[:limit], replies[limit - 1].id
+    return replies, None
 
 
 def get_reply_by_id(reply_id: int) -> Reply | None:
-    query = "SELECT * FROM replies WHERE id = ?"
-    result = read_query(query, (reply_id,))
-    return gen_reply(result[0]) if result else None
+    result = load_replies("r.id = ?", (reply_id,))
+    return result[0] if result else None
 
 
 def set_reply_vote(reply_id: int, user_id: int, vote: int) -> dict | None:
     if vote not in (-1, 0, 1):
         vote = 0
 
-    query = "SELECT * FROM votes WHERE reply_id = ? AND user_id = ?"
-    result = read_query(query, (reply_id, user_id))
-    if result:
-        query = "UPDATE votes SET type = ? WHERE reply_id = ? AND user_id = ?"
-        result = update_query(query, (vote, reply_id, user_id))
-    else:
-        query = "INSERT INTO votes (reply_id, user_id, type) VALUES (?, ?, ?)"
-        result = insert_query(query, (reply_id, user_id, vote))
+    with transaction():
+        # The reply row first: the upsert's foreign key check would only share-lock it, and two
+        # voters upgrading their shared locks for the likes update deadlock each other
+        query = "SELECT id FROM replies WHERE id = ? FOR UPDATE"
+        read_query(query, (reply_id,))
+        # One statement against the (reply_id, user_id) unique key, so concurrent votes can't
+        # insert duplicates. @previous_vote ends up holding the vote it replaced (0 if none).
+        query = """
+            INSERT INTO votes (reply_id, user_id, type) VALUES (?, ?, (@previous_vote := 0) + ?)
+            ON DUPLICATE KEY UPDATE type = VALUES(type) + 0 * (@previous_vote := type)
+        """
+        result = update_query(query, (reply_id, user_id, vote))
+        if result:
+            query = "UPDATE replies SET likes = likes + ? - @previous_vote WHERE id = ?"
+            update_query(query, (vote, reply_id))
 
     if result > 0:
         return {"message": "Vote updated successfully."}
@@ -42,42 +109,108 @@ def set_reply_vote(reply_id: int, user_id: int, vote: int) -> dict | None:
 
 
 def get_reply_votes(reply_id: int) -> int:
-    query = "SELECT type FROM votes WHERE reply_id = ?"
-    result = read_query(query, (reply_id,))
-    votes = [row[0] for row in result]
-    return sum(votes) if len(votes) > 0 else 0
+    query = "SELECT likes FROM replies WHERE id = ?"
+    result = read_query(query, (reply_id,), prepared=True)
+    return int(result[0][0]) if result else 0
 
 
 def add_reply_to_topic(content: str, topic_id: int, user_id: int) -> int | None:
-    soup = BeautifulSoup(content, "html.parser")
-    for br in soup.find_all("br"):
-        br.replace_with("__BR__")
-    soup = soup.get_text().replace("__BR__", "<br />")
-    query = "INSERT INTO replies (content, topic_id, user_id) VALUES (?, ?, ?)"
-    result = insert_query(query, (soup, topic_id, user_id))
+    content = sanitize(content)
+    with transaction():
+        # The counter first: it locks the topic row exclusively before the insert's foreign key
+        # check would share-lock it, so concurrent replies queue instead of deadlocking
+        query = "UPDATE topics SET replies_count = replies_count + 1 WHERE id = ?"
+        update_query(query, (topic_id,))
+        query = "INSERT INTO replies (content, topic_id, user_id) VALUES (?, ?, ?)"
+        result = insert_query(query, (content, topic_id, user_id))
+    forget_topic(topic_id)
     return result
 
 
 def set_reply_as_best(reply_id: int, topic_id: int) -> dict:
-    query = "SELECT * FROM replies WHERE topic_id = ? AND best_reply = 1"
-    result = read_query(query, (topic_id,))
-    if result:
+    with transaction():
         query = "UPDATE replies SET best_reply = 0 WHERE topic_id = ? AND best_reply = 1"
-        result = update_query(query, (topic_id,))
+        replaced = update_query(query, (topic_id,))
         query = "UPDATE replies SET best_reply = 1 WHERE id = ?"
-        result = update_query(query, (reply_id,))
-        return {"message": "Best reply changed successfully."}
+        update_query(query, (reply_id,))
 
-    query = "UPDATE replies SET best_reply = 1 WHERE id = ?"
-    result = update_query(query, (reply_id,))
+    if replaced:
+        return {"message": "Best reply changed successfully."}
     return {"message": "Reply set as best successfully."}
 
 
-def get_replies_in_topic(topic_id):
-    query = "SELECT * FROM replies WHERE topic_id = ? ORDER BY id ASC"
-    result = read_query(query, (topic_id,))
-    result = [gen_reply(row) for row in result]
-    return result
+def get_replies_in_topic(topic_id) -> List[Reply]:
+    return load_replies("r.topic_id = ?", (topic_id,))
+
+
+async def async_get_replies_in_topic(topic_id, after: int | None = None, limit: int | None = None) -> List[Reply]:
+    condition, params = topic_replies_condition(topic_id, after)
+    if limit is not None:
+        params = (*params, limit)
+    result = await async_read_query(reply_query(condition, limit=limit is not None), params)
+    return [gen_reply(row) for row in result] if result else []
+
+
+async def async_get_replies_page(topic_id: int, after: int | None = None,
+                                 limit: int = REPLIES_PAGE_SIZE) -> Tuple[List[Reply], int | None]:
+    """
+    Awaitable version of get_replies_page.
+    :return: the replies and the cursor of the next page (None on the last page)
+    """
+    # One extra row tells whether another page follows
+    replies = await async_get_replies_in_topic(topic_id, after=after, limit=limit + 1)
+    if len(replies) > limit:
+        return replies[:limit], replies[limit - 1].id
+    return replies, None
+
+
+def iter_replies_in_topic(topic_id: int, after: int | None = None,
+                          batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Reply]:
+    """
+    Yields every reply of a topic in ID order, reading batch_size rows per query, so only
+    one batch is held in memory however long the thread is.
+    :param topic_id: int topic id
+    :param after: cursor, start after this reply ID
+    :param batch_size: replies fetched per query
+    """
+    while True:
+        replies, after = get_replies_page(topic_id, after=after, limit=batch_size)
+        yield from replies
+        if after is None:
+            return
+
+
+def get_user_votes_in_topic(topic_id: int, user_id: int) -> dict[int, int]:
+    """
+    Returns the user's votes on every reply of a topic with one query.
+    :param topic_id: int topic id
+    :param user_id: int user id
+    :return: dict mapping reply ID to vote type; replies the user hasn't voted on are omitted
+    """
+    query = """
+        SELECT v.reply_id, v.type
+        FROM replies r
+        JOIN votes v ON v.reply_id = r.id AND v.user_id = ?
+        WHERE r.topic_id = ? AND v.type <> 0
+    """
+    result = read_query(query, (user_id, topic_id), prepared=True)
+    return {row[0]: row[1] for row in result} if result else {}
+
+
+def get_user_votes_for_replies(reply_ids: List[int], user_id: int) -> dict[int, int]:
+    """
+    Returns the user's votes on the given replies with one query on the (reply_id, user_id) index.
+    :param reply_ids: List of reply IDs
+    :param user_id: int user id
+    :return: dict mapping reply ID to vote type; replies the user hasn't voted on are omitted
+    """
+    reply_ids = list(set(reply_ids))
+    if not reply_ids:
+        return {}
+    placeholder = ", ".join(["?"] * len(reply_ids))
+    query = f"SELECT reply_id, type FROM votes WHERE user_id = ? AND reply_id IN ({placeholder}) AND type <> 0"
+    result = read_query(query, (user_id, *reply_ids))
+    return {row[0]: row[1] for row in result} if result else {}
 
 
 def get_user_vote(reply: Reply, user: User) -> dict:
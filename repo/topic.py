@@ -1,66 +1,109 @@
+import re
 from typing import List
-from bs4 import BeautifulSoup
 from models.reply import Reply
-from models.topic import Topic, TopicCreate
-from data.connection import read_query, insert_query, update_query
-from repo.replies import gen_reply
-from repo.user import get_user_by_id
+from models.topic import Topic, TopicCreate, TopicHeader, TopicSummary
+from data.cache import TTLCache
+from data.connection import read_query, insert_query, update_query, transaction
+from data.sanitizer import sanitize
+from repo.caches import topic_cache, forget_topic, forget_category
+from repo.replies import load_replies
+from repo.user import get_usernames_by_ids
 import repo.category as category_repo
 
+TOPIC_COLUMNS = "id, name, content, date, category_id, user_id, locked, replies_count"
+# Same row layout for lists, without reading the (mediumtext) content
+TOPIC_SUMMARY_COLUMNS = "id, name, NULL, date, category_id, user_id, locked, replies_count"
+TOPICS_PAGE_SIZE = 10
+FULLTEXT_MIN_WORD_LENGTH = 3  # InnoDB innodb_ft_min_token_size default
+topics_count_cache = TTLCache(maxsize=256, ttl=60)
+
 
 def gen_topic(result: tuple) -> Topic:
-    return Topic(
-        id=result[0],
-        name=result[1],
-        content=result[2],
-        date=result[3],
-        category_id=result[4],
-        category_name=category_repo.get_category_by_id(result[4]).name,
-        user_id=result[5],
-        user_name=get_user_by_id(result[5]).username if result[5] else None,
-        replies_count=len(get_replies_by_topic_id(result[0])),
-        locked=result[6])
+    return gen_topics([result])[0]
+
+
+def gen_topics(rows: List[tuple], summary: bool = False) -> List[Topic] | List[TopicSummary]:
+    """
+    Builds Topic objects for a whole result set, or TopicSummary objects for rows of
+    TOPIC_SUMMARY_COLUMNS. Category and author names are loaded in bulk, so the number
+    of queries does not grow with the number of rows.
+    """
+    if not rows:
+        return []
+
+    category_names = category_repo.get_category_names_by_ids([row[4] for row in rows])
+    user_names = get_usernames_by_ids([row[5] for row in rows if row[5]])
+
+    topics = []
+    for row in rows:
+        fields = dict(
+            id=row[0],
+            name=row[1],
+            date=row[3],
+            category_id=row[4],
+            category_name=category_names.get(row[4], "Error fetching category name"),
+            user_id=row[5],
+            user_name=user_names.get(row[5]),
+            replies_count=row[7],
+            locked=row[6])
+        topics.append(TopicSummary(**fields) if summary else Topic(content=row[2], **fields))
+    return topics
 
 
 def get_topic_by_id(topic_id: int) -> Topic | None:
-    query = "SELECT * FROM topics WHERE id = ?"
-    result = read_query(query, (topic_id,))
+    """
+    Returns the topic, from topic_cache when it's there (the result is shared: don't modify it).
+    """
+    return topic_cache.get_or_load(topic_id, lambda: load_topic(topic_id))
+
+
+def load_topic(topic_id: int) -> Topic | None:
+    query = f"SELECT {TOPIC_COLUMNS} FROM topics WHERE id = ?"
+    result = read_query(query, (topic_id,), prepared=True)
     if result:
         return gen_topic(result[0])
     return None
 
 
-def get_topics_by_category(category_id: int) -> List[Topic] | None:
-    query = "SELECT * FROM topics WHERE category_id = ? ORDER BY date DESC"
-    result = read_query(query, (category_id,))
+def get_topic_header(topic_id: int) -> TopicHeader | None:
+    """
+    Returns only the columns write paths check (category, author, locked flag), with a
+    single primary key lookup and none of the hydration done by get_topic_by_id.
+    """
+    query = "SELECT id, category_id, user_id, locked FROM topics WHERE id = ?"
+    result = read_query(query, (topic_id,), prepared=True)
     if result:
-        topics = [gen_topic(row) for row in result]
-        return topics
+        row = result[0]
+        return TopicHeader(id=row[0], category_id=row[1], user_id=row[2], locked=row[3])
     return None
 
 
-def get_topics_count_by_category(category_id: int) -> int:
-    query = "SELECT COUNT(*) FROM topics WHERE category_id = ?"
+def get_topics_by_category(category_id: int) -> List[TopicSummary] | None:
+    query = f"SELECT {TOPIC_SUMMARY_COLUMNS} FROM topics WHERE category_id = ? ORDER BY date DESC"
     result = read_query(query, (category_id,))
     if result:
-        return result[0][0]
-    return 0
+        return gen_topics(result, summary=True)
+    return None
 
 
 def create_topic(data: TopicCreate, user_id: int) -> int | None:
-    soup = BeautifulSoup(data.content, "html.parser")
-    for br in soup.find_all("br"):
-        br.replace_with("__BR__")
-    soup = soup.get_text().replace("__BR__", "<br />")
-    query = "INSERT INTO topics (name, content, category_id, user_id) VALUES (?, ?, ?, ?)"
-    result = insert_query(query, (data.name, soup, data.category_id, user_id))
+    content = sanitize(data.content)
+    with transaction():
+        # Locks the category row before the insert's foreign key check, see add_reply_to_topic
+        query = "UPDATE categories SET topics_count = topics_count + 1 WHERE id = ?"
+        update_query(query, (data.category_id,))
+        query = "INSERT INTO topics (name, content, category_id, user_id) VALUES (?, ?, ?, ?)"
+        result = insert_query(query, (data.name, content, data.category_id, user_id))
+    forget_category(data.category_id)
+    if result:
+        topics_count_cache.clear()
     return result
 
 
 def get_all_topics() -> dict:
-    query = "SELECT * FROM topics"
+    query = f"SELECT {TOPIC_SUMMARY_COLUMNS} FROM topics"
     result = read_query(query)
-    topics = [gen_topic(row) for row in result]
+    topics = gen_topics(result, summary=True)
     pages = len(topics) // 10 + 1
     return {"pages": pages, "topics": topics}
 
@@ -68,54 +111,141 @@ def get_all_topics() -> dict:
 def get_topics(search: str = None,
                sort: str = "DESC",
                page: int = 0,
-               category_ids: list = None) -> dict | None:
+               category_ids: list = None,
+               after: int = None,
+               before: int = None) -> dict | None:
+    """
+    Get a page of topics with optional search and category filtering.
+
+    Searches go through the FULLTEXT index on name and content and are ordered by
+    relevance; search terms too short for the index fall back to a name LIKE.
+
+    Pages are addressed either by page number (LIMIT/OFFSET) or, when `after` or
+    `before` is given, by a cursor: the topic ID from the `next_cursor` or
+    `prev_cursor` of a previous response. Cursor pages are located through the
+    primary key, so deep pages cost the same as the first one.
+
+    Args:
+        search: Optional search keywords to filter topics by name and content
+        sort: "ASC" or "DESC" order of topic IDs
+        page: Page number, used when no cursor is given
+        category_ids: IDs of the categories to list topics from
+        after: Return the page following this topic ID
+        before: Return the page preceding this topic ID
+
+    Returns:
+        dict with the (possibly cached) page count, the topics (TopicSummary, without
+        content) and the cursors of the neighbouring pages
+    """
     params = []
+    conditions = []
     if isinstance(sort, str):
         sort = sort.lower()
     else:
         sort = "desc"
+    descending = sort != "asc"
 
-    # Base query for counting total topics
-    count_query = "SELECT COUNT(*) FROM topics"
-    select_query = "SELECT * FROM topics"
     if category_ids and len(category_ids) > 0:
         placeholder = ", ".join(["?"] * len(category_ids))
-        count_query += f" WHERE category_id IN ({placeholder})"
-        select_query += f" WHERE category_id IN ({placeholder})"
+        conditions.append(f"category_id IN ({placeholder})")
         params.extend(category_ids)
 
+    ranking = None
     if search:
         search = search.replace("+", " ")
-        if "WHERE" in count_query:
-            count_query += " AND name LIKE ?"
-            select_query += " AND name LIKE ?"
+        ranking = fulltext_terms(search)
+        if ranking:
+            conditions.append("MATCH(name, content) AGAINST (? IN BOOLEAN MODE)")
+            params.append(ranking)
         else:
-            count_query += " WHERE name LIKE ?"
-            select_query += " WHERE name LIKE ?"
-        params.append(f"%{search}%")
+            conditions.append("name LIKE ?")
+            params.append(f"%{search}%")
+
+    total_topics = count_topics(conditions, params)
 
-    # Execute count query to get total number of topics
-    count_params = params.copy()
-    total_topics = read_query(count_query, tuple(count_params))[0][0]
+    # Ranked results have no stable id order to seek on, they are paged by number
+    if ranking:
+        after = before = None
 
-    # Add sorting to select query
-    if sort == "asc":
-        select_query += " ORDER BY id ASC"
+    # Cursor conditions only narrow the page, they are not part of the total
+    backwards = after is None and before is not None
+    if after is not None:
+        conditions.append("id < ?" if descending else "id > ?")
+        params.append(after)
+    elif before is not None:
+        conditions.append("id > ?" if descending else "id < ?")
+        params.append(before)
+
+    select_query = f"SELECT {TOPIC_SUMMARY_COLUMNS} FROM topics"
+    if conditions:
+        select_query += " WHERE " + " AND ".join(conditions)
+    if ranking:
+        select_query += " ORDER BY MATCH(name, content) AGAINST (? IN BOOLEAN MODE) DESC, id DESC"
+        params.append(ranking)
+    else:
+        select_query += " ORDER BY id DESC" if descending != backwards else " ORDER BY id ASC"
+
+    # One extra row tells whether another page follows
+    limit = TOPICS_PAGE_SIZE
+    if after is not None or before is not None:
+        select_query += " LIMIT ?"
+        params.append(limit + 1)
     else:
-        select_query += " ORDER BY id DESC"
+        select_query += " LIMIT ? OFFSET ?"
+        params.extend([limit + 1, page * limit])
 
-    # Add pagination
-    limit = 10
-    offset = page * limit
-    select_query += " LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
+    result = read_query(select_query, tuple(params)) or []
+    has_more = len(result) > limit
+    result = list(result[:limit])
+    if backwards:
+        result.reverse()
 
-    result = read_query(select_query, tuple(params))
-    topics = [gen_topic(row) for row in result] if result else []
+    topics = gen_topics(result, summary=True)
+    first_id = topics[0].id if topics else None
+    last_id = topics[-1].id if topics else None
+
+    if ranking:
+        next_cursor = prev_cursor = None
+    elif backwards:
+        next_cursor = last_id
+        prev_cursor = first_id if has_more else None
+    else:
+        next_cursor = last_id if has_more else None
+        prev_cursor = first_id if after is not None or page > 0 else None
 
     total_pages = total_topics // limit + 1
 
-    return {"pages": total_pages, "topics": topics}
+    return {"pages": total_pages, "topics": topics, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+def fulltext_terms(search: str) -> str | None:
+    """
+    Turns free text from the search box into a boolean mode FULLTEXT query in which
+    every word is required and may be a prefix (so partially typed words match).
+    Operators typed by the user are dropped, words shorter than the index's minimum
+    token size are skipped.
+
+    Returns:
+        The query string or None if no word can be matched through the index
+    """
+    words = [word for word in re.findall(r"\w+", search) if len(word) >= FULLTEXT_MIN_WORD_LENGTH]
+    return " ".join(f"+{word}*" for word in words) if words else None
+
+
+def count_topics(conditions: List[str], params: list) -> int:
+    """
+    Counts the topics matching the given conditions. Counts are cached for a short
+    time since they only feed the page count and a full COUNT(*) grows with the table.
+    """
+    key = (tuple(conditions), tuple(params))
+    total = topics_count_cache.get(key)
+    if total is None:
+        count_query = "SELECT COUNT(*) FROM topics"
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        total = read_query(count_query, tuple(params))[0][0]
+        topics_count_cache.set(key, total)
+    return total
 
 
 def get_replies_by_topic_id(topic_id: int) -> list[Reply]:
@@ -128,18 +258,17 @@ def get_replies_by_topic_id(topic_id: int) -> list[Reply]:
     Returns:
         List of Reply objects
     """
-    query = "SELECT * FROM replies WHERE topic_id = ? ORDER BY date ASC"
-    results = read_query(query, (topic_id,))
-    return [gen_reply(reply) for reply in results] if results else []
+    return load_replies("r.topic_id = ?", (topic_id,), order="r.date ASC")
 
 
-def get_topics_in_category(category_id) -> List[Topic] | []:
-    query = "SELECT * FROM topics WHERE category_id = ? ORDER BY id DESC"
+def get_topics_in_category(category_id) -> List[TopicSummary]:
+    query = f"SELECT {TOPIC_SUMMARY_COLUMNS} FROM topics WHERE category_id = ? ORDER BY id DESC"
     result = read_query(query, (category_id,))
-    return [gen_topic(row) for row in result] if result else []
+    return gen_topics(result, summary=True) if result else []
 
 
 def lock_topic(topic_id) -> int:
     query = "UPDATE topics SET locked = 1 WHERE id = ?"
     result = update_query(query, (topic_id,))
+    forget_topic(topic_id)
     return result
@@ -4,9 +4,27 @@ from models.auth_model import UserCreate
 from models.category import PrivilegedUser
 from models.message import Message
 from models.user import User, UserPublic
+from data.cache import TTLCache
 from data.connection import read_query, insert_query, update_query
+from repo.caches import user_cache, forget_user
 from services.errors import not_found
 
+USER_COLUMNS = "id, username, password, email, birthday, avatar, admin, creation_date"
+
+# Users resolved from auth tokens: (token, public) -> User | UserPublic, see AuthToken.validate
+authenticated_users = TTLCache(maxsize=4096, ttl=60)
+# user id -> users.permission_version, compared against the "pv" claim of auth tokens
+permission_versions = TTLCache(maxsize=4096, ttl=30)
+
+
+def forget_authenticated_user(user_id: int) -> None:
+    """
+    Drops the cached authenticated copies of a user. Call after any change to the
+    user's row (avatar, admin flag) or category permissions.
+    :param user_id: int user id
+    """
+    authenticated_users.pop_where(lambda user: user.id == user_id)
+
 
 def gen_user(result: tuple, public: bool = False) -> User | UserPublic:
     return User(
@@ -33,7 +51,7 @@ def get_all_users() -> List[User]:
     Returns all users if the requester is an admin and authenticated, non-public user data
     :return: User list
     """
-    query = "SELECT * FROM users"
+    query = f"SELECT {USER_COLUMNS} FROM users"
     result = read_query(query)
     users = [gen_user(row) for row in result]
     return users
@@ -47,9 +65,14 @@ def get_user_by_id(user_id: int,
     :param user_id: int user id
     :param public: bool should private data be exposed
     :param tup: bool should the result be a tuple
-    :return: User, UserPublic, tuple or None
+    :return: User, UserPublic, tuple or None (cached in user_cache and shared: don't modify it)
     """
-    query = "SELECT * FROM users WHERE id = ?"
+    variant = "row" if tup else "public" if public else "user"
+    return user_cache.get_or_load((user_id, variant), lambda: load_user(user_id, public, tup))
+
+
+def load_user(user_id: int, public: bool = False, tup: bool = False) -> User | UserPublic | tuple | None:
+    query = f"SELECT {USER_COLUMNS} FROM users WHERE id = ?"
     result = read_query(query, (user_id,))
     if result:
         return gen_user(result[0], public) if not tup else result[0]
@@ -63,8 +86,8 @@ def get_user_by_username(username: str, public: bool = False) -> User | None:
     :param public: bool should private data be exposed
     :return: User, UserPublic or None
     """
-    query = "SELECT * FROM users WHERE username = ?"
-    result = read_query(query, (username,))
+    query = f"SELECT {USER_COLUMNS} FROM users WHERE username = ?"
+    result = read_query(query, (username,), prepared=True)
     if result:
         return gen_user(result[0], public)
     else:
@@ -78,7 +101,7 @@ def get_user_by_email(email: str, public: bool = False) -> User | None:
     :param public: bool should private data be exposed
     :return: User, UserPublic or None
     """
-    query = "SELECT * FROM users WHERE email = ?"
+    query = f"SELECT {USER_COLUMNS} FROM users WHERE email = ?"
     result = read_query(query, (email,))
     if result:
         return gen_user(result[0], public)
@@ -94,7 +117,7 @@ def user_exists(data: ()) -> bool:
     :param data: tuple containing username and email
     :return: bool indicating if the user exists in the database
     """
-    query = "SELECT * FROM users WHERE username = ? OR email = ?"
+    query = "SELECT 1 FROM users WHERE username = ? OR email = ? LIMIT 1"
     result = read_query(query, data)
     return True if result else False
 
@@ -124,6 +147,21 @@ def get_users_in_list_by_id(lst: List[int], public: bool = False) -> List[User]
     return [get_user_by_id(user_id, public) for user_id in lst]
 
 
+def get_usernames_by_ids(user_ids: List[int]) -> dict[int, str]:
+    """
+    Resolves the usernames of several users with a single query
+    :param user_ids: List of user IDs
+    :return: dict mapping user ID to username
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    placeholder = ", ".join(["?"] * len(user_ids))
+    query = f"SELECT id, username FROM users WHERE id IN ({placeholder})"
+    result = read_query(query, tuple(user_ids))
+    return {row[0]: row[1] for row in result} if result else {}
+
+
 def get_users_with_permissions_for_category(category_id) -> list[PrivilegedUser]:
     query = "SELECT user_id, type FROM category_permissions WHERE category_id = ? AND (type > 1 OR type < 1)"
     result = read_query(query, (category_id,))
@@ -143,8 +181,49 @@ def get_user_category_permissions(user_id: int) -> dict[int, int]:
     return data
 
 
+def get_permission_version(user_id: int) -> int | None:
+    """
+    Returns the user's permission version, which changes whenever the user's admin flag or
+    category permissions do. Tokens issued with an older version must not be trusted.
+    :param user_id: int user id
+    :return: int version or None if the user doesn't exist
+    """
+    version = permission_versions.get(user_id)
+    if version is None:
+        query = "SELECT permission_version FROM users WHERE id = ?"
+        result = read_query(query, (user_id,), prepared=True)
+        if not result:
+            return None
+        version = result[0][0]
+        permission_versions.set(user_id, version)
+    return version
+
+
+def bump_permission_version(user_id: int) -> None:
+    """
+    Invalidates the permission claims of every token issued to the user so far.
+    Inside a transaction, call forget_permissions again once it has committed.
+    :param user_id: int user id
+    """
+    query = "UPDATE users SET permission_version = permission_version + 1 WHERE id = ?"
+    update_query(query, (user_id,))
+    forget_permissions(user_id)
+
+
+def forget_permissions(user_id: int) -> None:
+    """
+    Drops the cached permission version and the cached copies of a user. Until a permission
+    change commits, readers still see and cache the old version and permissions, so a change
+    made in a transaction needs this once more after the commit.
+    :param user_id: int user id
+    """
+    permission_versions.pop(user_id)
+    forget_authenticated_user(user_id)
+    forget_user(user_id)
+
+
 def get_last_message_between(user: User, user2: User) -> Message:
-    query = "SELECT * FROM messages WHERE (sender_id = ? AND receiver_id = ?) OR (sender_id = ? AND receiver_id = ?) ORDER BY id DESC LIMIT 1"
+    query = "SELECT id, content, date, conversation_id, sender_id FROM messages WHERE (sender_id = ? AND receiver_id = ?) OR (sender_id = ? AND receiver_id = ?) ORDER BY id DESC LIMIT 1"
     result = read_query(query, (user.id, user2.id, user2.id, user.id))
     if result:
         result = result[0]
@@ -172,4 +251,6 @@ def get_users_in_conversation(conversation_id: int):
 def set_user_avatar(user: User, link: str):
     query = "UPDATE users SET avatar = ? WHERE id = ?"
     result = update_query(query, (link, user.id))
+    forget_authenticated_user(user.id)
+    forget_user(user.id)
     return result
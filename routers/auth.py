@@ -6,7 +6,7 @@ router = APIRouter(tags=["auth"])
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(user_data: UserLogin) -> LoginResponse:
+def login(user_data: UserLogin) -> LoginResponse:
     """
     Authenticate a user with the provided credentials.
 
@@ -24,7 +24,7 @@ async def login(user_data: UserLogin) -> LoginResponse:
 
 
 @router.post("/register", response_model=RegisterResponse)
-async def register(user_data: UserCreate) -> RegisterResponse:
+def register(user_data: UserCreate) -> RegisterResponse:
     """
     Register a new user with the provided information.
 
@@ -2,7 +2,7 @@ from typing import List
 from fastapi import APIRouter, Header
 
 from models.category import Category, CategoryCreate, UpdateHiddenStatus, UpdateUserPermission, PrivilegedUser
-from models.topic import Topic
+from models.topic import TopicSummary
 from services.category import CategoryService
 from services.user import UserService
 
@@ -10,7 +10,7 @@ router = APIRouter(tags=["categories"])
 
 
 @router.get("/", response_model=List[Category])
-async def get_all_categories(token: str = Header(..., alias="Authorization")) -> List[Category]:
+def get_all_categories(token: str = Header(..., alias="Authorization")) -> List[Category]:
     """
     Retrieve a list of all available categories.
 
@@ -28,8 +28,8 @@ async def get_all_categories(token: str = Header(..., alias="Authorization")) ->
 
 
 @router.get("/{category_id}", response_model=Category)
-async def get_category_by_id(category_id: int,
-                             token: str = Header(..., alias="Authorization")) -> Category:
+def get_category_by_id(category_id: int,
+                       token: str = Header(..., alias="Authorization")) -> Category:
     """
     Retrieve a category by its unique ID.
 
@@ -48,9 +48,9 @@ async def get_category_by_id(category_id: int,
     return CategoryService.get_by_id(category_id, token)
 
 
-@router.get("/{category_id}/topics", response_model=List[Topic])
-async def get_topics_by_category(category_id: int,
-                                 token: str = Header(..., alias="Authorization")) -> List[Topic]:
+@router.get("/{category_id}/topics", response_model=List[TopicSummary])
+def get_topics_by_category(category_id: int,
+                           token: str = Header(..., alias="Authorization")) -> List[TopicSummary]:
     """
     Retrieve a list of topics associated with a specific category.
 
@@ -63,15 +63,15 @@ async def get_topics_by_category(category_id: int,
 
     Returns
     -------
-    List[Topic]
-        A list of topics under the specified category.
+    List[TopicSummary]
+        The topics under the specified category, without their content.
     """
     return CategoryService.get_topics_by_category_id(category_id, token)
 
 
 @router.post("/add", response_model=int)
-async def create_category(data: CategoryCreate,
-                          token: str = Header(..., alias="Authorization")) -> int:
+def create_category(data: CategoryCreate,
+                    token: str = Header(..., alias="Authorization")) -> int:
     """
     Create a new category with the given details.
 
@@ -91,8 +91,8 @@ async def create_category(data: CategoryCreate,
 
 
 @router.put("/hide-status", response_model=dict)
-async def update_hide_status(data: UpdateHiddenStatus,
-                             token: str = Header(..., alias="Authorization")) -> dict:
+def update_hide_status(data: UpdateHiddenStatus,
+                       token: str = Header(..., alias="Authorization")) -> dict:
     """
     Update the visibility (hidden status) of a category.
 
@@ -112,8 +112,8 @@ async def update_hide_status(data: UpdateHiddenStatus,
 
 
 @router.put("/user-permissions", response_model=dict)
-async def update_user_permissions(data: UpdateUserPermission,
-                                  token: str = Header(..., alias="Authorization")) -> dict:
+def update_user_permissions(data: UpdateUserPermission,
+                            token: str = Header(..., alias="Authorization")) -> dict:
     """
     Update a user's permission level for a specific category.
 
@@ -134,8 +134,8 @@ async def update_user_permissions(data: UpdateUserPermission,
 
 
 @router.get("/{category_id}/privileged-users", response_model=List[PrivilegedUser])
-async def get_users_with_view_or_read_perms(category_id: int,
-                                            token: str = Header(..., alias="Authorization")) -> List[PrivilegedUser]:
+def get_users_with_view_or_read_perms(category_id: int,
+                                      token: str = Header(..., alias="Authorization")) -> List[PrivilegedUser]:
     """
     Retrieve users who have read or write permissions for a given category.
 
@@ -155,8 +155,8 @@ async def get_users_with_view_or_read_perms(category_id: int,
 
 
 @router.get("/{category_id}/check-permission")
-async def check_authenticated_user_category_permission(category_id: int,
-                                                       token: str = Header(..., alias="Authorization")):
+def check_authenticated_user_category_permission(category_id: int,
+                                                 token: str = Header(..., alias="Authorization")):
     """
     Check the permission level (read/write) of the authenticated user for a category.
 
@@ -176,8 +176,8 @@ async def check_authenticated_user_category_permission(category_id: int,
 
 
 @router.put("/{category_id}/lock", response_model=dict)
-async def lock_category(category_id: int,
-                        token: str = Header(..., alias="Authorization")) -> dict:
+def lock_category(category_id: int,
+                  token: str = Header(..., alias="Authorization")) -> dict:
     """
     Locks a category specified by the `category_id`.
 
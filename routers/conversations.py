@@ -1,5 +1,7 @@
+import asyncio
 from typing import List
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect, status
+from models.conversation import Inbox
 from models.message import MessageCreate, Message
 from models.user import UserPublic
 from services.conversations import ConversationsService
@@ -8,7 +10,7 @@ router = APIRouter(tags=["conversations"])
 
 
 @router.get("/")
-async def get_all_conversations(token: str = Header(..., alias="Authorization")) -> List[UserPublic]:
+def get_all_conversations(token: str = Header(..., alias="Authorization")) -> List[UserPublic]:
     """
     Retrieve all users the authenticated user has had conversations with.
 
@@ -25,9 +27,83 @@ async def get_all_conversations(token: str = Header(..., alias="Authorization"))
     return ConversationsService.get_conversations(token)
 
 
+@router.get("/inbox", response_model=Inbox)
+def get_inbox(token: str = Header(..., alias="Authorization"),
+              before: int = None,
+              limit: int = 20) -> Inbox:
+    """
+    Retrieve the authenticated user's conversations, most recent activity first.
+
+    Parameters
+    ----------
+    token : str
+        Authentication token of the requesting user.
+    before : int, optional
+        Cursor from `next_cursor` of a previous response; returns the following conversations.
+    limit : int, default=20
+        Number of conversations per page (at most 100).
+
+    Returns
+    -------
+    Inbox
+        For each conversation the partner's public profile, the last message and the number of
+        unread messages, plus the cursor of the next page.
+    """
+    return ConversationsService.get_inbox(token, before=before, limit=limit)
+
+
+@router.websocket("/stream")
+async def stream_messages(websocket: WebSocket,
+                          authorization: str = Header(None),
+                          token: str = None):
+    """
+    Push new messages to the authenticated user instead of polling.
+
+    Parameters
+    ----------
+    authorization : str
+        Authentication token. Browsers can't set headers on a WebSocket, so the `token`
+        query parameter is accepted as well.
+
+    Sends
+    -----
+    dict
+        `{"type": "message", "message": Message}` for every message sent to or by the user
+        while connected. The connection is closed with code 1008 if the token is invalid.
+    """
+    try:
+        subscription = await ConversationsService.open_stream(authorization or token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    with subscription:
+        await websocket.accept()
+        # Watch the client side too, so a closed connection is noticed without waiting for a message
+        received = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                event = asyncio.ensure_future(subscription.get())
+                await asyncio.wait((event, received), return_when=asyncio.FIRST_COMPLETED)
+                if received.done():
+                    if received.result()["type"] == "websocket.disconnect":
+                        event.cancel()
+                        break
+                    # Anything the client sends is ignored
+                    received = asyncio.ensure_future(websocket.receive())
+                if not event.done():
+                    event.cancel()
+                    continue
+                await websocket.send_json(event.result())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            received.cancel()
+
+
 @router.get("/last-message/{user_id}", response_model=Message)
-async def get_last_message(user_id: int,
-                           token: str = Header(..., alias="Authorization")) -> Message:
+def get_last_message(user_id: int,
+                     token: str = Header(..., alias="Authorization")) -> Message:
     """
     Gets the last message in the conversation between a user and authenticated user.
 
@@ -47,7 +123,7 @@ async def get_last_message(user_id: int,
 
 
 @router.post("/messages/")
-async def send_message(message: MessageCreate, token: str = Header(..., alias="Authorization")):
+def send_message(message: MessageCreate, token: str = Header(..., alias="Authorization")):
     """
     Send a message to another user. Starts a new conversation if one does not exist.
 
@@ -67,10 +143,13 @@ async def send_message(message: MessageCreate, token: str = Header(..., alias="A
 
 
 @router.get("/{conversation_id}", response_model=List[Message])
-async def get_conversation_messages(conversation_id: int,
-                                    token: str = Header(..., alias="Authorization")) -> List[Message]:
+def get_conversation_messages(conversation_id: int,
+                              token: str = Header(..., alias="Authorization"),
+                              since_id: int = None,
+                              before_id: int = None,
+                              limit: int = None) -> List[Message]:
     """
-    Retrieve all messages in a specific conversation.
+    Retrieve the messages in a specific conversation, all of them or a page.
 
     Parameters
     ----------
@@ -78,18 +157,30 @@ async def get_conversation_messages(conversation_id: int,
         The ID of the conversation to retrieve.
     token : str
         Authentication token of the requesting user.
+    since_id : int, optional
+        Only messages after this ID, e.g. the last message the client has. Returns an empty
+        list when there is nothing new.
+    before_id : int, optional
+        Only messages before this ID, to load older history.
+    limit : int, optional
+        Number of messages (at most 200, 50 if a cursor is given). Without since_id these are
+        the latest ones.
 
     Returns
     -------
     List[dict]
-        A list of messages in the specified conversation.
+        A list of messages in the specified conversation, oldest first.
     """
-    return ConversationsService.get_conversation_messages(conversation_id, token)
+    return ConversationsService.get_conversation_messages(conversation_id, token, since_id=since_id,
+                                                          before_id=before_id, limit=limit)
 
 
 @router.get("/msg/{user_id}", response_model=List[Message])
-async def get_messages_beetween(user_id: int,
-                                token: str = Header(..., alias="Authorization")) -> List[Message]:
+def get_messages_beetween(user_id: int,
+                          token: str = Header(..., alias="Authorization"),
+                          since_id: int = None,
+                          before_id: int = None,
+                          limit: int = None) -> List[Message]:
     """
     Gets the messages between two users with user ID and authentication token.
 
@@ -99,10 +190,17 @@ async def get_messages_beetween(user_id: int,
         Contains the receiver's ID and message content.
     token : str
         Authentication token of first user.
+    since_id : int, optional
+        Only messages after this ID.
+    before_id : int, optional
+        Only messages before this ID.
+    limit : int, optional
+        Number of messages (at most 200, 50 if a cursor is given).
 
     Returns
     -------
     dict
-        Returns a dict of messages between the two users.
+        Returns a dict of messages between the two users, oldest first.
     """
-    return ConversationsService.get_messages_between(user_id, token)
+    return ConversationsService.get_messages_between(user_id, token, since_id=since_id,
+                                                     before_id=before_id, limit=limit)
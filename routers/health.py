@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+
+from services.health import HealthService
+
+router = APIRouter(tags=["health"])
+
+# The health routes run on the event loop and skip RequestConnectionMiddleware (see main.py):
+# they answer without a request thread or a pool slot, which are what they report on when busy
+
+
+@router.get("/db", response_model=dict)
+async def get_db_health() -> dict:
+    """
+    Report the state of the database connection pools.
+
+    Returns
+    -------
+    dict
+        Overall status and, per pool, its size, connections in use, number of checkouts,
+        checkout failures and average/maximum checkout wait in milliseconds.
+    """
+    return HealthService.get_db_status()
+
+
+@router.get("/cache", response_model=dict)
+async def get_cache_health() -> dict:
+    """
+    Report the hit/miss counters of the topic, category and user caches.
+
+    Returns
+    -------
+    dict
+        Per cache, its size and limits, hits, misses, coalesced loads, invalidations and hit ratio.
+    """
+    return HealthService.get_cache_status()
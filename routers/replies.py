@@ -7,9 +7,9 @@ router = APIRouter(tags=["replies"])
 
 
 @router.put("/best/{topic_id}/{reply_id}", response_model=dict)
-async def select_best_reply(reply_id: int,
-                            topic_id: int,
-                            token: str = Header(..., alias="Authorization")) -> dict:
+def select_best_reply(reply_id: int,
+                      topic_id: int,
+                      token: str = Header(..., alias="Authorization")) -> dict:
     """
     Mark a reply as the best answer for a specific topic.
 
@@ -31,9 +31,9 @@ async def select_best_reply(reply_id: int,
 
 
 @router.put("/vote/{reply_id}", response_model=dict)
-async def vote_reply(reply_id: int,
-                     vote: ReplyVote,
-                     token: str = Header(..., alias="Authorization")) -> dict:
+def vote_reply(reply_id: int,
+               vote: ReplyVote,
+               token: str = Header(..., alias="Authorization")) -> dict:
     """
     Cast a vote (upvote or downvote) on a reply.
 
@@ -55,8 +55,8 @@ async def vote_reply(reply_id: int,
 
 
 @router.get("/vote/{reply_id}", response_model=dict)
-async def get_user_reply_vote(reply_id: int,
-                              token: str = Header(..., alias="Authorization")) -> dict:
+def get_user_reply_vote(reply_id: int,
+                        token: str = Header(..., alias="Authorization")) -> dict:
     """
     Get the vote of a user on a given reply.
 
@@ -76,9 +76,9 @@ async def get_user_reply_vote(reply_id: int,
 
 
 @router.post("/{topic_id}", response_model=dict)
-async def add_reply(topic_id: int,
-                    reply: ReplyCreate,
-                    token: str = Header(..., alias="Authorization")) -> dict:
+def add_reply(topic_id: int,
+              reply: ReplyCreate,
+              token: str = Header(..., alias="Authorization")) -> dict:
     """
     Add a new reply to a specific topic.
 
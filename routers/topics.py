@@ -1,9 +1,11 @@
 from typing import List
 
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from models.reply import Reply
-from models.topic import TopicCreate, Topic
+from models.topic import TopicCreate, Topic, TopicPage
 from services.replies import RepliesService
 from services.topics import TopicsService
 
@@ -11,8 +13,8 @@ router = APIRouter(tags=["topics"])
 
 
 @router.post("/", response_model=dict)
-async def create_topic(topic: TopicCreate,
-                       token: str = Header(..., alias="Authorization")) -> dict:
+def create_topic(topic: TopicCreate,
+                 token: str = Header(..., alias="Authorization")) -> dict:
     """
     Create a new topic.
 
@@ -34,8 +36,8 @@ async def create_topic(topic: TopicCreate,
 # TODO:  Duplicated code-  get_topic
 
 @router.get("/{topic_id}", response_model=Topic)
-async def get_topic(topic_id: int,
-                    token: str = Header(..., alias="Authorization")) -> Topic:
+def get_topic(topic_id: int,
+              token: str = Header(..., alias="Authorization")) -> Topic:
     """
     Retrieve a topic by its ID.
 
@@ -56,10 +58,14 @@ async def get_topic(topic_id: int,
 
 
 @router.get("/{topic_id}/replies", response_model=List[Reply])
-async def get_topic(topic_id: int,
-                    token: str = Header(..., alias="Authorization")) -> List[Reply]:
+async def get_topic_replies(topic_id: int,
+                            response: Response,
+                            token: str = Header(..., alias="Authorization"),
+                            after: int = None,
+                            limit: int = None,
+                            stream: bool = False):
     """
-    Retrieve a topic by its ID.
+    Retrieve the replies of a topic in ID order, a page at a time or streamed.
 
     Parameters
     ----------
@@ -67,20 +73,88 @@ async def get_topic(topic_id: int,
         Authentication token of the user.
     topic_id : int
         Unique identifier of the topic.
+    after : int, optional
+        Cursor from the `X-Next-Cursor` header of a previous response (or any reply ID);
+        returns the replies that follow it.
+    limit : int, optional
+        Number of replies per page (at most 100). Without it every reply after the cursor
+        is returned.
+    stream : bool, default=False
+        Send every reply after the cursor as newline-delimited JSON (`application/x-ndjson`)
+        instead of one page; the thread is read and sent in batches.
 
     Returns
     -------
-    TopicResponse
-        The topic data.
+    List[Reply]
+        The replies, or a page of them. When another page follows, the `X-Next-Cursor`
+        header holds its cursor.
+    """
+    if stream:
+        lines = await run_in_threadpool(RepliesService.stream_topic_replies, topic_id, token, after)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    replies, next_cursor = await RepliesService.get_topic_replies(topic_id, token, after=after, limit=limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return replies
+
+
+@router.get("/{topic_id}/page", response_model=TopicPage)
+def get_topic_page(topic_id: int,
+                   token: str = Header(..., alias="Authorization"),
+                   after: int = None,
+                   limit: int = 20) -> TopicPage:
+    """
+    Retrieve everything needed to render a thread in one call.
+
+    Parameters
+    ----------
+    topic_id : int
+        Unique identifier of the topic.
+    token : str
+        Authentication token of the user.
+    after : int, optional
+        Cursor from `next_cursor` of a previous response; returns the following replies.
+    limit : int, default=20
+        Number of replies per page (at most 100).
+
+    Returns
+    -------
+    TopicPage
+        The topic, the user's access type for its category, a page of replies with the
+        user's vote on each (`my_vote`) and the cursor of the next page.
+    """
+    return TopicsService.get_topic_page(topic_id, token, after=after, limit=limit)
+
+
+@router.get("/{topic_id}/my-votes", response_model=dict[int, int])
+def get_my_votes(topic_id: int,
+                 token: str = Header(..., alias="Authorization")) -> dict[int, int]:
+    """
+    Retrieve the requesting user's votes on all replies of a topic in one call.
+
+    Parameters
+    ----------
+    topic_id : int
+        Unique identifier of the topic.
+    token : str
+        Authentication token of the user.
+
+    Returns
+    -------
+    dict
+        Reply ID mapped to the vote type (1 or -1); replies without a vote are omitted.
     """
-    return RepliesService.get_topic_replies(topic_id, token)
+    return RepliesService.get_topic_votes(topic_id, token)
 
 
 @router.get("/", response_model=dict)
-async def get_topics(token: str = Header(..., alias="Authorization"),
-                     search: str = None,
-                     sort: str = "DESC",
-                     page: int = 0) -> dict:
+def get_topics(token: str = Header(..., alias="Authorization"),
+               search: str = None,
+               sort: str = "DESC",
+               page: int = 0,
+               after: int = None,
+               before: int = None) -> dict:
     """
     Retrieve a list of topics with optional filtering, sorting, and pagination.
 
@@ -94,18 +168,22 @@ async def get_topics(token: str = Header(..., alias="Authorization"),
         Sort order for topics by creation date ('ASC' or 'DESC').
     page : int, default=0
         Page number for pagination.
+    after : int, optional
+        Cursor from `next_cursor` of a previous response; returns the following page.
+    before : int, optional
+        Cursor from `prev_cursor` of a previous response; returns the preceding page.
 
     Returns
     -------
     TopicListResponse
-        A list of topics with pagination metadata.
+        A list of topics with pagination metadata and the next/previous page cursors.
     """
-    return TopicsService.get_topics(token=token, search=search, sort=sort, page=page)
+    return TopicsService.get_topics(token=token, search=search, sort=sort, page=page, after=after, before=before)
 
 
 @router.put("/{topic_id}/lock", response_model=dict)
-async def lock_topic(topic_id: int,
-                     token: str = Header(..., alias="Authorization")) -> dict:
+def lock_topic(topic_id: int,
+               token: str = Header(..., alias="Authorization")) -> dict:
     """
     Lock a topic to prevent further replies.
 
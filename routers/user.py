@@ -7,7 +7,7 @@ router = APIRouter(tags=["user"])
 
 
 @router.get("/", response_model=List[User])
-async def get_all_users(token: str = Header(..., alias="Authorization")) -> List[User]:
+def get_all_users(token: str = Header(..., alias="Authorization")) -> List[User]:
     """
     Fetches and returns a list of all users if the authenticated user is valid and an admin.
 
@@ -25,7 +25,7 @@ async def get_all_users(token: str = Header(..., alias="Authorization")) -> List
 
 
 @router.get("/me", response_model=UserPublic)
-async def get_user_by_token \
+def get_user_by_token \
                 (token: str = Header(..., alias="Authorization")) -> UserPublic:
     """
     Retrieve public user information by decoding the authenticated user's JWT token.
@@ -44,7 +44,7 @@ async def get_user_by_token \
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-async def get_user_by_id(user_id: int) -> UserPublic:
+def get_user_by_id(user_id: int) -> UserPublic:
     """
     Retrieve a user's public data by their ID number.
 
@@ -83,7 +83,7 @@ def get_by_username(username: str,
 
 
 @router.put("/avatar/", response_model=dict)
-async def update_avatar(link: str, token: str = Header(..., alias="Authorization")) -> dict:
+def update_avatar(link: str, token: str = Header(..., alias="Authorization")) -> dict:
     """
     Update user avatar.
 
@@ -14,7 +14,8 @@ class AuthService:
         user = user_db.get_user_by_username(username)
         if user:
             if bcrypt.checkpw(user_data.password.encode('utf-8'), user.password.encode('utf-8')):
-                token = AuthToken.generate({"sub": username})
+                claims = AuthToken.claims_for(user, user_db.get_permission_version(user.id) or 0)
+                token = AuthToken.generate(claims)
                 return LoginResponse(access_token=token, token_type="bearer")
         raise invalid_credentials
 
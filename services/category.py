@@ -117,7 +117,14 @@ class CategoryService:
     #     return category_repo.hide_category(category_id)
     @classmethod
     def get_read_or_write_permission(cls, category_id, token):
-        user = AuthToken.validate(token)
+        user = AuthToken.claims(token)
+        return cls.access_type(category_id, user)
+
+    @classmethod
+    def access_type(cls, category_id, user) -> str:
+        """
+        Names the access level of an already authenticated user to a category.
+        """
         if user.is_admin():
             return "write_access"
         perm = category_repo.get_user_category_permission(category_id, user)
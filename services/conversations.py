@@ -1,8 +1,13 @@
 from typing import List
 
+from fastapi.concurrency import run_in_threadpool
+
+from data.broker import broker, Subscription
+from data.connection import transaction
 import repo.conversation as conversation_repo
 import repo.message as message_repo
 import repo.user as user_repo
+from models.conversation import Inbox
 from models.message import MessageCreate, Message
 from services.errors import invalid_token, not_found, invalid_token, conversation_not_found, invalid_credentials
 from services.utils import AuthToken
@@ -37,14 +42,31 @@ class ConversationsService:
         user = AuthToken.validate(token)
         conversations = conversation_repo.get_conversations_by_user(user.id)
 
-        users = []
-        for conversation in conversations:
-            if conversation.initiator_id == user.id and conversation.receiver_id not in users:
-                users.append(conversation.receiver_id)
-            elif conversation.receiver_id == user.id and conversation.initiator_id not in users:
-                users.append(conversation.initiator_id)
+        # dict keeps the first (most recent) occurrence of each partner in order
+        users = dict.fromkeys(conversation.receiver_id if conversation.initiator_id == user.id
+                              else conversation.initiator_id for conversation in conversations)
+
+        return user_repo.get_users_in_list_by_id(list(users), True)
+
+    @classmethod
+    def get_inbox(cls, token: str, before: int = None,
+                  limit: int = conversation_repo.INBOX_PAGE_SIZE) -> Inbox:
+        """
+        Get the authenticated user's conversations ordered by last activity
 
-        return user_repo.get_users_in_list_by_id(users, True)
+        Args:
+            token: Authentication token
+            before: Cursor - the next_cursor of the previous page
+            limit: Number of conversations per page (capped at MAX_INBOX_PAGE_SIZE)
+
+        Returns:
+            Inbox with the partner, last message and unread count of each conversation
+            and the cursor of the next page
+        """
+        user = AuthToken.claims(token)
+        limit = max(1, min(limit, conversation_repo.MAX_INBOX_PAGE_SIZE))
+        conversations, next_cursor = conversation_repo.get_inbox(user.id, before=before, limit=limit)
+        return Inbox(conversations=conversations, next_cursor=next_cursor)
 
     @classmethod
     def send_message(cls, receiver_id: int, content: str, token: str):
@@ -59,36 +81,90 @@ class ConversationsService:
         Returns:
             Dictionary with message ID and status
         """
-        user = AuthToken.validate(token)
-        receiver_user = user_repo.get_user_by_id(receiver_id)
-
-        if not receiver_user or receiver_id == user.id:
+        user = AuthToken.claims(token)
+        if receiver_id == user.id:
             raise invalid_credentials
 
-        if not conversation_repo.conversation_exists(user.id, receiver_id):
-            conversation_id = conversation_repo.create_conversation(user.id, receiver_id)
-        else:
-            conversation_id = conversation_repo.get_conversation_by_users(user.id, receiver_id)
-
         message_data = MessageCreate(
             content=content,
             receiver_id=receiver_id
         )
 
-        message_id = message_repo.create_message(message_data, conversation_id, user.id)
+        # One transaction: a new conversation is only kept if its first message is stored too
+        with transaction():
+            conversation_id = conversation_repo.get_or_create_conversation(user.id, receiver_id)
+            if not conversation_id:
+                raise invalid_credentials
+
+            message_id = message_repo.create_message(message_data, conversation_id, user.id)
+            conversation_repo.set_last_message(conversation_id, message_id)
+            message = message_repo.get_message_by_id(message_id)
+
+        # Published once committed, so subscribers never see a message that was rolled back
+        if message:
+            cls.publish_message(message, (receiver_id, user.id))
         return {"message_id": message_id, "message": "Message sent successfully"}
 
+    @staticmethod
+    def user_channel(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    @classmethod
+    def publish_message(cls, message: Message, user_ids) -> None:
+        """
+        Pushes a new message to the open streams of the given users (both participants,
+        so the sender's other sessions update too).
+
+        Args:
+            message: The stored message
+            user_ids: IDs of the users to notify
+        """
+        event = {"type": "message", "message": message.model_dump(mode="json")}
+        for user_id in user_ids:
+            broker.publish(cls.user_channel(user_id), event)
+
+    @classmethod
+    async def open_stream(cls, token: str) -> Subscription:
+        """
+        Subscribes to the messages sent to or by the authenticated user
+
+        Args:
+            token: Authentication token
+
+        Returns:
+            Subscription yielding {"type": "message", "message": Message} events;
+            the caller closes it when the client disconnects
+        """
+        user = await run_in_threadpool(AuthToken.claims, token)
+        return broker.subscribe(cls.user_channel(user.id))
+
     @classmethod
-    def get_conversation_messages(cls, conversation_id: int, token: str) -> List[Message]:
+    def page_limit(cls, limit: int | None, since_id: int | None, before_id: int | None) -> int | None:
+        """
+        The number of messages to load: all of them for a plain request (as before paging existed),
+        otherwise limit capped at MAX_MESSAGES_PAGE_SIZE, MESSAGES_PAGE_SIZE if not given.
         """
-        Get all messages in a conversation
+        if limit is not None:
+            return max(1, min(limit, message_repo.MAX_MESSAGES_PAGE_SIZE))
+        if since_id is not None or before_id is not None:
+            return message_repo.MESSAGES_PAGE_SIZE
+        return None
+
+    @classmethod
+    def get_conversation_messages(cls, conversation_id: int, token: str, since_id: int = None,
+                                  before_id: int = None, limit: int = None) -> List[Message]:
+        """
+        Get the messages in a conversation, all of them or a page
 
         Args:
             conversation_id: ID of the conversation
             token: Authentication token
+            since_id: Only messages after this ID (the last one the client has)
+            before_id: Only messages before this ID (to load older history)
+            limit: Number of messages (capped at MAX_MESSAGES_PAGE_SIZE)
 
         Returns:
-            List of messages
+            List of messages in sending order; empty if nothing is newer than since_id
         """
         user = AuthToken.validate(token)
 
@@ -99,15 +175,21 @@ class ConversationsService:
         if user.id not in (conversation.initiator_id, conversation.receiver_id):
             raise invalid_credentials
 
-        messages = message_repo.get_messages_by_conversation(conversation_id)
+        messages = message_repo.get_messages_by_conversation(conversation_id, since_id=since_id, before_id=before_id,
+                                                             limit=cls.page_limit(limit, since_id, before_id))
 
         if not messages:
+            # An up-to-date client polling with since_id just gets nothing new
+            if since_id is not None or before_id is not None:
+                return []
             raise not_found
 
+        conversation_repo.mark_read(conversation_id, user.id, max(message.id for message in messages))
         return messages
 
     @classmethod
-    def get_messages_between(cls, user_id, token) -> List[Message]:
+    def get_messages_between(cls, user_id, token, since_id: int = None,
+                             before_id: int = None, limit: int = None) -> List[Message]:
         user1 = AuthToken.validate(token)
         user2 = user_repo.get_user_by_id(user_id)
         if not user2:
@@ -117,5 +199,9 @@ class ConversationsService:
         if not conversation:
             raise not_found
 
-        messages = message_repo.get_messages_by_conversation(conversation.id)
+        messages = message_repo.get_messages_by_conversation(conversation.id, since_id=since_id, before_id=before_id,
+                                                             limit=cls.page_limit(limit, since_id, before_id))
+        if not messages:
+            return []
+        conversation_repo.mark_read(conversation.id, user1.id, max(message.id for message in messages))
         return messages
@@ -0,0 +1,24 @@
+from data.connection import pool_stats
+from repo.caches import cache_stats
+
+
+class HealthService:
+    @classmethod
+    def get_db_status(cls) -> dict:
+        """
+        Reports the state of the database connection pools: size, connections in use,
+        checkout wait times and failed checkouts. The status is "saturated" while every
+        connection of a pool is in use, so new checkouts have to wait. The health routes hold
+        no connection themselves, so in_use counts other requests only.
+        """
+        pools = pool_stats()
+        status = "saturated" if any(p["in_use"] >= p["size"] for p in pools) else "ok"
+        return {"status": status, "pools": pools}
+
+    @classmethod
+    def get_cache_status(cls) -> dict:
+        """
+        Reports the entity caches: size, TTL, hits, misses, loads shared between concurrent
+        misses (coalesced) and invalidations.
+        """
+        return {"caches": cache_stats()}
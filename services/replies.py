@@ -1,4 +1,7 @@
-from typing import List
+import asyncio
+from typing import Iterator, List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
 
 from models.reply import Reply
 from services.errors import reply_not_found, reply_not_accessible, invalid_token, internal_error, topic_not_found, \
@@ -10,6 +13,7 @@ import repo.category as category_repo
 
 
 class RepliesService:
+    MAX_PAGE_SIZE = replies_repo.MAX_REPLIES_PAGE_SIZE
 
     # TODO: Not used anywhere
     # @classmethod
@@ -37,7 +41,7 @@ class RepliesService:
     @classmethod
     def add_reply(cls, content: str, topic_id: int, token: str) -> dict | None:
         user = AuthToken.validate(token)
-        topic = topics_repo.get_topic_by_id(topic_id)
+        topic = topics_repo.get_topic_header(topic_id)
 
         if not topic:
             raise topic_not_found
@@ -57,7 +61,7 @@ class RepliesService:
     @classmethod
     def set_best_reply(cls, reply_id: int, topic_id: int, token: str) -> dict:
         user = AuthToken.validate(token)
-        topic = topics_repo.get_topic_by_id(topic_id)
+        topic = topics_repo.get_topic_header(topic_id)
 
         if not topic:
             raise topic_not_found
@@ -79,7 +83,39 @@ class RepliesService:
         return result
 
     @classmethod
-    def get_topic_replies(cls, topic_id, token) -> List[Reply]:
+    async def get_topic_replies(cls, topic_id, token, after: int = None,
+                                limit: int = None) -> Tuple[List[Reply], int | None]:
+        """
+        Returns the replies of a topic in ID order following the reply ID given as after: all
+        of them, or a page of up to limit (at most MAX_PAGE_SIZE), with the cursor of the next
+        page (None on the last page and when no limit is given).
+        """
+
+        # The token and the topic don't depend on each other, so they are loaded concurrently.
+        # The replies only once access is granted: a thread is the expensive part
+        user, topic = await asyncio.gather(
+            run_in_threadpool(AuthToken.validate, token),
+            run_in_threadpool(topics_repo.get_topic_by_id, topic_id)
+        )
+
+        if not topic:
+            raise topic_not_found
+
+        if not await run_in_threadpool(category_repo.check_category_read_permission, topic.category_id, user):
+            raise reply_not_accessible
+
+        if limit is None:
+            return await replies_repo.async_get_replies_in_topic(topic_id, after=after), None
+        limit = max(1, min(limit, cls.MAX_PAGE_SIZE))
+        return await replies_repo.async_get_replies_page(topic_id, after=after, limit=limit)
+
+    @classmethod
+    def stream_topic_replies(cls, topic_id: int, token: str, after: int = None) -> Iterator[str]:
+        """
+        Checks access to the topic, then returns an iterator over all of its replies (following
+        the reply ID given as after) as newline-delimited JSON. Replies are read from the
+        database in batches while the iterator is consumed.
+        """
         user = AuthToken.validate(token)
         topic = topics_repo.get_topic_by_id(topic_id)
 
@@ -89,8 +125,22 @@ class RepliesService:
         if not category_repo.check_category_read_permission(topic.category_id, user):
             raise reply_not_accessible
 
-        replies = replies_repo.get_replies_in_topic(topic_id)
-        return replies
+        return (reply.model_dump_json() + "\n" for reply in replies_repo.iter_replies_in_topic(topic_id, after=after))
+
+    @classmethod
+    def get_topic_votes(cls, topic_id: int, token: str) -> dict[int, int]:
+        """
+        Returns the requesting user's votes on the replies of a topic, keyed by reply ID.
+        """
+        user = AuthToken.claims(token)
+        topic = topics_repo.get_topic_by_id(topic_id)
+        if not topic:
+            raise topic_not_found
+
+        if not category_repo.check_category_read_permission(topic.category_id, user):
+            raise reply_not_accessible
+
+        return replies_repo.get_user_votes_in_topic(topic_id, user.id)
 
     @classmethod
     def get_vote(cls, reply_id, token) -> dict:
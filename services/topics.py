@@ -2,7 +2,10 @@ from typing import List
 
 import repo.topic as topic_repo
 import repo.category as category_repo
-from models.topic import TopicCreate, Topic
+import repo.replies as replies_repo
+from models.reply import ReplyWithVote
+from models.topic import TopicCreate, Topic, TopicPage
+from services.category import CategoryService
 from services.errors import invalid_token, category_not_found, category_not_accessible, topic_not_found, internal_error, \
     category_locked
 from services.utils import AuthToken
@@ -60,11 +63,49 @@ class TopicsService:
 
         return topic
 
+    @classmethod
+    def get_topic_page(cls, topic_id: int, token: str, after: int = None,
+                       limit: int = replies_repo.REPLIES_PAGE_SIZE) -> TopicPage:
+        """
+        Everything needed to render a thread, with one authentication, one topic fetch
+        and one permission evaluation.
+
+        Args:
+            topic_id: ID of the topic
+            token: Authentication token for user validation.
+            after (int): Cursor - the next_cursor of the previous page of replies.
+            limit (int): Number of replies per page (capped at MAX_REPLIES_PAGE_SIZE).
+
+        Returns:
+            TopicPage with the topic, the user's access type for its category, a page of
+            replies carrying the user's vote on each, and the cursor of the next page.
+        """
+        user = AuthToken.claims(token)
+        topic = topic_repo.get_topic_by_id(topic_id)
+
+        if not topic:
+            raise topic_not_found
+        if not category_repo.check_category_read_permission(topic.category_id, user):
+            raise category_not_accessible
+
+        limit = max(1, min(limit, replies_repo.MAX_REPLIES_PAGE_SIZE))
+        replies, next_cursor = replies_repo.get_replies_page(topic_id, after=after, limit=limit)
+        votes = replies_repo.get_user_votes_for_replies([reply.id for reply in replies], user.id)
+
+        return TopicPage(
+            topic=topic,
+            access_type=CategoryService.access_type(topic.category_id, user),
+            replies=[ReplyWithVote(**reply.model_dump(), my_vote=votes.get(reply.id, 0)) for reply in replies],
+            next_cursor=next_cursor
+        )
+
     @classmethod
     def get_topics(cls, token: str,
                    search: str,
                    page: int = 0,
-                   sort: str = "DESC") -> dict:
+                   sort: str = "DESC",
+                   after: int = None,
+                   before: int = None) -> dict:
         """
         Retrieve a list of topics with optional search, sorting, and pagination.
 
@@ -72,26 +113,29 @@ class TopicsService:
             search (str): Optional search keyword to filter topics by name.
             sort (str): Sorting criteria (e.g., "id DESC", "name ASC").
             page (int): Page number for pagination (0-based index).
+            after (int): Cursor - return the page after this topic ID (overrides page).
+            before (int): Cursor - return the page before this topic ID (overrides page).
             token: Authentication token for user validation.
 
         Returns:
-            dict[int, List[Topic]]: A list of Topic objects if found.
+            dict[int, List[TopicSummary]]: A list of TopicSummary objects (no content) if found.
         """
-        user = AuthToken.validate(token)
+        user = AuthToken.claims(token)
 
         if user.is_admin():
             viewable_category_ids = category_repo.get_all_category_ids()
         else:
             viewable_category_ids = category_repo.get_viewable_category_ids(user)
 
-        return topic_repo.get_topics(search=search, sort=sort, page=page, category_ids=viewable_category_ids)
+        return topic_repo.get_topics(search=search, sort=sort, page=page, category_ids=viewable_category_ids,
+                                     after=after, before=before)
 
     @classmethod
     def lock_topic_by_id(cls, topic_id, token) -> dict:
         ## TODO: add docstring
         AuthToken.validate_admin(token)
 
-        topic = topic_repo.get_topic_by_id(topic_id)
+        topic = topic_repo.get_topic_header(topic_id)
         if not topic:
             raise topic_not_found
 
@@ -45,9 +45,9 @@ class UserService:
 
     @classmethod
     def get_user_by_token(cls, token, public: bool = True):
-        if AuthToken.validate_expiry(token):
-            user = AuthToken.validate(token, public=public)
-            if not user:
-                raise invalid_token
-            return user
-        raise invalid_token
+        # Raises for malformed or expired tokens, even while validate() has the user cached
+        AuthToken.remaining_lifetime(AuthToken.decode(token))
+        user = AuthToken.validate(token, public=public)
+        if not user:
+            raise invalid_token
+        return user
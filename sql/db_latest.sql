@@ -6,6 +6,7 @@ create table categories
     description varchar(255)         null,
     hidden      tinyint(1) default 0 not null,
     locked      int        default 0 null,
+    topics_count int       default 0 not null,
     constraint name_UNIQUE
         unique (name)
 );
@@ -21,6 +22,7 @@ create table users
     avatar        tinytext                  null,
     admin         tinyint default 0         not null,
     creation_date date    default curdate() null,
+    permission_version int default 0        not null,
     constraint email_UNIQUE
         unique (email),
     constraint username_UNIQUE
@@ -55,7 +57,14 @@ create table conversations
     initiator_id int                                  not null,
     receiver_id  int                                  not null,
     seen         int      default 0                   not null,
+    last_message_id        int                        null,
+    initiator_last_read_id int      default 0         not null,
+    receiver_last_read_id  int      default 0         not null,
+    user_low               int as (least(initiator_id, receiver_id)) persistent,
+    user_high              int as (greatest(initiator_id, receiver_id)) persistent,
     primary key (id, initiator_id, receiver_id),
+    constraint conversations_pair_UNIQUE
+        unique (user_low, user_high),
     constraint fk_conversations_users1
         foreign key (initiator_id) references users (id)
             on delete cascade,
@@ -70,6 +79,12 @@ create index fk_conversations_users1_idx
 create index fk_conversations_users2_idx
     on conversations (receiver_id);
 
+create index conversations_initiator_activity_idx
+    on conversations (initiator_id, last_message_id);
+
+create index conversations_receiver_activity_idx
+    on conversations (receiver_id, last_message_id);
+
 create table messages
 (
     id              int auto_increment,
@@ -90,8 +105,8 @@ create table messages
             on delete cascade
 );
 
-create index fk_messages_conversations1_idx
-    on messages (conversation_id);
+create index messages_conversation_id_idx
+    on messages (conversation_id, id);
 
 create index fk_messages_users1_idx
     on messages (sender_id);
@@ -108,6 +123,7 @@ create table topics
     category_id int                          not null,
     user_id     int                          not null,
     locked      tinyint(1) default 0         null,
+    replies_count int      default 0         not null,
     primary key (id, category_id, user_id),
     constraint fk_topics_categories
         foreign key (category_id) references categories (id)
@@ -125,6 +141,7 @@ create table replies
     topic_id   int                       not null,
     user_id    int                       not null,
     best_reply tinyint default 0         null,
+    likes      int     default 0         not null,
     primary key (id, topic_id, user_id),
     constraint fk_replies_topics1
         foreign key (topic_id) references topics (id)
@@ -146,6 +163,9 @@ create index fk_topics_categories_idx
 create index fk_topics_users1_idx
     on topics (user_id);
 
+create fulltext index ft_topics_name_content
+    on topics (name, content);
+
 create table votes
 (
     id       int auto_increment,
@@ -153,6 +173,8 @@ create table votes
     reply_id int     not null,
     user_id  int     not null,
     primary key (id, reply_id, user_id),
+    constraint votes_reply_user_UNIQUE
+        unique (reply_id, user_id),
     constraint fk_votes_replies1
         foreign key (reply_id) references replies (id)
             on delete cascade,
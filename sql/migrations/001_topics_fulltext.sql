@@ -0,0 +1,3 @@
+-- Full-text search over topic titles and content (used by GET /topics/?search=)
+alter table topics
+    add fulltext index ft_topics_name_content (name, content);
@@ -0,0 +1,4 @@
+-- Bumped whenever a user's admin flag or category permissions change; auth tokens carry the
+-- version they were issued with (the "pv" claim) and are re-checked against the database once it is stale
+alter table users
+    add permission_version int default 0 not null;
@@ -0,0 +1,15 @@
+-- Stored counters read instead of COUNT(*) / SUM(votes.type), maintained by the repo layer.
+-- Recompute them at any time with: python -m repo.counters
+alter table categories
+    add topics_count int default 0 not null;
+alter table topics
+    add replies_count int default 0 not null;
+alter table replies
+    add likes int default 0 not null;
+
+update categories c
+set c.topics_count = (select count(*) from topics t where t.category_id = c.id);
+update topics t
+set t.replies_count = (select count(*) from replies r where r.topic_id = t.id);
+update replies r
+set r.likes = (select coalesce(sum(v.type), 0) from votes v where v.reply_id = r.id);
@@ -0,0 +1,14 @@
+-- One vote per user and reply, required by the INSERT ... ON DUPLICATE KEY UPDATE in set_reply_vote.
+-- Keeps the most recent of any duplicate votes, then recomputes the likes they inflated.
+delete older
+from votes older
+         join votes newer
+              on newer.reply_id = older.reply_id
+                  and newer.user_id = older.user_id
+                  and newer.id > older.id;
+
+alter table votes
+    add constraint votes_reply_user_UNIQUE unique (reply_id, user_id);
+
+update replies r
+set r.likes = (select coalesce(sum(v.type), 0) from votes v where v.reply_id = r.id);
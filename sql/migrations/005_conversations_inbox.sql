@@ -0,0 +1,22 @@
+-- Inbox: the last message of each conversation and how far each side has read.
+-- last_message_id is set by ConversationsService.send_message in the same transaction as the message,
+-- the *_last_read_id markers when a participant loads the conversation's messages.
+alter table conversations
+    add last_message_id       int           null,
+    add initiator_last_read_id int default 0 not null,
+    add receiver_last_read_id  int default 0 not null;
+
+update conversations c
+set c.last_message_id = (select max(m.id) from messages m where m.conversation_id = c.id);
+
+-- Existing conversations start out read instead of flooding every inbox with unread messages
+update conversations
+set initiator_last_read_id = coalesce(last_message_id, 0),
+    receiver_last_read_id  = coalesce(last_message_id, 0);
+
+-- GET /conversations/inbox reads a user's conversations on either side ordered by last activity
+create index conversations_initiator_activity_idx
+    on conversations (initiator_id, last_message_id);
+
+create index conversations_receiver_activity_idx
+    on conversations (receiver_id, last_message_id);
@@ -0,0 +1,7 @@
+-- Messages are read per conversation in ID order and paged with since_id / before_id.
+-- The composite index serves those range reads (and the inbox unread counts) directly;
+-- it also covers the conversation_id foreign key, so the single-column index goes.
+create index messages_conversation_id_idx
+    on messages (conversation_id, id);
+
+drop index fk_messages_conversations1_idx on messages;
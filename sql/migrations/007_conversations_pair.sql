@@ -0,0 +1,35 @@
+-- One conversation per unordered pair of users, keyed by (user_low, user_high) so that
+-- ConversationsService.send_message resolves or creates it with a single upsert.
+
+-- Merge conversations that were created twice for the same pair (both directions or a race)
+-- into the oldest one
+create temporary table conversation_merges as
+select c.id as duplicate_id, keep.id as keep_id
+from conversations c
+         join (select least(initiator_id, receiver_id) as user_low, greatest(initiator_id, receiver_id) as user_high,
+                      min(id) as id
+               from conversations
+               group by user_low, user_high) keep
+              on keep.user_low = least(c.initiator_id, c.receiver_id)
+                  and keep.user_high = greatest(c.initiator_id, c.receiver_id)
+where c.id <> keep.id;
+
+update messages m
+    join conversation_merges cm on cm.duplicate_id = m.conversation_id
+set m.conversation_id = cm.keep_id;
+
+delete c
+from conversations c
+         join conversation_merges cm on cm.duplicate_id = c.id;
+
+drop temporary table conversation_merges;
+
+update conversations c
+set c.last_message_id = (select max(m.id) from messages m where m.conversation_id = c.id);
+
+alter table conversations
+    add user_low  int as (least(initiator_id, receiver_id)) persistent,
+    add user_high int as (greatest(initiator_id, receiver_id)) persistent;
+
+create unique index conversations_pair_UNIQUE
+    on conversations (user_low, user_high);
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import data.connection as connection
+
+
+class SQLitePool:
+    """Local stand-in for the MariaDB pool: every checkout opens a connection to the same SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get_connection(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+
+class TestAsyncConnection(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        with sqlite3.connect(self.path) as db:
+            db.execute("CREATE TABLE topics (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, locked INT DEFAULT 0)")
+            db.executemany("INSERT INTO topics (name) VALUES (?)", [("first",), ("second",), ("third",)])
+
+        self.previous = connection.async_pool, connection.async_executor
+        connection.async_pool = connection.DatabasePool("test_async_pool", 3, factory=lambda: SQLitePool(self.path))
+        connection.async_executor = ThreadPoolExecutor(max_workers=3)
+
+    def tearDown(self):
+        connection.async_executor.shutdown()
+        connection.async_pool, connection.async_executor = self.previous
+        os.remove(self.path)
+
+    def test_async_read_query(self):
+        result = asyncio.run(connection.async_read_query("SELECT name FROM topics WHERE id = ?", (2,)))
+        self.assertEqual(result, [("second",)])
+
+    def test_async_queries_gathered(self):
+        async def load():
+            return await asyncio.gather(
+                *(connection.async_read_query("SELECT name FROM topics WHERE id = ?", (topic_id,))
+                  for topic_id in (1, 2, 3))
+            )
+
+        results = asyncio.run(load())
+        self.assertEqual(results, [[("first",)], [("second",)], [("third",)]])
+
+    def test_async_insert_query(self):
+        topic_id = asyncio.run(connection.async_insert_query("INSERT INTO topics (name) VALUES (?)", ("fourth",)))
+        self.assertEqual(topic_id, 4)
+
+    def test_async_update_query(self):
+        count = asyncio.run(connection.async_update_query("UPDATE topics SET locked = 1 WHERE id > ?", (1,)))
+        self.assertEqual(count, 2)
+        result = asyncio.run(connection.async_read_query("SELECT id FROM topics WHERE locked = 1"))
+        self.assertEqual(result, [(2,), (3,)])
+
+    def test_async_read_query_error(self):
+        result = asyncio.run(connection.async_read_query("SELECT * FROM missing_table"))
+        self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+
+import jwt
+
+from models.user import TokenUser
+from repo.user import authenticated_users, permission_versions, forget_authenticated_user, set_user_avatar
+from services.errors import access_denied, invalid_token
+from services.utils import AuthToken
+
+
+class TestAuthToken(unittest.TestCase):
+    def setUp(self):
+        authenticated_users.clear()
+        permission_versions.clear()
+        self.addCleanup(authenticated_users.clear)
+        self.addCleanup(permission_versions.clear)
+        self.token = AuthToken.generate({"sub": "alice"})
+        self.user = MagicMock(id=1, username="alice")
+
+    @patch("services.utils.get_user_by_username")
+    def test_validate_returns_user(self, mock_get_user):
+        mock_get_user.return_value = self.user
+        self.assertIs(AuthToken.validate(self.token), self.user)
+        mock_get_user.assert_called_once_with("alice", False)
+
+    @patch("services.utils.jwt.decode", wraps=jwt.decode)
+    @patch("services.utils.get_user_by_username")
+    def test_validate_cached(self, mock_get_user, mock_decode):
+        mock_get_user.return_value = self.user
+
+        AuthToken.validate(self.token)
+        self.assertIs(AuthToken.validate(self.token), self.user)
+
+        mock_get_user.assert_called_once()
+        mock_decode.assert_called_once()
+
+    @patch("services.utils.get_user_by_username")
+    def test_public_and_private_cached_separately(self, mock_get_user):
+        public_user = MagicMock(id=1)
+        mock_get_user.side_effect = [self.user, public_user]
+
+        self.assertIs(AuthToken.validate(self.token), self.user)
+        self.assertIs(AuthToken.validate(self.token, public=True), public_user)
+
+    @patch("services.utils.get_user_by_username")
+    def test_forget_authenticated_user(self, mock_get_user):
+        mock_get_user.return_value = self.user
+        AuthToken.validate(self.token)
+
+        forget_authenticated_user(1)
+        AuthToken.validate(self.token)
+
+        self.assertEqual(mock_get_user.call_count, 2)
+
+    @patch("repo.user.update_query")
+    @patch("services.utils.get_user_by_username")
+    def test_set_user_avatar_invalidates(self, mock_get_user, mock_update):
+        mock_get_user.return_value = self.user
+        mock_update.return_value = 1
+        AuthToken.validate(self.token)
+
+        set_user_avatar(self.user, "https://example.com/avatar.png")
+
+        self.assertEqual(len(authenticated_users), 0)
+
+    @patch("repo.user.update_query")
+    @patch("repo.category.update_query")
+    @patch("repo.category.read_query")
+    @patch("services.utils.get_user_by_username")
+    def test_update_permissions_invalidates(self, mock_get_user, mock_read, mock_update, mock_bump):
+        from repo.category import update_permissions
+        mock_get_user.return_value = self.user
+        mock_read.return_value = [(1,)]
+        mock_update.return_value = 1
+        permission_versions.set(1, 4)
+        AuthToken.validate(self.token)
+
+        update_permissions(3, 1, 0)
+
+        self.assertEqual(len(authenticated_users), 0)
+        self.assertIsNone(permission_versions.get(1))
+        mock_bump.assert_called_once_with(
+            "UPDATE users SET permission_version = permission_version + 1 WHERE id = ?", (1,))
+
+    @patch("repo.user.update_query")
+    @patch("repo.category.update_query")
+    @patch("repo.category.read_query")
+    def test_update_permissions_forgets_after_commit(self, mock_read, mock_update, mock_bump):
+        from repo.category import update_permissions
+        mock_read.return_value = [(1,)]
+        mock_update.return_value = 1
+        committed = []
+
+        @contextmanager
+        def transaction():
+            yield
+            # A request authenticated between the bump and the commit still reads the old rows
+            permission_versions.set(1, 4)
+            authenticated_users.set((self.token, "claims"), TokenUser(id=1, username="alice", admin=0,
+                                                                      special_permissions={3: 2}))
+            committed.append(True)
+
+        with patch("repo.category.transaction", transaction):
+            update_permissions(3, 1, 0)
+
+        self.assertEqual(committed, [True])
+        self.assertIsNone(permission_versions.get(1))
+        self.assertEqual(len(authenticated_users), 0)
+
+    @patch("services.utils.get_user_by_username")
+    def test_unknown_user_not_cached(self, mock_get_user):
+        mock_get_user.return_value = None
+
+        with self.assertRaises(type(access_denied)):
+            AuthToken.validate(self.token)
+        self.assertEqual(len(authenticated_users), 0)
+
+    def claims_token(self, version: int = 4, admin: int = 0) -> str:
+        user = MagicMock(id=1, username="alice", admin=admin, special_permissions={3: 2})
+        return AuthToken.generate(AuthToken.claims_for(user, version))
+
+    @patch("repo.user.read_query")
+    @patch("services.utils.get_user_by_username")
+    def test_claims_without_user_lookup(self, mock_get_user, mock_read):
+        mock_read.return_value = [(4,)]
+
+        user = AuthToken.claims(self.claims_token())
+
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual((user.id, user.username, user.special_permissions), (1, "alice", {3: 2}))
+        self.assertFalse(user.is_admin())
+        mock_get_user.assert_not_called()
+
+    @patch("repo.user.read_query")
+    def test_claims_cached(self, mock_read):
+        mock_read.return_value = [(4,)]
+        token = self.claims_token(admin=1)
+
+        AuthToken.claims(token)
+        authenticated_users.pop((token, "claims"))
+        self.assertTrue(AuthToken.claims(token).is_admin())
+        AuthToken.claims(token)
+
+        # The permission version is read once and shared by later decodes
+        mock_read.assert_called_once()
+
+    @patch("repo.user.read_query")
+    @patch("services.utils.get_user_by_username")
+    def test_claims_stale_version_falls_back(self, mock_get_user, mock_read):
+        mock_read.return_value = [(5,)]
+        mock_get_user.return_value = self.user
+
+        self.assertIs(AuthToken.claims(self.claims_token(version=4)), self.user)
+        mock_get_user.assert_called_once_with("alice", False)
+
+    @patch("repo.user.read_query")
+    @patch("services.utils.get_user_by_username")
+    def test_claims_old_token_falls_back(self, mock_get_user, mock_read):
+        mock_get_user.return_value = self.user
+
+        self.assertIs(AuthToken.claims(self.token), self.user)
+        mock_read.assert_not_called()
+
+    @patch("repo.user.read_query")
+    @patch("services.utils.get_user_by_username")
+    def test_claims_deleted_user(self, mock_get_user, mock_read):
+        mock_read.return_value = []
+        mock_get_user.return_value = None
+
+        with self.assertRaises(type(access_denied)):
+            AuthToken.claims(self.claims_token())
+
+    def test_expired_token(self):
+        exp = (datetime.now(timezone.utc) - timedelta(minutes=1)).timestamp()
+        token = jwt.encode({"sub": "alice", "exp": exp}, AuthToken.SECRET_KEY, algorithm=AuthToken.ALGORITHM)
+
+        with self.assertRaises(type(invalid_token)):
+            AuthToken.validate(token)
+
+    def test_invalid_signature(self):
+        token = jwt.encode({"sub": "alice"}, "another key", algorithm=AuthToken.ALGORITHM)
+
+        with self.assertRaises(type(invalid_token)):
+            AuthToken.validate(token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from data.broker import (MemoryBroker, UnixSocketBroker, SUBSCRIPTION_BUFFER, default_broker_path,
+                         make_private_directory)
+
+
+class TestMemoryBroker(unittest.IsolatedAsyncioTestCase):
+    async def test_publish_to_channel(self):
+        broker = MemoryBroker()
+        with broker.subscribe("user:1") as first, broker.subscribe("user:1") as second, \
+                broker.subscribe("user:2") as other:
+            broker.publish("user:1", {"id": 1})
+
+            self.assertEqual(await asyncio.wait_for(first.get(), 1), {"id": 1})
+            self.assertEqual(await asyncio.wait_for(second.get(), 1), {"id": 1})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(other.get(), 0.05)
+
+    async def test_publish_from_another_thread(self):
+        broker = MemoryBroker()
+        with broker.subscribe("user:1") as subscription:
+            thread = threading.Thread(target=broker.publish, args=("user:1", {"id": 2}))
+            thread.start()
+            thread.join()
+
+            self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {"id": 2})
+
+    async def test_close_unsubscribes(self):
+        broker = MemoryBroker()
+        subscription = broker.subscribe("user:1")
+        self.assertEqual(broker.subscriber_count("user:1"), 1)
+
+        subscription.close()
+
+        self.assertEqual(broker.subscriber_count("user:1"), 0)
+        self.assertEqual(broker.dispatch("user:1", {"id": 3}), 0)
+
+    async def test_lagging_subscriber_drops_oldest(self):
+        broker = MemoryBroker()
+        with broker.subscribe("user:1") as subscription:
+            for event_id in range(SUBSCRIPTION_BUFFER + 5):
+                broker.publish("user:1", event_id)
+            await asyncio.sleep(0)
+
+            self.assertEqual(await subscription.get(), 5)
+
+
+class TestUnixSocketBroker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Two brokers on one directory behave like two worker processes
+        self.worker_a = UnixSocketBroker(directory.name)
+        self.worker_b = UnixSocketBroker(directory.name)
+        self.addCleanup(self.worker_a.close)
+        self.addCleanup(self.worker_b.close)
+
+    async def test_fan_out_between_workers(self):
+        with self.worker_a.subscribe("user:1") as local, self.worker_b.subscribe("user:1") as remote:
+            self.worker_a.publish("user:1", {"id": 1, "content": "hi"})
+
+            self.assertEqual(await asyncio.wait_for(local.get(), 1), {"id": 1, "content": "hi"})
+            self.assertEqual(await asyncio.wait_for(remote.get(), 1), {"id": 1, "content": "hi"})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(local.get(), 0.05)
+
+    async def test_gone_worker_is_forgotten(self):
+        # A worker that exited without cleaning up leaves its socket file behind
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        address = os.path.join(self.worker_a.path, "99999-dead.sock")
+        stale.bind(address)
+        stale.close()
+
+        self.worker_a.publish("user:1", {"id": 1})
+
+        self.assertFalse(os.path.exists(address))
+
+
+class TestBrokerPath(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.parent = directory.name
+
+    def test_default_is_per_user_runtime_dir(self):
+        with patch.dict(os.environ, {"XDG_RUNTIME_DIR": "/run/user/1000"}):
+            self.assertEqual(default_broker_path(), "/run/user/1000/forum-broker")
+        with patch.dict(os.environ, {"HOME": "/home/forum"}):
+            os.environ.pop("XDG_RUNTIME_DIR", None)
+            self.assertEqual(default_broker_path(), "/home/forum/.cache/forum-broker")
+
+    def test_creates_private_directory(self):
+        path = os.path.join(self.parent, "broker")
+
+        make_private_directory(path)
+
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+    def test_rejects_directory_open_to_others(self):
+        path = os.path.join(self.parent, "broker")
+        os.mkdir(path)
+        os.chmod(path, 0o777)
+
+        with self.assertRaises(RuntimeError):
+            make_private_directory(path)
+
+    def test_rejects_directory_of_another_user(self):
+        with patch("data.broker.os.getuid", return_value=os.getuid() + 1):
+            with self.assertRaises(RuntimeError):
+                UnixSocketBroker(self.parent)
+
+    def test_rejects_symlink(self):
+        target = os.path.join(self.parent, "target")
+        os.mkdir(target, 0o700)
+        path = os.path.join(self.parent, "broker")
+        os.symlink(target, path)
+
+        with self.assertRaises(RuntimeError):
+            make_private_directory(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -140,7 +140,7 @@ class TestCategoryService(unittest.TestCase):
         with self.assertRaises(type(bad_request)):
             CategoryService.update_user_permissions(1, 2, 99, self.token)
 
-    @patch("services.category.AuthToken.validate")
+    @patch("services.category.AuthToken.claims")
     @patch("services.category.category_repo.get_user_category_permission")
     def test_get_read_or_write_permission_admin(self, mock_get_perm, mock_validate):
         mock_validate.return_value = self.admin_user
@@ -148,7 +148,7 @@ class TestCategoryService(unittest.TestCase):
         result = CategoryService.get_read_or_write_permission(1, self.token)
         self.assertEqual(result, "write_access")
 
-    @patch("services.category.AuthToken.validate")
+    @patch("services.category.AuthToken.claims")
     @patch("services.category.category_repo.get_user_category_permission")
     def test_get_read_or_write_permission_normal(self, mock_get_perm, mock_validate):
         mock_validate.return_value = self.user
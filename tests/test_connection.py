@@ -0,0 +1,349 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+import httpx
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+import data.connection as connection
+from data.connection import read_query, insert_query, transaction, RequestConnectionMiddleware, DatabasePool
+
+
+class TestRequestConnection(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+        self.cursor.fetchall.return_value = [(1,)]
+        self.cursor.lastrowid = 7
+
+        self.pool = MagicMock()
+        self.pool.get_connection.return_value = self.conn
+        self.db_pool = DatabasePool("test_pool", 2, factory=lambda: self.pool)
+        patcher = patch("data.connection.pool", self.db_pool)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def transaction_calls(self):
+        return [call[0] for call in self.conn.method_calls if call[0] in ("commit", "rollback")]
+
+    def test_query_outside_request_returns_connection(self):
+        self.assertEqual(read_query("SELECT 1"), [(1,)])
+        self.pool.get_connection.assert_called_once()
+        self.conn.close.assert_called_once()
+
+    def test_transaction_commits_once(self):
+        with transaction():
+            read_query("SELECT 1")
+            insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+            insert_query("INSERT INTO votes (type) VALUES (?)", (-1,))
+
+        self.pool.get_connection.assert_called_once()
+        self.conn.commit.assert_called_once()
+        self.conn.close.assert_called_once()
+        # The only rollback is the one ending the session on checkin, after the commit
+        self.assertEqual(self.transaction_calls(), ["commit", "rollback"])
+
+    def test_transaction_rolls_back_on_error(self):
+        self.cursor.execute.side_effect = [None, Exception("duplicate key")]
+
+        with self.assertRaises(Exception):
+            with transaction():
+                insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+                insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+
+        self.conn.commit.assert_not_called()
+        self.assertEqual(self.transaction_calls(), ["rollback", "rollback"])
+        self.conn.close.assert_called_once()
+
+    def test_nested_transaction_joins_outer(self):
+        with transaction():
+            with transaction():
+                insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+            self.conn.commit.assert_not_called()
+
+        self.conn.commit.assert_called_once()
+
+    def test_transaction_without_queries_takes_no_connection(self):
+        with transaction():
+            pass
+        self.pool.get_connection.assert_not_called()
+
+    def test_middleware_pins_one_connection_per_request(self):
+        async def app(scope, receive, send):
+            read_query("SELECT 1")
+            insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+            read_query("SELECT 1")
+
+        middleware = RequestConnectionMiddleware(app)
+        asyncio.run(middleware({"type": "http"}, None, None))
+
+        self.pool.get_connection.assert_called_once()
+        self.conn.commit.assert_called_once()
+        self.conn.close.assert_called_once()
+        self.assertIsNone(connection.current_unit.get())
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+
+    @patch("data.connection.DEBUG", True)
+    def test_middleware_reports_query_stats(self):
+        async def app(scope, receive, send):
+            read_query("SELECT 1")
+            insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b""})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(RequestConnectionMiddleware(app)({"type": "http"}, None, send))
+
+        headers = dict(messages[0]["headers"])
+        self.assertEqual(headers[b"x-db-queries"], b"2")
+        self.assertIn(b"x-db-time", headers)
+        self.assertEqual(messages[1], {"type": "http.response.body", "body": b""})
+
+    def test_middleware_without_debug_leaves_headers(self):
+        async def app(scope, receive, send):
+            read_query("SELECT 1")
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(RequestConnectionMiddleware(app)({"type": "http"}, None, send))
+
+        self.assertEqual(messages[0]["headers"], [])
+
+    def test_queries_recorded_in_unit(self):
+        self.cursor.fetchall.return_value = [(1,), (2,)]
+        self.cursor.rowcount = 1
+
+        with transaction() as unit:
+            read_query("SELECT id FROM topics")
+            insert_query("INSERT INTO votes (type) VALUES (?)", (1,))
+
+        self.assertEqual(unit.query_count, 2)
+        self.assertEqual([(query, rows) for query, _, rows in unit.queries],
+                         [("SELECT id FROM topics", 2), ("INSERT INTO votes (type) VALUES (?)", 1)])
+        self.assertGreaterEqual(unit.query_time, 0)
+
+    @patch("data.connection.SLOW_QUERY_MS", 0)
+    def test_slow_query_logged(self):
+        with self.assertLogs("data.connection.slow", level="WARNING") as logs:
+            read_query("SELECT id\n  FROM topics")
+
+        record = logs.records[0]
+        self.assertEqual(record.statement, "SELECT id FROM topics")
+        self.assertEqual(record.rows, 1)
+        self.assertIn("slow query", record.getMessage())
+
+    def test_fast_query_not_logged(self):
+        with self.assertNoLogs("data.connection.slow", level="WARNING"):
+            read_query("SELECT 1")
+
+    def test_prepared_statement_reused_per_connection(self):
+        query = "SELECT type FROM votes WHERE reply_id = ?"
+        read_query(query, (1,), prepared=True)
+        read_query(query, (2,), prepared=True)
+
+        self.conn.cursor.assert_called_once_with(prepared=True)
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        self.cursor.close.assert_not_called()
+
+    def test_failed_prepared_statement_is_dropped(self):
+        query = "SELECT type FROM votes WHERE reply_id = ?"
+        self.cursor.execute.side_effect = [Exception("server has gone away"), None]
+
+        self.assertIsNone(read_query(query, (1,), prepared=True))
+        read_query(query, (1,), prepared=True)
+
+        self.assertEqual(self.conn.cursor.call_count, 2)
+
+
+class FakeConnectionPool:
+    """A fixed set of connections: get_connection fails while all are out, close() returns one."""
+
+    def __init__(self, size: int):
+        self.free = []
+        for _ in range(size):
+            conn = MagicMock()
+            conn.cursor.return_value.fetchall.return_value = [(1,)]
+            conn.close.side_effect = lambda conn=conn: self.free.append(conn)
+            self.free.append(conn)
+
+    def get_connection(self):
+        if not self.free:
+            raise connection.mariadb.PoolError("pool exhausted")
+        return self.free.pop()
+
+
+class TestRequestConnectionUnderLoad(unittest.TestCase):
+    """
+    More concurrent requests than connections, with request threads capped at the pool size
+    as in main.lifespan: every request has to complete, none may time out waiting for a connection.
+    """
+
+    def setUp(self):
+        self.db_pool = DatabasePool("test_pool", 5, factory=lambda: FakeConnectionPool(5))
+        for patcher in (patch("data.connection.pool", self.db_pool), patch("data.connection.POOL_TIMEOUT", 3)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        app = FastAPI()
+        app.add_middleware(RequestConnectionMiddleware, slots=5)
+
+        @app.get("/one")
+        def one():
+            return read_query("SELECT 1")
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse(f"{read_query('SELECT 1')}\n" for _ in range(3))
+
+        self.app = app
+
+    async def run_requests(self, paths: list[str]) -> list[int]:
+        to_thread.current_default_thread_limiter().total_tokens = 5
+        transport = httpx.ASGITransport(app=self.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get(path) for path in paths))
+        return [response.status_code for response in responses]
+
+    def test_more_requests_than_connections(self):
+        started = time.monotonic()
+        statuses = asyncio.run(self.run_requests(["/one"] * 40))
+
+        self.assertEqual(statuses, [200] * 40)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.db_pool.stats()["checkout_failures"], 0)
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+
+    def test_open_streams_leave_slots_and_connections(self):
+        body_released = asyncio.Event()
+        streams_started = []
+
+        @self.app.get("/slow-stream")
+        def slow_stream():
+            read_query("SELECT 1")
+
+            async def body():
+                streams_started.append(True)
+                yield "first\n"
+                # A slow reader: the body isn't finished until the test says so
+                await body_released.wait()
+                yield f"{read_query('SELECT 1')}\n"
+
+            return StreamingResponse(body())
+
+        async def scenario():
+            to_thread.current_default_thread_limiter().total_tokens = 5
+            transport = httpx.ASGITransport(app=self.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                streams = [asyncio.create_task(client.get("/slow-stream")) for _ in range(5)]
+                while len(streams_started) < 5:
+                    await asyncio.sleep(0.005)
+                self.assertEqual(self.db_pool.stats()["in_use"], 0)
+                # Every slot would still be taken if streams kept theirs until the body ends
+                one = await asyncio.wait_for(client.get("/one"), 2)
+                body_released.set()
+                return [one] + list(await asyncio.gather(*streams))
+
+        responses = asyncio.run(scenario())
+
+        self.assertEqual([response.status_code for response in responses], [200] * 6)
+        self.assertEqual(responses[1].text, "first\n[(1,)]\n")
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+
+    def test_exempt_paths_take_no_slot(self):
+        blocked = asyncio.Event()
+        app = FastAPI()
+        app.add_middleware(RequestConnectionMiddleware, slots=1, exempt=("/health",))
+
+        @app.get("/busy")
+        async def busy():
+            await blocked.wait()
+            return "done"
+
+        @app.get("/health/ping")
+        async def ping():
+            return "pong"
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                busy_request = asyncio.create_task(client.get("/busy"))
+                await asyncio.sleep(0.05)
+                ping_response = await asyncio.wait_for(client.get("/health/ping"), 2)
+                blocked.set()
+                await busy_request
+                return ping_response
+
+        self.assertEqual(asyncio.run(scenario()).json(), "pong")
+
+    def test_streaming_responses_among_requests(self):
+        statuses = asyncio.run(self.run_requests(["/one", "/stream"] * 20))
+
+        self.assertEqual(statuses, [200] * 40)
+        self.assertEqual(self.db_pool.stats()["checkout_failures"], 0)
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+
+
+class TestDatabasePool(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.raw_pool = MagicMock()
+        self.factory = MagicMock(return_value=self.raw_pool)
+        self.db_pool = DatabasePool("test_pool", 2, factory=self.factory)
+
+    @patch("data.connection.ConnectionPool")
+    def test_connections_read_committed(self, mock_connection_pool):
+        DatabasePool("test_pool", 2).warm_up()
+
+        kwargs = mock_connection_pool.call_args.kwargs
+        self.assertEqual(kwargs["init_command"], "SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        self.assertFalse(kwargs["pool_reset_connection"])
+
+    def test_pool_created_lazily(self):
+        self.factory.assert_not_called()
+        self.assertFalse(self.db_pool.stats()["initialized"])
+
+        self.db_pool.warm_up()
+        self.db_pool.warm_up()
+
+        self.factory.assert_called_once()
+        self.assertTrue(self.db_pool.stats()["initialized"])
+
+    def test_checkout_waits_for_free_connection(self):
+        self.raw_pool.get_connection.side_effect = [None, None, self.conn]
+
+        conn = self.db_pool.checkout()
+
+        self.assertIs(conn, self.conn)
+        stats = self.db_pool.stats()
+        self.assertEqual(stats["in_use"], 1)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertGreater(stats["wait_max_ms"], 0)
+
+        self.db_pool.checkin(conn)
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+        self.conn.close.assert_called_once()
+
+    @patch("data.connection.POOL_TIMEOUT", 0.02)
+    def test_checkout_failure_counted(self):
+        self.raw_pool.get_connection.return_value = None
+
+        with self.assertRaises(connection.mariadb.PoolError):
+            self.db_pool.checkout()
+
+        self.assertEqual(self.db_pool.stats()["checkout_failures"], 1)
+        self.assertEqual(self.db_pool.stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
 import unittest
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from starlette.websockets import WebSocketDisconnect
+from unittest.mock import patch, MagicMock
 from main import app
+from data.broker import broker
+from models.message import Message
+from services.conversations import ConversationsService
+from services.errors import invalid_token
 
 client = TestClient(app)
 
@@ -73,5 +78,46 @@ class TestConversationsRouter(unittest.TestCase):
         self.assertIsInstance(response.json(), list)
         self.assertEqual(response.json()[1]["content"], "Message 2")
 
+    @patch("services.conversations.ConversationsService.get_inbox")
+    def test_get_inbox(self, mock_get_inbox):
+        mock_get_inbox.return_value = {"conversations": [], "next_cursor": None}
+        response = client.get("/conversations/inbox", params={"before": 40, "limit": 10},
+                              headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"conversations": [], "next_cursor": None})
+        mock_get_inbox.assert_called_once_with(self.auth_token, before=40, limit=10)
+
+    @patch("services.conversations.AuthToken.claims")
+    def test_stream_pushes_new_messages(self, mock_claims):
+        mock_claims.return_value = MagicMock(id=2)
+        message = Message(id=5, content="hi", date="2024-01-01T10:00:00", conversation_id=3, sender_id=1)
+
+        with client.websocket_connect("/conversations/stream",
+                                      headers={"Authorization": self.auth_token}) as websocket:
+            ConversationsService.publish_message(message, (2, 1))
+            event = websocket.receive_json()
+
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["message"]["content"], "hi")
+        mock_claims.assert_called_once_with(self.auth_token)
+
+    @patch("services.conversations.AuthToken.claims")
+    def test_stream_unsubscribes_on_disconnect(self, mock_claims):
+        mock_claims.return_value = MagicMock(id=8)
+
+        with client.websocket_connect("/conversations/stream", params={"token": self.auth_token}):
+            self.assertEqual(broker.subscriber_count("user:8"), 1)
+
+        self.assertEqual(broker.subscriber_count("user:8"), 0)
+
+    @patch("services.conversations.AuthToken.claims")
+    def test_stream_invalid_token(self, mock_claims):
+        mock_claims.side_effect = invalid_token
+
+        with self.assertRaises(WebSocketDisconnect) as context:
+            with client.websocket_connect("/conversations/stream", params={"token": "bad"}):
+                pass
+        self.assertEqual(context.exception.code, 1008)
+
 if __name__ == "__main__":
     unittest.main()
@@ -39,40 +39,87 @@ class TestConversationsService(unittest.TestCase):
         mock_get_users.return_value = ["user2"]
         result = ConversationsService.get_conversations(self.token)
         self.assertEqual(result, ["user2"])
+        mock_get_users.assert_called_once_with([2], True)
 
-    @patch("services.conversations.AuthToken.validate")
-    @patch("services.conversations.user_repo.get_user_by_id")
-    @patch("services.conversations.conversation_repo.conversation_exists")
-    @patch("services.conversations.conversation_repo.create_conversation")
-    @patch("services.conversations.conversation_repo.get_conversation_by_users")
+    @patch("services.conversations.AuthToken.claims")
+    @patch("services.conversations.conversation_repo.get_inbox")
+    def test_get_inbox(self, mock_get_inbox, mock_claims):
+        mock_claims.return_value = self.user
+        mock_get_inbox.return_value = ([], None)
+        result = ConversationsService.get_inbox(self.token, before=50, limit=500)
+        self.assertEqual(result.conversations, [])
+        self.assertIsNone(result.next_cursor)
+        mock_get_inbox.assert_called_once_with(1, before=50, limit=100)
+
+    @patch("services.conversations.AuthToken.claims")
+    @patch("services.conversations.conversation_repo.get_or_create_conversation")
     @patch("services.conversations.message_repo.create_message")
-    def test_send_message_new_conversation(self, mock_create_msg, mock_get_conv_by_users, mock_create_conv, mock_conv_exists, mock_get_user_by_id, mock_validate):
-        mock_validate.return_value = self.user
-        mock_get_user_by_id.return_value = self.user2
-        mock_conv_exists.return_value = False
-        mock_create_conv.return_value = 10
+    @patch("services.conversations.conversation_repo.set_last_message")
+    @patch("services.conversations.message_repo.get_message_by_id")
+    @patch("services.conversations.broker")
+    def test_send_message_new_conversation(self, mock_broker, mock_get_msg, mock_set_last, mock_create_msg, mock_get_or_create, mock_claims):
+        mock_claims.return_value = self.user
+        mock_get_or_create.return_value = 10
         mock_create_msg.return_value = 99
-        mock_get_conv_by_users.return_value = 10
         result = ConversationsService.send_message(self.user2.id, "hello", self.token)
         self.assertEqual(result["message_id"], 99)
+        mock_get_or_create.assert_called_once_with(1, 2)
+        mock_set_last.assert_called_once_with(10, 99)
+        # The stored message is pushed to the receiver and the sender
+        event = {"type": "message", "message": mock_get_msg.return_value.model_dump.return_value}
+        mock_broker.publish.assert_any_call("user:2", event)
+        mock_broker.publish.assert_any_call("user:1", event)
 
-    @patch("services.conversations.AuthToken.validate")
-    @patch("services.conversations.user_repo.get_user_by_id")
-    def test_send_message_invalid_receiver(self, mock_get_user_by_id, mock_validate):
-        mock_validate.return_value = self.user
-        mock_get_user_by_id.return_value = None
+    @patch("services.conversations.AuthToken.claims")
+    @patch("services.conversations.conversation_repo.get_or_create_conversation")
+    @patch("services.conversations.message_repo.create_message")
+    def test_send_message_invalid_receiver(self, mock_create_msg, mock_get_or_create, mock_claims):
+        mock_claims.return_value = self.user
+        # The receiver doesn't exist, so the upsert resolves no conversation
+        mock_get_or_create.return_value = None
         with self.assertRaises(type(invalid_credentials)):
             ConversationsService.send_message(self.user2.id, "hello", self.token)
+        mock_create_msg.assert_not_called()
+
+    @patch("services.conversations.AuthToken.claims")
+    @patch("services.conversations.conversation_repo.get_or_create_conversation")
+    def test_send_message_to_self(self, mock_get_or_create, mock_claims):
+        mock_claims.return_value = self.user
+        with self.assertRaises(type(invalid_credentials)):
+            ConversationsService.send_message(self.user.id, "hello", self.token)
+        mock_get_or_create.assert_not_called()
 
     @patch("services.conversations.AuthToken.validate")
     @patch("services.conversations.conversation_repo.get_conversation_by_id")
     @patch("services.conversations.message_repo.get_messages_by_conversation")
-    def test_get_conversation_messages_success(self, mock_get_msgs, mock_get_conv, mock_validate):
+    @patch("services.conversations.conversation_repo.mark_read")
+    def test_get_conversation_messages_success(self, mock_mark_read, mock_get_msgs, mock_get_conv, mock_validate):
         mock_validate.return_value = self.user
         mock_get_conv.return_value = MagicMock(initiator_id=1, receiver_id=2)
-        mock_get_msgs.return_value = [{"id": 1, "content": "hi"}]
+        mock_get_msgs.return_value = [MagicMock(id=1, content="hi"), MagicMock(id=4, content="there")]
         result = ConversationsService.get_conversation_messages(5, self.token)
-        self.assertEqual(result[0]["id"], 1)
+        self.assertEqual(result[0].id, 1)
+        mock_mark_read.assert_called_once_with(5, self.user.id, 4)
+
+    @patch("services.conversations.AuthToken.validate")
+    @patch("services.conversations.conversation_repo.get_conversation_by_id")
+    @patch("services.conversations.message_repo.get_messages_by_conversation")
+    @patch("services.conversations.conversation_repo.mark_read")
+    def test_get_conversation_messages_up_to_date(self, mock_mark_read, mock_get_msgs, mock_get_conv, mock_validate):
+        mock_validate.return_value = self.user
+        mock_get_conv.return_value = MagicMock(initiator_id=1, receiver_id=2)
+        mock_get_msgs.return_value = None
+        result = ConversationsService.get_conversation_messages(5, self.token, since_id=40)
+        self.assertEqual(result, [])
+        mock_get_msgs.assert_called_once_with(5, since_id=40, before_id=None, limit=50)
+        mock_mark_read.assert_not_called()
+
+    def test_page_limit(self):
+        self.assertIsNone(ConversationsService.page_limit(None, None, None))
+        self.assertEqual(ConversationsService.page_limit(None, 10, None), 50)
+        self.assertEqual(ConversationsService.page_limit(None, None, 10), 50)
+        self.assertEqual(ConversationsService.page_limit(1000, None, None), 200)
+        self.assertEqual(ConversationsService.page_limit(0, 10, None), 1)
 
     @patch("services.conversations.AuthToken.validate")
     @patch("services.conversations.conversation_repo.get_conversation_by_id")
@@ -94,13 +141,15 @@ class TestConversationsService(unittest.TestCase):
     @patch("services.conversations.user_repo.get_user_by_id")
     @patch("services.conversations.conversation_repo.get_conversation_between_users")
     @patch("services.conversations.message_repo.get_messages_by_conversation")
-    def test_get_messages_between_success(self, mock_get_msgs, mock_get_conv, mock_get_user_by_id, mock_validate):
+    @patch("services.conversations.conversation_repo.mark_read")
+    def test_get_messages_between_success(self, mock_mark_read, mock_get_msgs, mock_get_conv, mock_get_user_by_id, mock_validate):
         mock_validate.return_value = self.user
         mock_get_user_by_id.return_value = self.user2
         mock_get_conv.return_value = MagicMock(id=10)
-        mock_get_msgs.return_value = [{"id": 1, "content": "hi"}]
+        mock_get_msgs.return_value = [MagicMock(id=1, content="hi")]
         result = ConversationsService.get_messages_between(self.user2.id, self.token)
-        self.assertEqual(result[0]["id"], 1)
+        self.assertEqual(result[0].id, 1)
+        mock_mark_read.assert_called_once_with(10, self.user.id, 1)
 
     @patch("services.conversations.AuthToken.validate")
     @patch("services.conversations.user_repo.get_user_by_id")
@@ -120,5 +169,108 @@ class TestConversationsService(unittest.TestCase):
         with self.assertRaises(type(not_found)):
             ConversationsService.get_messages_between(self.user2.id, self.token)
 
+
+class TestInboxRepo(unittest.TestCase):
+    ROW = (7, 42, 2, "user2", None, "2024-01-01", 0, "hi", "2024-01-02 10:00:00", 2, 3)
+
+    @patch("repo.conversation.read_query")
+    def test_get_inbox_one_query(self, mock_read):
+        from repo.conversation import get_inbox
+        mock_read.return_value = [self.ROW]
+        entries, next_cursor = get_inbox(1)
+
+        mock_read.assert_called_once()
+        self.assertIsNone(next_cursor)
+        self.assertEqual(entries[0].conversation_id, 7)
+        self.assertEqual(entries[0].partner.username, "user2")
+        self.assertEqual(entries[0].last_message.id, 42)
+        self.assertEqual(entries[0].unread_count, 3)
+
+    @patch("repo.conversation.read_query")
+    def test_get_inbox_next_cursor(self, mock_read):
+        from repo.conversation import get_inbox
+        rows = [(conversation_id, 100 - conversation_id, *self.ROW[2:]) for conversation_id in range(1, 4)]
+        mock_read.return_value = rows
+        entries, next_cursor = get_inbox(1, before=100, limit=2)
+
+        self.assertEqual([entry.conversation_id for entry in entries], [1, 2])
+        self.assertEqual(next_cursor, 98)
+        query, params = mock_read.call_args[0]
+        self.assertIn("last_message_id < ?", query)
+        self.assertEqual(params, (1, 1, 100, 3, 1, 100, 3, 3))
+
+
+class TestConversationPairRepo(unittest.TestCase):
+    @patch("repo.conversation.insert_query")
+    def test_get_or_create_is_one_upsert(self, mock_insert):
+        from repo.conversation import get_or_create_conversation
+        mock_insert.return_value = 10
+        self.assertEqual(get_or_create_conversation(2, 1), 10)
+
+        mock_insert.assert_called_once()
+        query, params = mock_insert.call_args[0]
+        statement = " ".join(query.split())
+        self.assertEqual(statement, "INSERT INTO conversations (initiator_id, receiver_id) "
+                                    "SELECT ?, u.id FROM users u WHERE u.id = ? "
+                                    "ON DUPLICATE KEY UPDATE conversations.id = LAST_INSERT_ID(conversations.id)")
+        # Initiator first, then the receiver looked up in users
+        self.assertEqual(params, (2, 1))
+
+    @patch("repo.conversation.insert_query")
+    def test_get_or_create_missing_receiver(self, mock_insert):
+        from repo.conversation import get_or_create_conversation
+        mock_insert.return_value = 0
+        self.assertIsNone(get_or_create_conversation(2, 404))
+
+    @patch("repo.conversation.read_query")
+    def test_lookup_by_pair(self, mock_read):
+        from repo.conversation import get_conversation_by_users
+        mock_read.return_value = [(10,)]
+        self.assertEqual(get_conversation_by_users(2, 1), 10)
+
+        mock_read.assert_called_once()
+        query, params = mock_read.call_args[0]
+        self.assertIn("user_low = LEAST(?, ?) AND user_high = GREATEST(?, ?)", query)
+        self.assertEqual(params, (2, 1, 2, 1))
+
+
+class TestMessagesRepo(unittest.TestCase):
+    @staticmethod
+    def rows(*ids):
+        return [(message_id, "hi", "2024-01-01 10:00:00", 5, 1) for message_id in ids]
+
+    @patch("repo.message.read_query")
+    def test_full_history(self, mock_read):
+        from repo.message import get_messages_by_conversation
+        mock_read.return_value = self.rows(1, 2)
+        messages = get_messages_by_conversation(5)
+
+        self.assertEqual([message.id for message in messages], [1, 2])
+        query, params = mock_read.call_args[0]
+        self.assertTrue(query.endswith("WHERE conversation_id = ? ORDER BY id ASC"))
+        self.assertEqual(params, (5,))
+
+    @patch("repo.message.read_query")
+    def test_since_id(self, mock_read):
+        from repo.message import get_messages_by_conversation
+        mock_read.return_value = []
+        self.assertIsNone(get_messages_by_conversation(5, since_id=40, limit=50))
+
+        query, params = mock_read.call_args[0]
+        self.assertIn("conversation_id = ? AND id > ? ORDER BY id ASC LIMIT ?", query)
+        self.assertEqual(params, (5, 40, 50))
+
+    @patch("repo.message.read_query")
+    def test_before_id_returns_oldest_first(self, mock_read):
+        from repo.message import get_messages_by_conversation
+        mock_read.return_value = self.rows(39, 38, 37)
+        messages = get_messages_by_conversation(5, before_id=40, limit=3)
+
+        self.assertEqual([message.id for message in messages], [37, 38, 39])
+        query, params = mock_read.call_args[0]
+        self.assertIn("id < ? ORDER BY id DESC LIMIT ?", query)
+        self.assertEqual(params, (5, 40, 3))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,179 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from data.cache import ReadThroughCache
+from repo.caches import topic_cache, category_cache, user_cache, forget_user
+from repo.category import get_category_by_id, update_hidden_status
+from repo.topic import get_topic_by_id, lock_topic
+from repo.user import get_user_by_id, set_user_avatar
+
+
+class TestReadThroughCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = ReadThroughCache("test", maxsize=10, ttl=60)
+        loader = MagicMock(return_value="value")
+
+        self.assertEqual(cache.get_or_load(1, loader), "value")
+        self.assertEqual(cache.get_or_load(1, loader), "value")
+
+        loader.assert_called_once()
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_ratio"]), (1, 1, 0.5))
+
+    def test_none_is_not_cached(self):
+        cache = ReadThroughCache("test")
+        loader = MagicMock(return_value=None)
+
+        self.assertIsNone(cache.get_or_load(1, loader))
+        self.assertIsNone(cache.get_or_load(1, loader))
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_expired_and_evicted_entries_are_reloaded(self):
+        cache = ReadThroughCache("test", maxsize=2, ttl=0.05)
+        loader = MagicMock(side_effect=lambda: object())
+
+        first = cache.get_or_load(1, loader)
+        time.sleep(0.06)
+        self.assertIsNot(cache.get_or_load(1, loader), first)
+
+        cache.get_or_load(2, loader)
+        cache.get_or_load(3, loader)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(loader.call_count, 4)
+
+    def test_concurrent_misses_share_one_load(self):
+        cache = ReadThroughCache("test")
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(1, loader))) for _ in range(8)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while cache.stats()["coalesced"] < 7:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual(cache.stats()["coalesced"], 7)
+
+    def test_load_error_reaches_waiters_and_is_not_cached(self):
+        cache = ReadThroughCache("test")
+        started, release = threading.Event(), threading.Event()
+
+        def loader():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("database down")
+
+        errors = []
+
+        def load():
+            try:
+                cache.get_or_load(1, loader)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=load)
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=load)
+        waiter.start()
+        while cache.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(cache.get_or_load(1, lambda: "recovered"), "recovered")
+
+    def test_invalidate_during_load_discards_result(self):
+        cache = ReadThroughCache("test")
+
+        def loader():
+            # A write lands while the old row is being read
+            cache.invalidate(1)
+            return "old"
+
+        self.assertEqual(cache.get_or_load(1, loader), "old")
+        self.assertEqual(cache.get_or_load(1, lambda: "new"), "new")
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+class TestEntityCaches(unittest.TestCase):
+    def setUp(self):
+        for cache in (topic_cache, category_cache, user_cache):
+            cache.clear()
+            self.addCleanup(cache.clear)
+
+    @patch("repo.topic.gen_topic", side_effect=lambda row: row)
+    @patch("repo.topic.read_query")
+    def test_topic_read_through_and_lock_invalidates(self, mock_read_query, mock_gen_topic):
+        mock_read_query.return_value = [(7, "Topic")]
+
+        get_topic_by_id(7)
+        get_topic_by_id(7)
+        self.assertEqual(mock_read_query.call_count, 1)
+
+        with patch("repo.topic.update_query", return_value=1):
+            lock_topic(7)
+        get_topic_by_id(7)
+        self.assertEqual(mock_read_query.call_count, 2)
+
+    @patch("repo.category.read_query")
+    def test_category_read_through_and_hide_invalidates(self, mock_read_query):
+        mock_read_query.return_value = [(1, "General", "desc", 0, 0, 3)]
+
+        self.assertEqual(get_category_by_id(1).name, "General")
+        get_category_by_id(1)
+        self.assertEqual(mock_read_query.call_count, 1)
+
+        with patch("repo.category.update_query", return_value=1), \
+                patch("repo.category.permission_matrix.invalidate"):
+            update_hidden_status(1, 1)
+        get_category_by_id(1)
+        self.assertEqual(mock_read_query.call_count, 2)
+
+    @patch("repo.user.get_user_category_permissions", return_value={})
+    @patch("repo.user.read_query")
+    def test_user_variants_cached_apart_and_avatar_invalidates(self, mock_read_query, mock_perms):
+        mock_read_query.return_value = [(1, "alice", "hash", "a@example.com", "2000-01-01", None, 0, "2024-01-01")]
+
+        user = get_user_by_id(1)
+        public = get_user_by_id(1, public=True)
+        self.assertIs(get_user_by_id(1), user)
+        self.assertFalse(hasattr(public, "password"))
+        self.assertEqual(mock_read_query.call_count, 2)
+
+        with patch("repo.user.update_query", return_value=1):
+            set_user_avatar(user, "avatar.png")
+        get_user_by_id(1)
+        get_user_by_id(1, public=True)
+        self.assertEqual(mock_read_query.call_count, 4)
+
+    def test_forget_user_drops_every_variant(self):
+        for variant in ("user", "public", "row"):
+            user_cache.set((1, variant), variant)
+
+        forget_user(1)
+
+        self.assertEqual(len(user_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+import data.connection as connection
+from main import app
+
+client = TestClient(app)
+
+
+class TestHealthRouter(unittest.TestCase):
+    @patch("services.health.pool_stats")
+    def test_get_db_health(self, mock_pool_stats):
+        mock_pool_stats.return_value = [
+            {"name": "forum_pool", "initialized": True, "size": 5, "in_use": 2, "checkouts": 10,
+             "checkout_failures": 0, "wait_avg_ms": 0.1, "wait_max_ms": 0.4}
+        ]
+        response = client.get("/health/db")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ok")
+        self.assertEqual(response.json()["pools"][0]["in_use"], 2)
+
+    @patch("services.health.pool_stats")
+    def test_get_db_health_saturated(self, mock_pool_stats):
+        mock_pool_stats.return_value = [
+            {"name": "forum_pool", "initialized": True, "size": 5, "in_use": 5, "checkouts": 10,
+             "checkout_failures": 1, "wait_avg_ms": 3.0, "wait_max_ms": 10.0}
+        ]
+        response = client.get("/health/db")
+        self.assertEqual(response.json()["status"], "saturated")
+
+    @patch("services.health.pool_stats")
+    def test_get_db_health_bypasses_request_connection(self, mock_pool_stats):
+        units = []
+
+        def stats():
+            units.append(connection.current_unit.get())
+            return [{"name": "forum_pool", "initialized": True, "size": 5, "in_use": 5, "checkouts": 10,
+                     "checkout_failures": 0, "wait_avg_ms": 0.0, "wait_max_ms": 0.0}]
+
+        mock_pool_stats.side_effect = stats
+        response = client.get("/health/db")
+
+        # No unit of work and no pool slot: every connection in use belongs to other requests
+        self.assertEqual(units, [None])
+        self.assertEqual(response.json()["status"], "saturated")
+
+    @patch("services.health.cache_stats")
+    def test_get_cache_health(self, mock_cache_stats):
+        mock_cache_stats.return_value = [
+            {"name": "topics", "size": 3, "maxsize": 2048, "ttl": 30.0, "hits": 9, "misses": 3,
+             "coalesced": 0, "invalidations": 1, "hit_ratio": 0.75}
+        ]
+        response = client.get("/health/cache")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["caches"][0]["hit_ratio"], 0.75)
+
+
+if __name__ == "__main__":
+    unittest.main()
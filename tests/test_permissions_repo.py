@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from models.category import CategoryCreate
+from repo.permissions import PermissionMatrix
+from services.errors import category_not_found, database_error
+
+CATEGORIES = [(1, 0), (2, 1), (3, 1), (4, 1)]
+PERMISSIONS = [(2, 10, 2), (3, 10, 3), (4, 10, 0), (4, 11, 3)]
+
+
+def fake_read_query(query, params=()):
+    return CATEGORIES if "FROM categories" in query else PERMISSIONS
+
+
+class TestPermissionMatrix(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("repo.permissions.read_query", side_effect=fake_read_query)
+        self.read_query = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.matrix = PermissionMatrix()
+        self.user = MagicMock(id=10, is_admin=MagicMock(return_value=False))
+        self.other = MagicMock(id=11, is_admin=MagicMock(return_value=False))
+        self.admin = MagicMock(id=99, is_admin=MagicMock(return_value=True))
+
+    def test_can_read(self):
+        self.assertEqual([self.matrix.can_read(category_id, self.user) for category_id in (1, 2, 3, 4)],
+                         [True, True, True, False])
+        self.assertEqual([self.matrix.can_read(category_id, self.other) for category_id in (1, 2, 3, 4)],
+                         [True, False, False, True])
+
+    def test_can_write(self):
+        self.assertEqual([self.matrix.can_write(category_id, self.user) for category_id in (1, 2, 3, 4)],
+                         [True, False, True, False])
+        self.assertTrue(self.matrix.can_write(4, self.admin))
+
+    def test_viewable_ids(self):
+        self.assertEqual(self.matrix.viewable_ids(self.user), [1, 2, 3])
+        self.assertEqual(self.matrix.viewable_ids(self.other), [1, 4])
+        self.assertEqual(self.matrix.viewable_ids(self.admin), [1, 2, 3, 4])
+
+    def test_missing_category(self):
+        with self.assertRaises(type(category_not_found)):
+            self.matrix.can_read(5, self.user)
+        with self.assertRaises(type(category_not_found)):
+            self.matrix.can_write(5, self.user)
+
+    def test_loaded_once(self):
+        for category_id in (1, 2, 3, 4):
+            self.matrix.can_read(category_id, self.user)
+        self.matrix.viewable_ids(self.other)
+
+        self.assertEqual(self.read_query.call_count, 2)
+
+    def test_invalidate_reloads(self):
+        self.matrix.viewable_ids(self.user)
+        self.matrix.invalidate()
+        self.matrix.viewable_ids(self.user)
+
+        self.assertEqual(self.read_query.call_count, 4)
+
+    def test_reloads_when_too_old(self):
+        matrix = PermissionMatrix(max_age=0)
+        matrix.category_ids()
+        matrix.category_ids()
+
+        self.assertEqual(self.read_query.call_count, 4)
+
+    def test_load_error_not_cached(self):
+        self.read_query.side_effect = [None, PERMISSIONS]
+
+        with self.assertRaises(type(database_error)):
+            self.matrix.category_ids()
+
+        self.read_query.side_effect = fake_read_query
+        self.assertEqual(self.matrix.category_ids(), [1, 2, 3, 4])
+
+
+class TestPermissionInvalidation(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("repo.category.permission_matrix")
+        self.matrix = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("repo.category.update_query", return_value=1)
+    def test_update_hidden_status(self, mock_update):
+        from repo.category import update_hidden_status
+        update_hidden_status(2, 1)
+        self.matrix.invalidate.assert_called_once()
+
+    @patch("repo.category.insert_query", return_value=5)
+    def test_create_category(self, mock_insert):
+        from repo.category import create_category
+        create_category(CategoryCreate(name="News", description="Latest news"))
+        self.matrix.invalidate.assert_called_once()
+
+    @patch("repo.category.user_repo.bump_permission_version")
+    @patch("repo.category.insert_query", return_value=3)
+    @patch("repo.category.read_query", return_value=[])
+    def test_update_permissions(self, mock_read, mock_insert, mock_bump):
+        from repo.category import update_permissions
+        update_permissions(2, 10, 3)
+        self.matrix.invalidate.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import asyncio
+import unittest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+from repo.caches import topic_cache, category_cache
+from repo.counters import rebuild_counters
+from repo.topic import topics_count_cache
+from repo.replies import gen_reply, get_reply_by_id, get_replies_in_topic, set_reply_vote, add_reply_to_topic, \
+    get_user_votes_in_topic, get_replies_page, get_user_votes_for_replies, async_get_replies_page
+
+
+class TestRepliesRepo(unittest.TestCase):
+    def setUp(self):
+        self.reply_rows = [
+            (1, "First", "2024-01-01", 7, 3, 0, "user3", Decimal(2)),
+            (2, "Second", "2024-01-02", 7, 4, 1, "user4", 0),
+        ]
+
+    def test_gen_reply(self):
+        reply = gen_reply(self.reply_rows[0])
+        self.assertEqual(reply.id, 1)
+        self.assertEqual(reply.user_name, "user3")
+        self.assertEqual(reply.likes, 2)
+
+    @patch("repo.replies.read_query")
+    def test_get_replies_in_topic_single_query(self, mock_read_query):
+        mock_read_query.return_value = self.reply_rows
+
+        replies = get_replies_in_topic(7)
+
+        mock_read_query.assert_called_once()
+        self.assertEqual(mock_read_query.call_args[0][1], (7,))
+        self.assertEqual([reply.user_name for reply in replies], ["user3", "user4"])
+        self.assertEqual([reply.likes for reply in replies], [2, 0])
+
+    @patch("repo.replies.read_query")
+    def test_get_replies_in_topic_empty(self, mock_read_query):
+        mock_read_query.return_value = []
+        self.assertEqual(get_replies_in_topic(7), [])
+
+    @patch("repo.replies.read_query")
+    def test_get_reply_by_id(self, mock_read_query):
+        mock_read_query.return_value = [self.reply_rows[1]]
+
+        reply = get_reply_by_id(2)
+
+        mock_read_query.assert_called_once()
+        self.assertEqual(mock_read_query.call_args[0][1], (2,))
+        self.assertEqual(reply.best_reply, 1)
+
+    @patch("repo.replies.read_query")
+    def test_get_reply_by_id_not_found(self, mock_read_query):
+        mock_read_query.return_value = []
+        self.assertIsNone(get_reply_by_id(2))
+
+    @patch("repo.replies.read_query")
+    def test_get_replies_page(self, mock_read_query):
+        mock_read_query.return_value = self.reply_rows
+
+        replies, next_cursor = get_replies_page(7, after=0, limit=1)
+
+        query, params = mock_read_query.call_args[0]
+        self.assertIn("r.id > ?", query)
+        self.assertTrue(query.endswith("LIMIT ?"))
+        self.assertEqual(params, (7, 0, 2))
+        self.assertEqual([reply.id for reply in replies], [1])
+        self.assertEqual(next_cursor, 1)
+
+    @patch("repo.replies.read_query")
+    def test_get_replies_page_last(self, mock_read_query):
+        mock_read_query.return_value = self.reply_rows
+
+        replies, next_cursor = get_replies_page(7)
+
+        self.assertEqual(mock_read_query.call_args[0][1], (7, 21))
+        self.assertEqual(len(replies), 2)
+        self.assertIsNone(next_cursor)
+
+    @patch("repo.replies.async_read_query")
+    def test_async_get_replies_page_probes_one_extra_row(self, mock_read_query):
+        mock_read_query.return_value = self.reply_rows
+
+        full = asyncio.run(async_get_replies_page(7, after=0, limit=1))
+        self.assertEqual(mock_read_query.call_args[0][1], (7, 0, 2))
+        self.assertEqual(([reply.id for reply in full[0]], full[1]), ([1], 1))
+
+        # Exactly limit replies left: no next page
+        last = asyncio.run(async_get_replies_page(7, after=0, limit=2))
+        self.assertEqual(([reply.id for reply in last[0]], last[1]), ([1, 2], None))
+
+    @patch("repo.replies.read_query")
+    def test_get_user_votes_for_replies(self, mock_read_query):
+        mock_read_query.return_value = [(2, -1)]
+
+        self.assertEqual(get_user_votes_for_replies([1, 2], 3), {2: -1})
+        self.assertEqual(mock_read_query.call_args[0][1][0], 3)
+        self.assertEqual(get_user_votes_for_replies([], 3), {})
+        mock_read_query.assert_called_once()
+
+    @patch("repo.replies.read_query")
+    def test_get_user_votes_in_topic(self, mock_read_query):
+        mock_read_query.return_value = [(1, 1), (2, -1)]
+
+        self.assertEqual(get_user_votes_in_topic(7, 3), {1: 1, 2: -1})
+        mock_read_query.assert_called_once()
+        self.assertEqual(mock_read_query.call_args[0][1], (3, 7))
+
+    @patch("repo.replies.read_query")
+    def test_get_user_votes_in_topic_none(self, mock_read_query):
+        mock_read_query.return_value = []
+        self.assertEqual(get_user_votes_in_topic(7, 3), {})
+
+
+class TestReplyCounters(unittest.TestCase):
+    LIKES_QUERY = "UPDATE replies SET likes = likes + ? - @previous_vote WHERE id = ?"
+    LOCK_QUERY = "SELECT id FROM replies WHERE id = ? FOR UPDATE"
+
+    @patch("repo.replies.read_query")
+    @patch("repo.replies.update_query")
+    def test_vote_is_single_upsert(self, mock_update, mock_read):
+        mock_update.return_value = 1
+        calls = MagicMock()
+        calls.attach_mock(mock_read, "read")
+        calls.attach_mock(mock_update, "update")
+
+        result = set_reply_vote(2, 3, 1)
+
+        self.assertEqual(result, {"message": "Vote updated successfully."})
+        # The reply row is locked before the upsert share-locks it
+        mock_read.assert_called_once_with(self.LOCK_QUERY, (2,))
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ["read", "update", "update"])
+        upsert, likes = mock_update.call_args_list
+        self.assertIn("ON DUPLICATE KEY UPDATE", upsert[0][0])
+        self.assertEqual(upsert[0][1], (2, 3, 1))
+        self.assertEqual(likes[0], (self.LIKES_QUERY, (1, 2)))
+
+    @patch("repo.replies.read_query")
+    @patch("repo.replies.update_query")
+    def test_unchanged_vote_leaves_likes(self, mock_update, mock_read):
+        mock_update.return_value = 0
+
+        result = set_reply_vote(2, 3, 1)
+
+        self.assertEqual(result, {"message": "Vote not updated."})
+        mock_update.assert_called_once()
+
+    @patch("repo.replies.read_query")
+    @patch("repo.replies.update_query")
+    def test_invalid_vote_resets(self, mock_update, mock_read):
+        mock_update.return_value = 2
+
+        set_reply_vote(2, 3, 5)
+
+        self.assertEqual(mock_update.call_args_list[0][0][1], (2, 3, 0))
+
+    @patch("repo.replies.update_query")
+    @patch("repo.replies.insert_query")
+    def test_add_reply_counts_reply(self, mock_insert, mock_update):
+        mock_insert.return_value = 5
+        topic_cache.set(7, "cached topic")
+        calls = MagicMock()
+        calls.attach_mock(mock_update, "update")
+        calls.attach_mock(mock_insert, "insert")
+
+        self.assertEqual(add_reply_to_topic("hi", 7, 3), 5)
+        mock_update.assert_called_once_with("UPDATE topics SET replies_count = replies_count + 1 WHERE id = ?",
+                                            (7,))
+        # The topic row is locked before the insert share-locks it
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ["update", "insert"])
+        self.assertIsNone(topic_cache.get(7))
+
+    @patch("repo.counters.update_query")
+    def test_rebuild_counters(self, mock_update):
+        mock_update.return_value = 2
+        topic_cache.set(7, "cached topic")
+        category_cache.set(1, "cached category")
+        topics_count_cache.set("total", 3)
+
+        self.assertEqual(rebuild_counters(), {"topics_count": 2, "replies_count": 2, "likes": 2})
+        self.assertEqual((len(topic_cache), len(category_cache), len(topics_count_cache)), (0, 0, 0))
+        self.assertEqual(rebuild_counters(["likes"]), {"likes": 2})
+        self.assertIn("SUM(v.type)", mock_update.call_args[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
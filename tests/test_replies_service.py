@@ -1,7 +1,9 @@
+import asyncio
 import unittest
 from unittest.mock import patch, MagicMock
 from services.replies import RepliesService
-from services.errors import reply_not_found, reply_not_accessible, internal_error, topic_not_found, topic_locked
+from services.errors import reply_not_found, reply_not_accessible, internal_error, topic_not_found, topic_locked, \
+    invalid_token
 
 class TestRepliesService(unittest.TestCase):
     def setUp(self):
@@ -29,7 +31,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.set_vote(2, 1, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.category_repo.check_category_write_permission")
     @patch("services.replies.replies_repo.add_reply_to_topic")
     def test_add_reply_success(self, mock_add_reply, mock_check_perm, mock_get_topic, mock_validate):
@@ -41,7 +43,7 @@ class TestRepliesService(unittest.TestCase):
         self.assertEqual(result["id"], 2)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     def test_add_reply_topic_not_found(self, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         mock_get_topic.return_value = None
@@ -49,7 +51,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.add_reply("Test reply", 1, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     def test_add_reply_topic_locked(self, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         locked_topic = MagicMock(id=1, category_id=1, locked=1)
@@ -58,7 +60,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.add_reply("Test reply", 1, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.category_repo.check_category_write_permission")
     def test_add_reply_no_write_permission(self, mock_check_perm, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
@@ -68,7 +70,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.add_reply("Test reply", 1, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.category_repo.check_category_write_permission")
     @patch("services.replies.replies_repo.add_reply_to_topic")
     def test_add_reply_internal_error(self, mock_add_reply, mock_check_perm, mock_get_topic, mock_validate):
@@ -80,7 +82,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.add_reply("Test reply", 1, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.replies_repo.get_reply_by_id")
     @patch("services.replies.replies_repo.set_reply_as_best")
     def test_set_best_reply_success(self, mock_set_best, mock_get_reply, mock_get_topic, mock_validate):
@@ -94,7 +96,7 @@ class TestRepliesService(unittest.TestCase):
         self.assertTrue(result)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     def test_set_best_reply_topic_not_found(self, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         mock_get_topic.return_value = None
@@ -102,7 +104,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.set_best_reply(self.reply.id, self.topic.id, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     def test_set_best_reply_not_topic_owner(self, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         not_owner_topic = MagicMock(id=1, user_id=99)
@@ -111,7 +113,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.set_best_reply(self.reply.id, self.topic.id, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.replies_repo.get_reply_by_id")
     def test_set_best_reply_reply_not_found(self, mock_get_reply, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
@@ -122,7 +124,7 @@ class TestRepliesService(unittest.TestCase):
             RepliesService.set_best_reply(self.reply.id, self.topic.id, self.token)
 
     @patch("services.replies.AuthToken.validate")
-    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.topics_repo.get_topic_header")
     @patch("services.replies.replies_repo.get_reply_by_id")
     def test_set_best_reply_reply_wrong_topic(self, mock_get_reply, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
@@ -136,32 +138,125 @@ class TestRepliesService(unittest.TestCase):
     @patch("services.replies.AuthToken.validate")
     @patch("services.replies.topics_repo.get_topic_by_id")
     @patch("services.replies.category_repo.check_category_read_permission")
-    @patch("services.replies.replies_repo.get_replies_in_topic")
+    @patch("services.replies.replies_repo.async_get_replies_in_topic")
     def test_get_topic_replies_success(self, mock_get_replies, mock_check_perm, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         mock_get_topic.return_value = self.topic
         mock_check_perm.return_value = True
         mock_get_replies.return_value = [self.reply]
-        result = RepliesService.get_topic_replies(self.topic.id, self.token)
-        self.assertEqual(result, [self.reply])
+        result = asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token))
+        # No limit: every reply, no next page
+        self.assertEqual(result, ([self.reply], None))
+        mock_get_replies.assert_awaited_once_with(self.topic.id, after=None)
 
     @patch("services.replies.AuthToken.validate")
     @patch("services.replies.topics_repo.get_topic_by_id")
-    def test_get_topic_replies_topic_not_found(self, mock_get_topic, mock_validate):
+    @patch("services.replies.category_repo.check_category_read_permission")
+    @patch("services.replies.replies_repo.async_get_replies_page")
+    def test_get_topic_replies_page(self, mock_get_page, mock_check_perm, mock_get_topic, mock_validate):
+        mock_validate.return_value = self.user
+        mock_get_topic.return_value = self.topic
+        mock_check_perm.return_value = True
+        mock_get_page.return_value = ([self.reply], 2)
+        result = asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token, after=5, limit=1000))
+        self.assertEqual(result, ([self.reply], 2))
+        mock_get_page.assert_awaited_once_with(self.topic.id, after=5, limit=100)
+
+        asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token, limit=0))
+        mock_get_page.assert_awaited_with(self.topic.id, after=None, limit=1)
+
+    @patch("services.replies.AuthToken.validate")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.category_repo.check_category_read_permission")
+    @patch("services.replies.replies_repo.iter_replies_in_topic")
+    def test_stream_topic_replies(self, mock_iter_replies, mock_check_perm, mock_get_topic, mock_validate):
+        mock_validate.return_value = self.user
+        mock_get_topic.return_value = self.topic
+        mock_check_perm.return_value = True
+        mock_iter_replies.return_value = iter([MagicMock(model_dump_json=MagicMock(return_value='{"id": 2}'))])
+        lines = RepliesService.stream_topic_replies(self.topic.id, self.token, after=1)
+        self.assertEqual(list(lines), ['{"id": 2}\n'])
+        mock_iter_replies.assert_called_once_with(self.topic.id, after=1)
+
+    @patch("services.replies.AuthToken.validate")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.category_repo.check_category_read_permission")
+    @patch("services.replies.replies_repo.iter_replies_in_topic")
+    def test_stream_topic_replies_checks_access_first(self, mock_iter_replies, mock_check_perm, mock_get_topic,
+                                                      mock_validate):
+        mock_validate.return_value = self.user
+        mock_get_topic.return_value = self.topic
+        mock_check_perm.return_value = False
+        with self.assertRaises(type(reply_not_accessible)):
+            RepliesService.stream_topic_replies(self.topic.id, self.token)
+        mock_iter_replies.assert_not_called()
+
+    @patch("services.replies.AuthToken.validate")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.replies_repo.async_get_replies_in_topic")
+    def test_get_topic_replies_topic_not_found(self, mock_get_replies, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         mock_get_topic.return_value = None
+        mock_get_replies.return_value = []
         with self.assertRaises(type(topic_not_found)):
-            RepliesService.get_topic_replies(self.topic.id, self.token)
+            asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token))
+        mock_get_replies.assert_not_called()
 
     @patch("services.replies.AuthToken.validate")
     @patch("services.replies.topics_repo.get_topic_by_id")
     @patch("services.replies.category_repo.check_category_read_permission")
-    def test_get_topic_replies_no_permission(self, mock_check_perm, mock_get_topic, mock_validate):
+    @patch("services.replies.replies_repo.async_get_replies_in_topic")
+    def test_get_topic_replies_no_permission(self, mock_get_replies, mock_check_perm, mock_get_topic, mock_validate):
         mock_validate.return_value = self.user
         mock_get_topic.return_value = self.topic
         mock_check_perm.return_value = False
+        mock_get_replies.return_value = [self.reply]
+        with self.assertRaises(type(reply_not_accessible)):
+            asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token))
+        mock_get_replies.assert_not_called()
+
+    @patch("services.replies.AuthToken.validate")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.replies_repo.async_get_replies_in_topic")
+    def test_get_topic_replies_invalid_token(self, mock_get_replies, mock_get_topic, mock_validate):
+        mock_validate.side_effect = invalid_token
+        mock_get_topic.return_value = self.topic
+        with self.assertRaises(type(invalid_token)):
+            asyncio.run(RepliesService.get_topic_replies(self.topic.id, self.token))
+        mock_get_replies.assert_not_called()
+
+    @patch("services.replies.AuthToken.claims")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.category_repo.check_category_read_permission")
+    @patch("services.replies.replies_repo.get_user_votes_in_topic")
+    def test_get_topic_votes_success(self, mock_get_votes, mock_check_perm, mock_get_topic, mock_claims):
+        mock_claims.return_value = self.user
+        mock_get_topic.return_value = self.topic
+        mock_check_perm.return_value = True
+        mock_get_votes.return_value = {2: 1, 5: -1}
+        result = RepliesService.get_topic_votes(self.topic.id, self.token)
+        self.assertEqual(result, {2: 1, 5: -1})
+        mock_get_votes.assert_called_once_with(self.topic.id, self.user.id)
+
+    @patch("services.replies.AuthToken.claims")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    def test_get_topic_votes_topic_not_found(self, mock_get_topic, mock_claims):
+        mock_claims.return_value = self.user
+        mock_get_topic.return_value = None
+        with self.assertRaises(type(topic_not_found)):
+            RepliesService.get_topic_votes(self.topic.id, self.token)
+
+    @patch("services.replies.AuthToken.claims")
+    @patch("services.replies.topics_repo.get_topic_by_id")
+    @patch("services.replies.category_repo.check_category_read_permission")
+    @patch("services.replies.replies_repo.get_user_votes_in_topic")
+    def test_get_topic_votes_no_permission(self, mock_get_votes, mock_check_perm, mock_get_topic, mock_claims):
+        mock_claims.return_value = self.user
+        mock_get_topic.return_value = self.topic
+        mock_check_perm.return_value = False
         with self.assertRaises(type(reply_not_accessible)):
-            RepliesService.get_topic_replies(self.topic.id, self.token)
+            RepliesService.get_topic_votes(self.topic.id, self.token)
+        mock_get_votes.assert_not_called()
 
     @patch("services.replies.AuthToken.validate")
     @patch("services.replies.replies_repo.get_reply_by_id")
@@ -0,0 +1,71 @@
+import tracemalloc
+import unittest
+from unittest.mock import patch, MagicMock
+
+from repo.replies import iter_replies_in_topic
+from services.replies import RepliesService
+
+
+class FakeThread:
+    """
+    Serves read_query for one topic of `size` replies, generating only the rows each page asks for.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.queries = 0
+
+    def read_query(self, query, params=()):
+        self.queries += 1
+        after = params[1] if "r.id > ?" in query else 0
+        limit = params[-1]
+        return [(reply_id, "x" * 200, "2024-01-01", 7, 3, 0, "user3", 1)
+                for reply_id in range(after + 1, min(after + limit, self.size) + 1)]
+
+
+class TestRepliesStreaming(unittest.TestCase):
+    def stream(self, size: int) -> tuple[int, int]:
+        """
+        Consumes the NDJSON stream of a topic with `size` replies.
+        Returns the number of lines and the peak traced memory in bytes.
+        """
+        thread = FakeThread(size)
+        with patch("repo.replies.read_query", side_effect=thread.read_query), \
+                patch("services.replies.AuthToken.validate", return_value=MagicMock(id=3)), \
+                patch("services.replies.topics_repo.get_topic_by_id", return_value=MagicMock(id=7, category_id=1)), \
+                patch("services.replies.category_repo.check_category_read_permission", return_value=True):
+            tracemalloc.start()
+            try:
+                lines = sum(1 for _ in RepliesService.stream_topic_replies(7, "token"))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        return lines, peak
+
+    def test_iter_replies_in_batches(self):
+        thread = FakeThread(1250)
+        with patch("repo.replies.read_query", side_effect=thread.read_query):
+            ids = [reply.id for reply in iter_replies_in_topic(7, batch_size=500)]
+
+        self.assertEqual(ids, list(range(1, 1251)))
+        self.assertEqual(thread.queries, 3)
+
+    def test_iter_replies_after_cursor(self):
+        thread = FakeThread(30)
+        with patch("repo.replies.read_query", side_effect=thread.read_query):
+            ids = [reply.id for reply in iter_replies_in_topic(7, after=25, batch_size=10)]
+
+        self.assertEqual(ids, [26, 27, 28, 29, 30])
+
+    def test_stream_memory_does_not_grow_with_thread(self):
+        small_lines, small_peak = self.stream(2_000)
+        large_lines, large_peak = self.stream(20_000)
+
+        self.assertEqual((small_lines, large_lines), (2_000, 20_000))
+        # Ten times the replies, about the same peak: only one batch is alive at a time
+        self.assertLess(large_peak, small_peak * 1.5)
+        self.assertLess(large_peak, 4 * 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
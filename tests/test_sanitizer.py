@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from bs4 import BeautifulSoup
+from bs4.builder import ParserRejectedMarkup
+
+from data.sanitizer import sanitize
+
+
+def reference(content: str) -> str:
+    """The BeautifulSoup implementation sanitize() replaces."""
+    try:
+        soup = BeautifulSoup(content, "html.parser")
+    except ParserRejectedMarkup as e:
+        raise ValueError(e) from e
+    for br in soup.find_all("br"):
+        br.replace_with("__BR__")
+    return soup.get_text().replace("__BR__", "<br />")
+
+
+CORPUS = [
+    "", " ", "\n", "  \n  ", "plain text", "line one<br>line two", "a<br/>b", "a<BR>b", "a<br />b", "a<br></br>b",
+    "a</br>b", "a<br>x</br>b", "a<br>b<br/>c", "a<br>b<br/>c</br>d", "<p>a<br>b<br/>c</p>d", "<br><br>", "__BR__",
+    "<b>bold</b> and <i>italic</i>", "a<b>   </b>c", "a<b>\n \n</b>c", "<b>x</b>   <i>y</i>", "<p> </p>",
+    "<pre>  keep  </pre>x", "<pre><b>  </b></pre>", "<textarea> </textarea>", "<pre>x</pre>  ",
+    "a<script>alert(1)</script>b", "a<style>p {}</style>b", "<style> </style>q", "<script>a<br>b</script>",
+    "a<template>x<p>y</p></template>b", "<template><br></template>x", "<template><![CDATA[x]]></template>",
+    "a<rt>x</rt><rp>y</rp>b", "<rt>a<br>b</rt>", "a<![CDATA[x]]>b", "a<![CDATA[]]>b", "a<!--comment-->b",
+    "<!DOCTYPE html>a", "a<?pi x?>b", "a<!x>b", "a<!-->b", "a<![if x]>b",
+    "a &amp; &lt;b&gt; &foo; &#65; &#x41; &#X41; &#150; &#129; &#0; &#1114112; &nbsp;", "&amp", "a &amp b",
+    "a&#x;b", "&#xZZ;", "&notin; &notit; &not", "a < b", "a <b", "x<", "<", "&", "<p>unclosed", "</p>stray",
+    "<a href='<br>'>x</a>", "<br/ >", "<b/>x", "<img>a<img/>b</img>c", "<br> </br> ",
+    "<html><head><title>t</title></head><body>x</body></html>", "<div><p>a<div>b</p>c</div>d",
+    "<ul><li>one<li>two</ul>", "<table><tr><td>1</td><td>2</td></tr></table>", "émoji 🎉 <b>ünïcödé</b>",
+    "<a href=\"x\" onclick=\"y\">link</a>", "<p\n>multi\nline</p\n>", "<b\tclass=x>tab</b>",
+]
+
+TOKENS = ["text", "more words", " ", "  ", "\n", "\t", "<", ">", "&", "&amp;", "&lt;", "&nbsp;", "&foo;", "&#65;",
+          "&#x263a;", "&#150;", "<br>", "<br/>", "</br>", "<BR />", "<b>", "</b>", "<p>", "</p>", "<i>", "</i>",
+          "<pre>", "</pre>", "<textarea>", "</textarea>", "<script>", "</script>", "<style>", "</style>",
+          "<template>", "</template>", "<rt>", "</rt>", "<img>", "<img/>", "</img>", "<hr>", "<!-- c -->",
+          "<![CDATA[d]]>", "<!DOCTYPE html>", "<?pi?>", "<a href='x'>", "</a>", "__BR__", "<div", "=\"", "'", "<![", "<!", "</", "&#", "\r"]
+
+
+def outcome(sanitizer, content: str) -> str | type:
+    try:
+        return sanitizer(content)
+    except ValueError:
+        return ValueError
+
+
+class TestSanitizer(unittest.TestCase):
+    def test_corpus_matches_beautifulsoup(self):
+        for content in CORPUS:
+            with self.subTest(content=content):
+                self.assertEqual(sanitize(content), reference(content))
+
+    def test_random_documents_match_beautifulsoup(self):
+        rng = random.Random(20240101)
+        for _ in range(5000):
+            content = "".join(rng.choices(TOKENS, k=rng.randint(1, 40)))
+            with self.subTest(content=content):
+                self.assertEqual(outcome(sanitize, content), outcome(reference, content))
+
+    def test_rejected_markup(self):
+        with self.assertRaises(ValueError):
+            reference("a<![foo b")
+        with self.assertRaises(ValueError):
+            sanitize("a<![foo b")
+
+    def test_large_document(self):
+        content = "<p>Paragraph with <b>bold</b> &amp; a line break<br>and more text.</p>\n" * 2000
+        self.assertEqual(sanitize(content), reference(content))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from models.topic import Topic, TopicCreate, TopicSummary
+from repo.caches import category_cache
+from repo.topic import gen_topic, gen_topics, get_topics, create_topic, get_topic_header, topics_count_cache, \
+    fulltext_terms, get_topics_in_category, load_topic
+
+
+class TestTopicRepo(unittest.TestCase):
+    def setUp(self):
+        topics_count_cache.clear()
+        self.topic_rows = [
+            (1, "First topic", "content", "2024-01-01", 10, 100, 0, 4),
+            (2, "Second topic", "content", "2024-01-02", 10, 101, 0, 0),
+            (3, "Third topic", "content", "2024-01-03", 20, 100, 1, 1),
+        ]
+
+        patchers = {
+            "categories": patch("repo.topic.category_repo.get_category_names_by_ids",
+                                return_value={10: "General", 20: "News"}),
+            "users": patch("repo.topic.get_usernames_by_ids",
+                           return_value={100: "alice", 101: "bob"}),
+        }
+        self.mocks = {}
+        for name, patcher in patchers.items():
+            self.mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_gen_topics_hydrates_every_row(self):
+        topics = gen_topics(self.topic_rows)
+
+        self.assertEqual([topic.id for topic in topics], [1, 2, 3])
+        self.assertEqual([topic.category_name for topic in topics], ["General", "General", "News"])
+        self.assertEqual([topic.user_name for topic in topics], ["alice", "bob", "alice"])
+        self.assertEqual([topic.replies_count for topic in topics], [4, 0, 1])
+        self.assertEqual(topics[2].locked, 1)
+
+    def test_gen_topics_loads_related_data_once(self):
+        gen_topics(self.topic_rows)
+
+        self.mocks["categories"].assert_called_once()
+        self.mocks["users"].assert_called_once()
+
+    def test_gen_topics_empty(self):
+        self.assertEqual(gen_topics([]), [])
+        self.mocks["categories"].assert_not_called()
+
+    def test_gen_topic_single_row(self):
+        topic = gen_topic(self.topic_rows[0])
+        self.assertEqual(topic.name, "First topic")
+        self.assertEqual(topic.replies_count, 4)
+
+    def test_gen_topics_summary_has_no_content(self):
+        rows = [(row[0], row[1], None) + row[3:] for row in self.topic_rows]
+
+        topics = gen_topics(rows, summary=True)
+
+        self.assertTrue(all(type(topic) is TopicSummary for topic in topics))
+        self.assertEqual([topic.replies_count for topic in topics], [4, 0, 1])
+        self.assertNotIn("content", topics[0].model_dump())
+
+    @patch("repo.topic.read_query")
+    def test_lists_do_not_read_content(self, mock_read_query):
+        mock_read_query.side_effect = [[(3,)], self.topic_rows, self.topic_rows]
+
+        listed = get_topics(category_ids=[10, 20])["topics"] + get_topics_in_category(10)
+
+        for call in mock_read_query.call_args_list[1:]:
+            self.assertNotIn("content", call[0][0])
+        self.assertTrue(all(type(topic) is TopicSummary for topic in listed))
+
+    @patch("repo.topic.read_query")
+    def test_single_topic_reads_content(self, mock_read_query):
+        mock_read_query.return_value = self.topic_rows[:1]
+
+        topic = load_topic(1)
+
+        self.assertIn("content", mock_read_query.call_args[0][0])
+        self.assertIsInstance(topic, Topic)
+        self.assertEqual(topic.content, "content")
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_uses_batch_hydration(self, mock_read_query):
+        mock_read_query.side_effect = [[(3,)], self.topic_rows]
+
+        result = get_topics(category_ids=[10, 20])
+
+        self.assertEqual(mock_read_query.call_count, 2)
+        self.assertEqual(len(result["topics"]), 3)
+        self.assertEqual(result["pages"], 1)
+        self.assertIsNone(result["next_cursor"])
+        self.mocks["users"].assert_called_once()
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_caches_total(self, mock_read_query):
+        mock_read_query.side_effect = [[(3,)], self.topic_rows, self.topic_rows]
+
+        get_topics(category_ids=[10, 20])
+        get_topics(category_ids=[10, 20], page=1)
+
+        self.assertEqual(mock_read_query.call_count, 3)
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_after_cursor(self, mock_read_query):
+        rows = [(id, "Topic", "content", "2024-01-01", 10, 100, 0, 0) for id in range(49, 38, -1)]
+        mock_read_query.side_effect = [[(100,)], rows]
+
+        result = get_topics(category_ids=[10], after=50)
+
+        select_query, params = mock_read_query.call_args[0]
+        self.assertIn("id < ?", select_query)
+        self.assertNotIn("OFFSET", select_query)
+        self.assertEqual(params, (10, 50, 11))
+        self.assertEqual([topic.id for topic in result["topics"]], list(range(49, 39, -1)))
+        self.assertEqual(result["next_cursor"], 40)
+        self.assertEqual(result["prev_cursor"], 49)
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_before_cursor(self, mock_read_query):
+        rows = [(id, "Topic", "content", "2024-01-01", 10, 100, 0, 0) for id in range(51, 55)]
+        mock_read_query.side_effect = [[(100,)], rows]
+
+        result = get_topics(category_ids=[10], before=50)
+
+        select_query = mock_read_query.call_args[0][0]
+        self.assertIn("id > ?", select_query)
+        self.assertIn("ORDER BY id ASC", select_query)
+        self.assertEqual([topic.id for topic in result["topics"]], [54, 53, 52, 51])
+        self.assertEqual(result["next_cursor"], 51)
+        self.assertIsNone(result["prev_cursor"])
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_search_uses_fulltext(self, mock_read_query):
+        mock_read_query.side_effect = [[(3,)], self.topic_rows]
+
+        result = get_topics(search="first+topic", category_ids=[10, 20], after=5)
+
+        count_query = mock_read_query.call_args_list[0][0][0]
+        select_query, params = mock_read_query.call_args[0]
+        self.assertIn("MATCH(name, content) AGAINST", count_query)
+        self.assertIn("ORDER BY MATCH(name, content)", select_query)
+        self.assertNotIn("id < ?", select_query)
+        self.assertEqual(params, (10, 20, "+first* +topic*", "+first* +topic*", 11, 0))
+        self.assertIsNone(result["next_cursor"])
+
+    @patch("repo.topic.read_query")
+    def test_get_topics_short_search_falls_back_to_like(self, mock_read_query):
+        mock_read_query.side_effect = [[(3,)], self.topic_rows]
+
+        get_topics(search="ab", category_ids=[10])
+
+        select_query, params = mock_read_query.call_args[0]
+        self.assertIn("name LIKE ?", select_query)
+        self.assertEqual(params[1], "%ab%")
+
+    def test_fulltext_terms(self):
+        self.assertEqual(fulltext_terms("mariadb index"), "+mariadb* +index*")
+        self.assertEqual(fulltext_terms('-drop "table" (x)'), "+drop* +table*")
+        self.assertIsNone(fulltext_terms("a b"))
+
+
+class TestTopicHeader(unittest.TestCase):
+    @patch("repo.topic.get_usernames_by_ids")
+    @patch("repo.topic.read_query")
+    def test_get_topic_header_single_query(self, mock_read_query, mock_usernames):
+        mock_read_query.return_value = [(7, 10, 100, 1)]
+
+        header = get_topic_header(7)
+
+        mock_read_query.assert_called_once()
+        mock_usernames.assert_not_called()
+        self.assertEqual((header.id, header.category_id, header.user_id, header.locked), (7, 10, 100, 1))
+
+    @patch("repo.topic.read_query")
+    def test_get_topic_header_not_found(self, mock_read_query):
+        mock_read_query.return_value = []
+        self.assertIsNone(get_topic_header(7))
+
+
+class TestCreateTopic(unittest.TestCase):
+    @patch("repo.topic.update_query")
+    @patch("repo.topic.insert_query")
+    def test_create_topic_counts_topic(self, mock_insert, mock_update):
+        mock_insert.return_value = 12
+        topics_count_cache.set("total", 3)
+        category_cache.set(10, "cached category")
+        calls = MagicMock()
+        calls.attach_mock(mock_update, "update")
+        calls.attach_mock(mock_insert, "insert")
+
+        topic_id = create_topic(TopicCreate(name="Topic", content="line<br>next", category_id=10), 100)
+
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ["update", "insert"])
+
+        self.assertEqual(topic_id, 12)
+        self.assertEqual(mock_insert.call_args[0][1][1], "line<br />next")
+        mock_update.assert_called_once_with("UPDATE categories SET topics_count = topics_count + 1 WHERE id = ?",
+                                            (10,))
+        self.assertEqual(len(topics_count_cache), 0)
+        self.assertIsNone(category_cache.get(10))
+
+
+if __name__ == "__main__":
+    unittest.main()
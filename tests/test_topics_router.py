@@ -2,6 +2,7 @@ import unittest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from main import app
+from models.reply import Reply
 
 client = TestClient(app)
 
@@ -44,10 +45,10 @@ class TestTopicsRouter(unittest.TestCase):
 
     @patch("services.replies.RepliesService.get_topic_replies")
     def test_get_topic_replies(self, mock_get_topic_replies):
-        mock_get_topic_replies.return_value = [
+        mock_get_topic_replies.return_value = ([
             {"id": 1, "content": "Reply 1", "date": "2024-01-01", "topic_id": 1, "user_id": 2},
             {"id": 2, "content": "Reply 2", "date": "2024-01-02", "topic_id": 1, "user_id": 3}
-        ]
+        ], None)
         response = client.get(f"/topics/{self.topic_id}/replies", params={"token": self.auth_token})
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json(), list)
@@ -68,5 +69,58 @@ class TestTopicsRouter(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.json())
 
+    @patch("services.replies.RepliesService.get_topic_votes")
+    def test_get_my_votes(self, mock_get_topic_votes):
+        mock_get_topic_votes.return_value = {2: 1, 5: -1}
+        response = client.get(f"/topics/{self.topic_id}/my-votes", headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"2": 1, "5": -1})
+        mock_get_topic_votes.assert_called_once_with(self.topic_id, self.auth_token)
+
+    @patch("services.topics.TopicsService.get_topic_page")
+    def test_get_topic_page(self, mock_get_topic_page):
+        mock_get_topic_page.return_value = {"topic": self.mock_topic_response,
+                                            "access_type": "write_access",
+                                            "replies": [],
+                                            "next_cursor": None}
+        response = client.get(f"/topics/{self.topic_id}/page", params={"after": 5, "limit": 10},
+                              headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["access_type"], "write_access")
+        mock_get_topic_page.assert_called_once_with(self.topic_id, self.auth_token, after=5, limit=10)
+
+    @patch("services.replies.RepliesService.get_topic_replies")
+    def test_get_topic_replies_next_cursor(self, mock_get_topic_replies):
+        mock_get_topic_replies.return_value = ([
+            Reply(id=reply_id, content="Reply", date="2024-01-01", topic_id=1, user_id=1) for reply_id in (4, 5)
+        ], 5)
+        response = client.get(f"/topics/{self.topic_id}/replies", params={"after": 3, "limit": 2},
+                              headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Next-Cursor"], "5")
+        mock_get_topic_replies.assert_called_once_with(self.topic_id, self.auth_token, after=3, limit=2)
+
+    @patch("services.replies.RepliesService.get_topic_replies")
+    def test_get_topic_replies_last_page_and_default(self, mock_get_topic_replies):
+        mock_get_topic_replies.return_value = ([
+            Reply(id=reply_id, content="Reply", date="2024-01-01", topic_id=1, user_id=1) for reply_id in (4, 5)
+        ], None)
+        response = client.get(f"/topics/{self.topic_id}/replies", headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Next-Cursor", response.headers)
+        # Without a limit every reply is returned, as before paging existed
+        mock_get_topic_replies.assert_called_once_with(self.topic_id, self.auth_token, after=None, limit=None)
+
+    @patch("services.replies.RepliesService.stream_topic_replies")
+    def test_get_topic_replies_stream(self, mock_stream):
+        mock_stream.return_value = iter(['{"id": 4}\n', '{"id": 5}\n'])
+        response = client.get(f"/topics/{self.topic_id}/replies", params={"stream": True},
+                              headers={"Authorization": self.auth_token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(response.text.splitlines(), ['{"id": 4}', '{"id": 5}'])
+        mock_stream.assert_called_once_with(self.topic_id, self.auth_token, None)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from models.reply import Reply
+from models.topic import Topic
 from services.topics import TopicsService
 from services.errors import category_not_found, category_locked, category_not_accessible, topic_not_found, internal_error
 
@@ -92,7 +94,7 @@ class TestTopicsService(unittest.TestCase):
         with self.assertRaises(type(category_not_accessible)):
             TopicsService.get_topic(1, self.token)
 
-    @patch("services.topics.AuthToken.validate")
+    @patch("services.topics.AuthToken.claims")
     @patch("services.topics.category_repo.get_all_category_ids")
     @patch("services.topics.topic_repo.get_topics")
     def test_get_topics_admin(self, mock_get_topics, mock_get_all_cat_ids, mock_validate):
@@ -102,7 +104,7 @@ class TestTopicsService(unittest.TestCase):
         result = TopicsService.get_topics(self.token, search=None, page=0, sort="DESC")
         self.assertEqual(result, [self.mock_topic])
 
-    @patch("services.topics.AuthToken.validate")
+    @patch("services.topics.AuthToken.claims")
     @patch("services.topics.category_repo.get_viewable_category_ids")
     @patch("services.topics.topic_repo.get_topics")
     def test_get_topics_non_admin(self, mock_get_topics, mock_get_viewable_cat_ids, mock_validate):
@@ -113,7 +115,7 @@ class TestTopicsService(unittest.TestCase):
         self.assertEqual(result, [self.mock_topic])
 
     @patch("services.topics.AuthToken.validate_admin")
-    @patch("services.topics.topic_repo.get_topic_by_id")
+    @patch("services.topics.topic_repo.get_topic_header")
     @patch("services.topics.topic_repo.lock_topic")
     def test_lock_topic_by_id_success(self, mock_lock_topic, mock_get_topic, mock_validate_admin):
         mock_validate_admin.return_value = self.admin_user
@@ -123,12 +125,61 @@ class TestTopicsService(unittest.TestCase):
         self.assertTrue(result)
 
     @patch("services.topics.AuthToken.validate_admin")
-    @patch("services.topics.topic_repo.get_topic_by_id")
+    @patch("services.topics.topic_repo.get_topic_header")
     def test_lock_topic_by_id_not_found(self, mock_get_topic, mock_validate_admin):
         mock_validate_admin.return_value = self.admin_user
         mock_get_topic.return_value = None
         with self.assertRaises(type(topic_not_found)):
             TopicsService.lock_topic_by_id(1, self.token)
 
+
+class TestTopicPage(unittest.TestCase):
+    def setUp(self):
+        self.token = "mocked_token"
+        self.user = MagicMock(id=1, is_admin=MagicMock(return_value=False), special_permissions={})
+        self.topic = Topic(id=7, name="Thread", content="content", date="2024-01-01", category_id=3, user_id=2)
+        self.replies = [Reply(id=reply_id, content="reply", date="2024-01-02", topic_id=7, user_id=2)
+                        for reply_id in (11, 12)]
+
+        patchers = {
+            "claims": patch("services.topics.AuthToken.claims", return_value=self.user),
+            "topic": patch("services.topics.topic_repo.get_topic_by_id", return_value=self.topic),
+            "read": patch("services.topics.category_repo.check_category_read_permission", return_value=True),
+            "replies": patch("services.topics.replies_repo.get_replies_page", return_value=(self.replies, 12)),
+            "votes": patch("services.topics.replies_repo.get_user_votes_for_replies", return_value={12: -1}),
+        }
+        self.mocks = {}
+        for name, patcher in patchers.items():
+            self.mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_get_topic_page(self):
+        page = TopicsService.get_topic_page(7, self.token, after=10, limit=2)
+
+        self.assertEqual(page.topic.id, 7)
+        self.assertEqual(page.access_type, "normal_access")
+        self.assertEqual([(reply.id, reply.my_vote) for reply in page.replies], [(11, 0), (12, -1)])
+        self.assertEqual(page.next_cursor, 12)
+        self.mocks["claims"].assert_called_once_with(self.token)
+        self.mocks["topic"].assert_called_once_with(7)
+        self.mocks["replies"].assert_called_once_with(7, after=10, limit=2)
+        self.mocks["votes"].assert_called_once_with([11, 12], 1)
+
+    def test_get_topic_page_limit_capped(self):
+        TopicsService.get_topic_page(7, self.token, limit=5000)
+        self.assertEqual(self.mocks["replies"].call_args[1]["limit"], 100)
+
+    def test_get_topic_page_topic_not_found(self):
+        self.mocks["topic"].return_value = None
+        with self.assertRaises(type(topic_not_found)):
+            TopicsService.get_topic_page(7, self.token)
+
+    def test_get_topic_page_no_permission(self):
+        self.mocks["read"].return_value = False
+        with self.assertRaises(type(category_not_accessible)):
+            TopicsService.get_topic_page(7, self.token)
+        self.mocks["replies"].assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
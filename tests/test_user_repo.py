@@ -4,11 +4,13 @@ from datetime import datetime
 
 from models.auth_model import UserCreate
 from models.user import User, UserPublic
+from repo.caches import user_cache
 from repo.user import get_all_users, get_user_by_id, get_user_by_username, get_user_by_email, insert_user, gen_user, user_exists, get_users_in_list_by_id
 
 
 class TestUserRepo(unittest.TestCase):
     def setUp(self):
+        user_cache.clear()
         # Sample user data for testing
         patcher = patch('repo.user.get_user_category_permissions', return_value={})
         self.addCleanup(patcher.stop)
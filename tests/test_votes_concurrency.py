@@ -0,0 +1,90 @@
+import os
+import random
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from data.connection import read_query, insert_query, update_query
+from models.topic import TopicCreate
+from repo.replies import set_reply_vote, add_reply_to_topic
+from repo.topic import create_topic
+
+THREADS = 20
+VOTES_PER_THREAD = 50
+VOTERS = 5
+
+
+@unittest.skipUnless(os.getenv("DB_INTEGRATION_TESTS"),
+                     "set DB_INTEGRATION_TESTS=1 with DB_* pointing at a scratch database")
+class TestVotesConcurrency(unittest.TestCase):
+    """
+    Hammers one reply, topic and category with writes from many threads against a real database.
+    Lock ordering (deadlocks) and counter drift only show up here: run it in CI with a database.
+    """
+
+    def setUp(self):
+        suffix = uuid.uuid4().hex[:12]
+        self.user_ids = [insert_query("INSERT INTO users (username, password, email, birthday) VALUES (?, ?, ?, ?)",
+                                      (f"voter_{number}_{suffix}", "x", f"voter_{number}_{suffix}@test",
+                                       "2000-01-01"))
+                         for number in range(VOTERS)]
+        self.category_id = insert_query("INSERT INTO categories (name) VALUES (?)", (f"votes_{suffix}",))
+        self.topic_id = topic_id = insert_query("INSERT INTO topics (name, content, category_id, user_id) VALUES (?, ?, ?, ?)",
+                                ("Votes", "content", self.category_id, self.user_ids[0]))
+        self.reply_id = insert_query("INSERT INTO replies (content, topic_id, user_id) VALUES (?, ?, ?)",
+                                     ("reply", topic_id, self.user_ids[0]))
+
+    def tearDown(self):
+        # Topics, replies and votes go with the category and users (ON DELETE CASCADE)
+        update_query("DELETE FROM categories WHERE id = ?", (self.category_id,))
+        for user_id in self.user_ids:
+            update_query("DELETE FROM users WHERE id = ?", (user_id,))
+
+    def test_concurrent_votes_on_one_reply(self):
+        def vote(seed: int) -> None:
+            rng = random.Random(seed)
+            for _ in range(VOTES_PER_THREAD):
+                set_reply_vote(self.reply_id, rng.choice(self.user_ids), rng.choice((-1, 0, 1)))
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(vote, range(THREADS)))
+
+        votes = read_query("SELECT user_id, COUNT(*) FROM votes WHERE reply_id = ? GROUP BY user_id",
+                           (self.reply_id,))
+        self.assertTrue(all(count == 1 for _, count in votes))
+        total = read_query("SELECT COALESCE(SUM(type), 0) FROM votes WHERE reply_id = ?", (self.reply_id,))[0][0]
+        likes = read_query("SELECT likes FROM replies WHERE id = ?", (self.reply_id,))[0][0]
+        self.assertEqual(likes, total)
+
+    def test_concurrent_replies_in_one_topic(self):
+        def reply(number: int) -> None:
+            for _ in range(VOTES_PER_THREAD // 5):
+                add_reply_to_topic(f"reply {number}", self.topic_id, self.user_ids[number % VOTERS])
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(reply, range(THREADS)))
+
+        # setUp inserts its reply directly, without counting it
+        count = read_query("SELECT COUNT(*) FROM replies WHERE topic_id = ?", (self.topic_id,))[0][0]
+        replies_count = read_query("SELECT replies_count FROM topics WHERE id = ?", (self.topic_id,))[0][0]
+        self.assertEqual(count - 1, THREADS * (VOTES_PER_THREAD // 5))
+        self.assertEqual(replies_count, count - 1)
+
+    def test_concurrent_topics_in_one_category(self):
+        def topic(number: int) -> None:
+            for _ in range(VOTES_PER_THREAD // 5):
+                create_topic(TopicCreate(name=f"Topic {number}", content="content", category_id=self.category_id),
+                             self.user_ids[number % VOTERS])
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(topic, range(THREADS)))
+
+        # setUp inserts its topic directly, without counting it
+        count = read_query("SELECT COUNT(*) FROM topics WHERE category_id = ?", (self.category_id,))[0][0]
+        topics_count = read_query("SELECT topics_count FROM categories WHERE id = ?", (self.category_id,))[0][0]
+        self.assertEqual(count - 1, THREADS * (VOTES_PER_THREAD // 5))
+        self.assertEqual(topics_count, count - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()